@@ -6,6 +6,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 
 from .serializers import UserSerializer, RegisterSerializer, BalanceSerializer
+from portfolio.services.summary import bump_summary_version
 
 User = get_user_model()
 
@@ -73,6 +74,7 @@ class ResetBalanceView(APIView):
         user = request.user
         old_balance = user.account_balance
         user.reset_balance()
+        bump_summary_version([user.pk])
 
         return Response({
             'message': 'Balance reset successful!',
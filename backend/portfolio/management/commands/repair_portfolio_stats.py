@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+
+from portfolio.models import Portfolio
+from portfolio.services.stats import closed_trade_stats
+
+
+STAT_FIELDS = ['total_trades', 'winning_trades', 'losing_trades', 'total_pnl']
+
+
+class Command(BaseCommand):
+    """
+    Check incrementally kept portfolio stats against the trade table.
+
+    The expected stats of every user come from one aggregate query over
+    closed trades. Portfolios that disagree (or are missing) are listed
+    and, with ``--fix``, rewritten.
+    """
+
+    help = 'Compare portfolio stats with closed trades and repair drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rewrite the portfolios that do not match.',
+        )
+
+    def handle(self, *args, **options):
+        expected = closed_trade_stats()
+        portfolios = {
+            portfolio.user_id: portfolio
+            for portfolio in Portfolio.objects.all()
+        }
+
+        empty = dict.fromkeys(STAT_FIELDS, 0)
+        stale = []
+        for user_id in set(expected) | set(portfolios):
+            stats = expected.get(user_id, empty)
+            portfolio = portfolios.get(user_id)
+            if portfolio is None:
+                portfolio = Portfolio(user_id=user_id)
+            elif all(
+                getattr(portfolio, field) == stats[field]
+                for field in STAT_FIELDS
+            ):
+                continue
+
+            self.stdout.write(
+                f'user {user_id}: '
+                + ', '.join(
+                    f'{field} {getattr(portfolio, field)} -> {stats[field]}'
+                    for field in STAT_FIELDS
+                )
+            )
+            portfolio.set_stats(**stats)
+            stale.append(portfolio)
+
+        if not stale:
+            self.stdout.write(self.style.SUCCESS('All portfolios match.'))
+            return
+
+        if options['fix']:
+            Portfolio.objects.bulk_create(
+                [p for p in stale if p.pk is None], batch_size=500
+            )
+            Portfolio.objects.bulk_update(
+                [p for p in stale if p.pk is not None],
+                STAT_FIELDS + ['win_rate', 'total_pnl_percent'],
+                batch_size=500,
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f'Repaired {len(stale)} portfolios.')
+            )
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{len(stale)} portfolios differ; run with --fix to repair.'
+            ))
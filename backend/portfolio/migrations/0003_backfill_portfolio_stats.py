@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+INITIAL_BALANCE = Decimal('10000.00')
+
+
+def backfill_stats(apps, schema_editor):
+    """
+    Bring every portfolio up to date before stats become incremental.
+
+    Portfolios used to be recomputed on read, so trades closed since a
+    user's last visit are not counted yet.
+    """
+    Portfolio = apps.get_model('portfolio', 'Portfolio')
+    Trade = apps.get_model('trading', 'Trade')
+
+    rows = Trade.objects.filter(status='CLOSED').values('user_id').annotate(
+        total_trades=Count('id'),
+        winning_trades=Count('id', filter=Q(pnl__gt=0)),
+        losing_trades=Count('id', filter=Q(pnl__lt=0)),
+        total_pnl=Sum('pnl'),
+    ).order_by()
+
+    for row in rows.iterator():
+        total_pnl = row['total_pnl'] or Decimal('0.00')
+        Portfolio.objects.update_or_create(
+            user_id=row['user_id'],
+            defaults={
+                'total_trades': row['total_trades'],
+                'winning_trades': row['winning_trades'],
+                'losing_trades': row['losing_trades'],
+                'total_pnl': total_pnl,
+                'win_rate': (
+                    Decimal(row['winning_trades'] * 100)
+                    / row['total_trades']
+                ),
+                'total_pnl_percent': total_pnl / INITIAL_BALANCE * 100,
+            },
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0002_alter_watchlist_options_portfolio_total_pnl_percent_and_more'),
+        ('trading', '0004_trade_history_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_backfill_portfolio_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquitySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('1m', '1 minute'), ('1h', '1 hour'), ('1d', '1 day')], max_length=2)),
+                ('bucket', models.DateTimeField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('open_value', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('unrealized_pnl', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('equity', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='equity_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['bucket'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='equitysnapshot',
+            constraint=models.UniqueConstraint(fields=('user', 'resolution', 'bucket'), name='equity_snapshot_bucket_unique'),
+        ),
+    ]
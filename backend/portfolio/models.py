@@ -3,6 +3,10 @@ from django.conf import settings
 from decimal import Decimal
 
 
+# Starting balance the PnL percent is measured against
+INITIAL_BALANCE = Decimal('10000.00')
+
+
 class Portfolio(models.Model):
     """
     User portfolio statistics.
@@ -27,22 +31,22 @@ class Portfolio(models.Model):
     losing_trades = models.IntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Leaderboard sync of recently changed portfolios
+            models.Index(fields=['updated_at'], name='portfolio_updated_idx'),
+        ]
+
     def __str__(self):
         return f'Portfolio of {self.user.username}'
 
-    def update_stats(self):
-        """Recalculate portfolio statistics."""
-        from trading.models import Trade
-
-        closed_trades = Trade.objects.filter(user=self.user, status='CLOSED')
-
-        self.total_trades = closed_trades.count()
-        self.winning_trades = closed_trades.filter(pnl__gt=0).count()
-        self.losing_trades = closed_trades.filter(pnl__lt=0).count()
-
-        # Calculate total PnL
-        total = sum(t.pnl or 0 for t in closed_trades)
-        self.total_pnl = total
+    def set_stats(self, total_trades, winning_trades, losing_trades,
+                  total_pnl):
+        """Set the counters and the rates derived from them, unsaved."""
+        self.total_trades = total_trades
+        self.winning_trades = winning_trades
+        self.losing_trades = losing_trades
+        self.total_pnl = total_pnl
 
         # Calculate win rate
         if self.total_trades > 0:
@@ -51,9 +55,27 @@ class Portfolio(models.Model):
             self.win_rate = Decimal('0.00')
 
         # Calculate PnL percent
-        initial_balance = Decimal('10000.00')
-        self.total_pnl_percent = (self.total_pnl / initial_balance) * 100
+        self.total_pnl_percent = (self.total_pnl / INITIAL_BALANCE) * 100
 
+    def update_stats(self):
+        """
+        Recalculate portfolio statistics from scratch.
+
+        Stats are kept up to date as trades close (see
+        portfolio.services.stats); this is for repairs and backfills.
+        """
+        from .services.stats import closed_trade_stats
+
+        stats = closed_trade_stats([self.user_id]).get(self.user_id)
+        if stats is None:
+            stats = {
+                'total_trades': 0,
+                'winning_trades': 0,
+                'losing_trades': 0,
+                'total_pnl': Decimal('0.00'),
+            }
+
+        self.set_stats(**stats)
         self.save()
 
 
@@ -79,4 +101,48 @@ class Watchlist(models.Model):
         ordering = ['-added_at']
 
     def __str__(self):
-        return f'{self.user.username} watching {self.asset.symbol}'
\ No newline at end of file
+        return f'{self.user.username} watching {self.asset.symbol}'
+
+
+class EquitySnapshot(models.Model):
+    """
+    Account value of a user at one point of their equity curve.
+
+    Rows are kept at three resolutions. Every snapshot writes the
+    minute bucket and overwrites the hour and day buckets it falls in,
+    so each coarser row holds the last value of its period.
+    """
+
+    RESOLUTIONS = [
+        ('1m', '1 minute'),
+        ('1h', '1 hour'),
+        ('1d', '1 day'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='equity_snapshots'
+    )
+    resolution = models.CharField(max_length=2, choices=RESOLUTIONS)
+    bucket = models.DateTimeField()
+    balance = models.DecimalField(max_digits=18, decimal_places=2)
+    open_value = models.DecimalField(max_digits=18, decimal_places=2)
+    unrealized_pnl = models.DecimalField(max_digits=18, decimal_places=2)
+    equity = models.DecimalField(max_digits=18, decimal_places=2)
+
+    class Meta:
+        ordering = ['bucket']
+        constraints = [
+            # Also the index behind range reads
+            models.UniqueConstraint(
+                fields=['user', 'resolution', 'bucket'],
+                name='equity_snapshot_bucket_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f'{self.user.username} {self.resolution} '
+            f'{self.bucket:%Y-%m-%d %H:%M}: {self.equity}'
+        )
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from .models import Portfolio, Watchlist
+from .services.leaderboard import ALL_TIERS, METRICS
+from accounts.models import CustomUser
 from trading.serializers import AssetSerializer
 
 
@@ -44,4 +46,49 @@ class WatchlistSerializer(serializers.ModelSerializer):
 class AddToWatchlistSerializer(serializers.Serializer):
     """Serializer for adding asset to watchlist."""
 
-    asset_id = serializers.IntegerField()
\ No newline at end of file
+    asset_id = serializers.IntegerField()
+
+
+class EquityQuerySerializer(serializers.Serializer):
+    """Serializer for equity curve query parameters."""
+
+    start = serializers.DateTimeField(
+        required=False, input_formats=['iso-8601', '%Y-%m-%d']
+    )
+    end = serializers.DateTimeField(
+        required=False, input_formats=['iso-8601', '%Y-%m-%d']
+    )
+    resolution = serializers.ChoiceField(
+        choices=['auto', '1m', '1h', '1d'], default='auto'
+    )
+
+    def validate(self, data):
+        if 'start' in data and 'end' in data and data['start'] >= data['end']:
+            raise serializers.ValidationError('start must be before end')
+        return data
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    """Serializer for leaderboard query parameters."""
+
+    metric = serializers.ChoiceField(
+        choices=list(METRICS), default='pnl_percent'
+    )
+    tier = serializers.ChoiceField(
+        choices=[ALL_TIERS] + [tier for tier, _ in CustomUser.TIER_CHOICES],
+        default=ALL_TIERS
+    )
+    limit = serializers.IntegerField(
+        min_value=1, max_value=100, default=10
+    )
+    radius = serializers.IntegerField(min_value=0, max_value=50, default=5)
+
+
+class LeaderboardRowSerializer(serializers.Serializer):
+    """Serializer for one ranked leaderboard row."""
+
+    rank = serializers.IntegerField()
+    user_id = serializers.IntegerField()
+    username = serializers.CharField()
+    score = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total_trades = serializers.IntegerField()
@@ -0,0 +1,138 @@
+import math
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from numpy.lib.stride_tricks import sliding_window_view
+
+from portfolio.models import INITIAL_BALANCE, EquitySnapshot
+from trading.models import Trade
+from .stats import get_portfolio
+
+
+# Markets trade every day, so returns annualize over 365 days
+PERIODS_PER_YEAR = 365
+
+
+def _number(value, digits=4):
+    """A JSON-safe rounded float, or None for undefined values."""
+    if value is None or not math.isfinite(value):
+        return None
+    return round(float(value), digits)
+
+
+def pnl_metrics(pnl):
+    """
+    Trade-level metrics from the closed-trade PnL series (in close
+    order): profit factor, average win / loss, expectancy and the max
+    drawdown of the realized equity curve.
+    """
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl < 0]
+    gross_profit = wins.sum()
+    gross_loss = -losses.sum()
+
+    curve = np.concatenate(([0.0], np.cumsum(pnl)))
+    equity = float(INITIAL_BALANCE) + curve
+    peaks = np.maximum.accumulate(equity)
+    drawdowns = equity - peaks
+
+    return {
+        'trades': int(pnl.size),
+        'profit_factor': _number(
+            gross_profit / gross_loss if gross_loss else None
+        ),
+        'average_win': _number(wins.mean() if wins.size else 0, 2),
+        'average_loss': _number(losses.mean() if losses.size else 0, 2),
+        'expectancy': _number(pnl.mean() if pnl.size else 0, 2),
+        'max_drawdown': _number(-drawdowns.min(), 2),
+        'max_drawdown_percent': _number(
+            -(drawdowns / peaks).min() * 100, 2
+        ),
+    }
+
+
+def return_metrics(equity, window=30):
+    """
+    Risk metrics from a daily equity series: annualized Sharpe and
+    Sortino ratios (zero risk-free rate), volatility and the rolling
+    volatility over ``window`` days.
+    """
+    if equity.size < 3:
+        return {
+            'sharpe_ratio': None,
+            'sortino_ratio': None,
+            'volatility': None,
+        }, np.empty(0)
+
+    returns = np.diff(equity) / equity[:-1]
+    annualize = math.sqrt(PERIODS_PER_YEAR)
+    mean = returns.mean()
+    std = returns.std(ddof=1)
+    downside = math.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+
+    rolling = np.empty(0)
+    if returns.size >= window:
+        rolling = sliding_window_view(returns, window).std(
+            axis=1, ddof=1
+        ) * annualize
+
+    return {
+        'sharpe_ratio': _number(mean / std * annualize if std else None),
+        'sortino_ratio': _number(
+            mean / downside * annualize if downside else None
+        ),
+        'volatility': _number(std * annualize),
+    }, rolling
+
+
+def compute_analytics(user, window=30):
+    """Load the user's PnL series and daily equity and run the metrics."""
+    pnl = Trade.objects.filter(user=user, status='CLOSED').order_by(
+        'closed_at', 'id'
+    ).annotate(
+        pnl_float=Cast('pnl', FloatField())
+    ).values_list('pnl_float', flat=True)
+    pnl = np.array(list(pnl), dtype=float)
+    pnl = pnl[~np.isnan(pnl)]
+
+    days = list(EquitySnapshot.objects.filter(
+        user=user, resolution='1d'
+    ).annotate(
+        equity_float=Cast('equity', FloatField())
+    ).values_list('bucket', 'equity_float'))
+    equity = np.array([value for _, value in days], dtype=float)
+
+    risk, rolling = return_metrics(equity, window)
+
+    # rolling[i] covers the returns ending on day i + window
+    return dict(
+        pnl_metrics(pnl),
+        **risk,
+        rolling_volatility_window=window,
+        rolling_volatility=[
+            {'t': days[i + window][0], 'value': _number(value)}
+            for i, value in enumerate(rolling)
+        ],
+    )
+
+
+def get_analytics(user):
+    """
+    Analytics for the user, cached until their next trade closes.
+
+    The cache key includes the closed-trade count from the portfolio, so
+    a close moves readers to a new key; the timeout picks up new daily
+    equity snapshots.
+    """
+    portfolio = get_portfolio(user)
+    key = f'analytics_{user.pk}_{portfolio.total_trades}'
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = compute_analytics(
+            user, settings.ANALYTICS_ROLLING_WINDOW
+        )
+        cache.set(key, analytics, settings.ANALYTICS_CACHE_TTL)
+    return analytics
@@ -0,0 +1,130 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from portfolio.models import EquitySnapshot
+from trading.models import Trade
+from trading.services.pnl import unrealized_pnl
+
+
+# Resolution -> bucket width, finest first
+RESOLUTIONS = {
+    '1m': timedelta(minutes=1),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+
+SNAPSHOT_FIELDS = ['balance', 'open_value', 'unrealized_pnl', 'equity']
+
+
+def bucket_start(moment, resolution):
+    """Start of the bucket of the given resolution containing moment."""
+    if resolution == '1m':
+        return moment.replace(second=0, microsecond=0)
+    if resolution == '1h':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def pick_resolution(start, end, max_points=None):
+    """
+    The finest resolution that covers start..end in at most max_points
+    buckets and is still kept for that far back.
+    """
+    max_points = max_points or settings.EQUITY_MAX_POINTS
+    retention = settings.EQUITY_RETENTION
+    oldest = timezone.now() - start
+    for resolution, width in RESOLUTIONS.items():
+        kept = retention.get(resolution)
+        if kept is not None and oldest > timedelta(seconds=kept):
+            continue
+        if (end - start) / width <= max_points:
+            return resolution
+    return '1d'
+
+
+def record_equity_snapshots(price_service, now=None):
+    """
+    Snapshot the equity of every user with open positions or trades
+    closed since the last snapshot.
+
+    Open positions are marked to market from one bulk price lookup. The
+    minute, hour and day buckets of every user are upserted together
+    with one bulk statement. Returns the number of users recorded.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(seconds=settings.EQUITY_SNAPSHOT_INTERVAL * 2)
+
+    positions = list(
+        Trade.objects.filter(status='OPEN').values_list(
+            'user_id', 'id', 'asset__symbol', 'trade_type', 'quantity',
+            'entry_price', 'asset__api_source'
+        ).order_by()
+    )
+    user_ids = {row[0] for row in positions} | set(
+        Trade.objects.filter(status='CLOSED', closed_at__gte=since)
+        .values_list('user_id', flat=True).distinct().order_by()
+    )
+    if not user_ids:
+        return 0
+
+    sources = {row[2]: row[6] for row in positions}
+    prices = price_service.get_prices(list(sources), sources=sources)
+    pnls = unrealized_pnl((row[1:6] for row in positions), prices)
+
+    open_value = defaultdict(Decimal)
+    unrealized = defaultdict(Decimal)
+    for user_id, trade_id, symbol, _, quantity, entry_price, _ in positions:
+        if trade_id in pnls:
+            open_value[user_id] += quantity * prices[symbol]
+            unrealized[user_id] += pnls[trade_id][0]
+        else:
+            # No price: carry the position at cost
+            open_value[user_id] += quantity * entry_price
+
+    balances = get_user_model().objects.filter(
+        pk__in=user_ids
+    ).values_list('pk', 'account_balance')
+
+    snapshots = []
+    for user_id, balance in balances:
+        values = {
+            'balance': balance,
+            'open_value': round(open_value[user_id], 2),
+            'unrealized_pnl': round(unrealized[user_id], 2),
+            'equity': round(balance + open_value[user_id], 2),
+        }
+        for resolution in RESOLUTIONS:
+            snapshots.append(EquitySnapshot(
+                user_id=user_id,
+                resolution=resolution,
+                bucket=bucket_start(now, resolution),
+                **values
+            ))
+
+    EquitySnapshot.objects.bulk_create(
+        snapshots,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['user', 'resolution', 'bucket'],
+        update_fields=SNAPSHOT_FIELDS,
+    )
+    return len(snapshots) // len(RESOLUTIONS)
+
+
+def prune_equity_snapshots(now=None):
+    """Drop fine-grained rows older than their retention period."""
+    now = now or timezone.now()
+    deleted = 0
+    for resolution, seconds in settings.EQUITY_RETENTION.items():
+        if seconds is None:
+            continue
+        deleted += EquitySnapshot.objects.filter(
+            resolution=resolution,
+            bucket__lt=now - timedelta(seconds=seconds),
+        ).delete()[0]
+    return deleted
@@ -0,0 +1,301 @@
+import random
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from portfolio.models import Portfolio
+
+
+# Metric name -> Portfolio field it ranks by (highest first)
+METRICS = {
+    'pnl_percent': 'total_pnl_percent',
+    'win_rate': 'win_rate',
+}
+
+# Board ranking every user regardless of their tier
+ALL_TIERS = 'ALL'
+
+
+class _Node:
+    __slots__ = ('key', 'value', 'priority', 'size', 'left', 'right')
+
+    def __init__(self, key, value, priority):
+        self.key = key
+        self.value = value
+        self.priority = priority
+        self.size = 1
+        self.left = None
+        self.right = None
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _update(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+def _split(node, key):
+    """Split into (keys < key, keys >= key)."""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        return _update(node), right
+    left, node.left = _split(node.left, key)
+    return left, _update(node)
+
+
+def _merge(left, right):
+    """Join two treaps where every key in left is below those in right."""
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+def _remove(node, key):
+    if node is None:
+        return None, False
+    if key == node.key:
+        return _merge(node.left, node.right), True
+    if key < node.key:
+        node.left, removed = _remove(node.left, key)
+    else:
+        node.right, removed = _remove(node.right, key)
+    return _update(node), removed
+
+
+class RankedSet:
+    """
+    Sorted keys with O(log n) insert, remove, rank and select.
+
+    A treap whose nodes carry their subtree size, so the position of a
+    key and the key at a position are found on one root-to-leaf walk,
+    and a run of k keys from a position costs O(log n + k). Keys must
+    be unique and comparable; each carries an arbitrary value.
+    """
+
+    def __init__(self):
+        self._root = None
+        self._random = random.Random()
+
+    def __len__(self):
+        return _size(self._root)
+
+    def insert(self, key, value=None):
+        """Add a key, which must not already be present."""
+        node = _Node(key, value, self._random.random())
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, node), right)
+
+    def remove(self, key):
+        """Remove a key; returns whether it was present."""
+        self._root, removed = _remove(self._root, key)
+        return removed
+
+    def rank(self, key):
+        """Zero-based position of a key, or None if it is absent."""
+        node, rank = self._root, 0
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif node.key < key:
+                rank += _size(node.left) + 1
+                node = node.right
+            else:
+                return rank + _size(node.left)
+        return None
+
+    def slice(self, start, stop):
+        """(key, value) pairs at positions start..stop-1, in order."""
+        start = max(start, 0)
+        stop = min(stop, len(self))
+
+        # Walk down to position start, stacking the nodes still to visit
+        stack, node, index = [], self._root, start
+        while node is not None:
+            left = _size(node.left)
+            if index < left:
+                stack.append(node)
+                node = node.left
+            elif index == left:
+                stack.append(node)
+                break
+            else:
+                index -= left + 1
+                node = node.right
+
+        items = []
+        while stack and len(items) < stop - start:
+            node = stack.pop()
+            items.append((node.key, node.value))
+            node = node.right
+            while node is not None:
+                stack.append(node)
+                node = node.left
+        return items
+
+
+class Leaderboard:
+    """
+    Users ranked by each metric, overall and within their trading tier.
+
+    Every (metric, tier) board is a RankedSet keyed by (-score, user_id),
+    so top-N, a user's rank and the users around it are logarithmic
+    instead of sorting every portfolio per request. The boards are
+    built from the database with ``load()``; ``sync()`` re-ranks the
+    portfolios updated since, which covers trades closed by other
+    processes, and ``refresh()`` re-ranks given users right away.
+    Tier changes are picked up on the user's next update.
+    """
+
+    # How far back sync() looks for portfolios committed out of order
+    SYNC_LOOKBACK = timedelta(seconds=60)
+
+    def __init__(self):
+        self._boards = defaultdict(RankedSet)
+        # user_id -> (tier, username, total_trades, {metric: score})
+        self._entries = {}
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def loaded(self):
+        return self._synced_at is not None
+
+    def load(self):
+        """Rebuild every board from the portfolios."""
+        with self._lock:
+            self._boards.clear()
+            self._entries.clear()
+            self._synced_at = timezone.now()
+            self._add_rows(Portfolio.objects.all())
+
+    def sync(self):
+        """Re-rank portfolios updated since the last load or sync."""
+        if self._synced_at is None:
+            return self.load()
+        with self._lock:
+            since = self._synced_at - self.SYNC_LOOKBACK
+            self._synced_at = timezone.now()
+            self._add_rows(Portfolio.objects.filter(updated_at__gte=since))
+
+    def refresh(self, user_ids):
+        """Re-rank the given users from their current portfolios."""
+        with self._lock:
+            self._add_rows(Portfolio.objects.filter(user_id__in=user_ids))
+
+    def update(self, user_id, tier, username, total_trades, scores):
+        """Move one user to their current scores on every board."""
+        self._discard(user_id)
+        if total_trades < settings.LEADERBOARD_MIN_TRADES:
+            return
+        self._entries[user_id] = (tier, username, total_trades, scores)
+        for metric, score in scores.items():
+            for board in (ALL_TIERS, tier):
+                self._boards[(metric, board)].insert(
+                    (-score, user_id), user_id
+                )
+
+    def top(self, metric, tier=ALL_TIERS, limit=10):
+        """The first ``limit`` rows of a board."""
+        with self._lock:
+            return self._rows(metric, tier, 0, limit)
+
+    def around(self, metric, tier, user_id, radius=5):
+        """
+        A user's rank and the rows ``radius`` places either side of it.
+
+        Returns (rank, rows), or (None, []) when the user is not ranked
+        on this board.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or tier not in (ALL_TIERS, entry[0]):
+                return None, []
+            key = (-entry[3][metric], user_id)
+            index = self._boards[(metric, tier)].rank(key)
+            rows = self._rows(metric, tier, index - radius, index + radius + 1)
+            return index + 1, rows
+
+    def size(self, metric, tier=ALL_TIERS):
+        return len(self._boards[(metric, tier)])
+
+    def _rows(self, metric, tier, start, stop):
+        start = max(start, 0)
+        items = self._boards[(metric, tier)].slice(start, stop)
+        rows = []
+        for rank, ((_, user_id), _) in enumerate(items, start + 1):
+            _, username, total_trades, scores = self._entries[user_id]
+            rows.append({
+                'rank': rank,
+                'user_id': user_id,
+                'username': username,
+                'score': scores[metric],
+                'total_trades': total_trades,
+            })
+        return rows
+
+    def _discard(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        tier, _, _, scores = entry
+        for metric, score in scores.items():
+            for board in (ALL_TIERS, tier):
+                self._boards[(metric, board)].remove((-score, user_id))
+
+    def _add_rows(self, queryset):
+        fields = list(METRICS.values())
+        rows = queryset.values_list(
+            'user_id', 'user__trading_tier', 'user__username',
+            'total_trades', *fields
+        ).order_by()
+        for user_id, tier, username, total_trades, *values in rows.iterator(
+            chunk_size=2000
+        ):
+            self.update(
+                user_id, tier, username, total_trades,
+                dict(zip(METRICS, values))
+            )
+
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+
+def get_leaderboard():
+    """The process-wide leaderboard, built on first use."""
+    global _leaderboard
+    if _leaderboard is None:
+        with _leaderboard_lock:
+            if _leaderboard is None:
+                _leaderboard = Leaderboard()
+    return _leaderboard
+
+
+def on_trades_closed(user_ids):
+    """
+    Re-rank users once the transaction closing their trades commits.
+
+    Only applies to a leaderboard already built in this process; other
+    processes pick the closes up through sync().
+    """
+    leaderboard = _leaderboard
+    if leaderboard is None or not leaderboard.loaded:
+        return
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: leaderboard.refresh(user_ids))
@@ -0,0 +1,98 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from portfolio.models import INITIAL_BALANCE, Portfolio
+from trading.models import Trade
+from .leaderboard import on_trades_closed
+
+
+def closed_trade_stats(user_ids=None):
+    """
+    Stats of every closed trade, per user, in one aggregate query.
+
+    Returns {user_id: {'total_trades', 'winning_trades',
+    'losing_trades', 'total_pnl'}}, optionally for some users only.
+    """
+    trades = Trade.objects.filter(status='CLOSED')
+    if user_ids is not None:
+        trades = trades.filter(user_id__in=user_ids)
+    rows = trades.values('user_id').annotate(
+        total_trades=Count('id'),
+        winning_trades=Count('id', filter=Q(pnl__gt=0)),
+        losing_trades=Count('id', filter=Q(pnl__lt=0)),
+        total_pnl=Sum('pnl'),
+    ).order_by()
+    return {
+        row.pop('user_id'): dict(row, total_pnl=row['total_pnl'] or 0)
+        for row in rows
+    }
+
+
+def recompute_stats(user_id):
+    """Rebuild one user's portfolio stats from their closed trades."""
+    portfolio, _ = Portfolio.objects.get_or_create(user_id=user_id)
+    portfolio.update_stats()
+    return portfolio
+
+
+def get_portfolio(user):
+    """The user's portfolio, built from their history the first time."""
+    portfolio = Portfolio.objects.select_related('user').filter(
+        user=user
+    ).first()
+    if portfolio is None:
+        portfolio = recompute_stats(user.pk)
+    return portfolio
+
+
+def record_closed_trades(trades):
+    """
+    Apply freshly closed trades to their owners' portfolio stats.
+
+    Counters and PnL are bumped with one F() update per user, so
+    concurrent closes never lose an update; win rate and PnL percent
+    are derived from the new counters in the same statement, and the
+    owners are re-ranked on the leaderboard once it commits. Call it in
+    the transaction that closed the trades.
+    """
+    deltas = defaultdict(lambda: {
+        'total_trades': 0,
+        'winning_trades': 0,
+        'losing_trades': 0,
+        'total_pnl': Decimal('0'),
+    })
+    for trade in trades:
+        delta = deltas[trade.user_id]
+        delta['total_trades'] += 1
+        delta['winning_trades'] += trade.pnl > 0
+        delta['losing_trades'] += trade.pnl < 0
+        delta['total_pnl'] += trade.pnl
+
+    now = timezone.now()
+    for user_id, delta in deltas.items():
+        total_trades = F('total_trades') + delta['total_trades']
+        winning_trades = F('winning_trades') + delta['winning_trades']
+        total_pnl = F('total_pnl') + delta['total_pnl']
+
+        updated = Portfolio.objects.filter(user_id=user_id).update(
+            total_trades=total_trades,
+            winning_trades=winning_trades,
+            losing_trades=F('losing_trades') + delta['losing_trades'],
+            total_pnl=total_pnl,
+            win_rate=(
+                Cast(winning_trades, FloatField()) * 100 / total_trades
+            ),
+            total_pnl_percent=total_pnl * 100 / INITIAL_BALANCE,
+            # update() bypasses auto_now
+            updated_at=now,
+        )
+        if not updated:
+            # No portfolio yet; the trades are already committed to this
+            # transaction, so building it from history includes them.
+            recompute_stats(user_id)
+
+    on_trades_closed(deltas)
@@ -0,0 +1,150 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from trading.models import Trade
+from trading.services.pnl import unrealized_pnl
+from .stats import get_portfolio
+
+
+def _version_key(user_id):
+    return f'summary_version_{user_id}'
+
+
+def summary_version(user_id):
+    """The user's current summary version, started on first use."""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a counter lost to eviction or a
+        # restart never repeats a version a client holds an ETag for.
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_summary_version(user_ids):
+    """
+    Invalidate the cached summaries of these users.
+
+    The bump runs once the current transaction commits, so a summary
+    read in between is never cached under the new version.
+    """
+    user_ids = list(user_ids)
+
+    def bump():
+        for user_id in user_ids:
+            try:
+                cache.incr(_version_key(user_id))
+            except ValueError:
+                summary_version(user_id)
+
+    transaction.on_commit(bump)
+
+
+def load_summary(user):
+    """
+    The price-independent part of the user's summary.
+
+    Holds the balance, portfolio stats and open positions, and is
+    cached until the summary version changes (a trade opens or closes,
+    an order is placed, cancelled or filled, or the balance is reset).
+    Versions are bumped in the cache of the process that ran the trade,
+    so without a shared cache the entry is read from the database every
+    time and versioned by its content instead.
+    """
+    if not settings.SHARED_CACHE:
+        entry = _read_entry(user)
+        digest = hashlib.sha256(repr(sorted(entry.items())).encode())
+        entry['version'] = digest.hexdigest()[:32]
+        return entry
+
+    version = summary_version(user.pk)
+    key = f'summary_{user.pk}_{version}'
+    entry = cache.get(key)
+    if entry is None:
+        entry = dict(_read_entry(user), version=version)
+        cache.set(key, entry, settings.SUMMARY_CACHE_TTL)
+    return entry
+
+
+def _read_entry(user):
+    """Balance, portfolio stats and open positions from the database."""
+    portfolio = get_portfolio(user)
+    positions = list(
+        Trade.objects.filter(user=user, status='OPEN').values_list(
+            'id', 'asset__symbol', 'trade_type', 'quantity',
+            'entry_price', 'asset__api_source'
+        )
+    )
+    return {
+        'account_balance': portfolio.user.account_balance,
+        'realized_pnl': portfolio.total_pnl,
+        'win_rate': portfolio.win_rate,
+        'total_trades': portfolio.total_trades,
+        'winning_trades': portfolio.winning_trades,
+        'losing_trades': portfolio.losing_trades,
+        'positions': positions,
+        'sources': {row[1]: row[5] for row in positions},
+    }
+
+
+def summary_etag(entry, prices):
+    """Tag of a summary: its version and the prices it is marked at."""
+    marks = '|'.join(
+        f'{symbol}={prices.get(symbol)}' for symbol in sorted(entry['sources'])
+    )
+    digest = hashlib.sha256(f'{entry["version"]}|{marks}'.encode())
+    return digest.hexdigest()[:32]
+
+
+def build_summary(user, entry, prices, etag):
+    """
+    The summary marked at ``prices``.
+
+    The open positions are only revalued when the ETag changes, i.e.
+    when the version moves or a price ticks (with a shared cache).
+    """
+    key = f'summary_body_{user.pk}_{etag}'
+    if settings.SHARED_CACHE:
+        summary = cache.get(key)
+        if summary is not None:
+            return summary
+
+    positions = entry['positions']
+    pnls = unrealized_pnl((row[:5] for row in positions), prices)
+
+    total_open_value = 0
+    total_unrealized_pnl = 0
+
+    for trade_id, symbol, _, quantity, _, _ in positions:
+        if trade_id in pnls:
+            total_open_value += quantity * prices[symbol]
+            total_unrealized_pnl += pnls[trade_id][0]
+
+    # Total equity = balance + open positions value
+    account_balance = entry['account_balance']
+    total_equity = account_balance + total_open_value
+
+    summary = {
+        'account_balance': str(account_balance),
+        'open_positions_value': str(round(total_open_value, 2)),
+        'total_equity': str(round(total_equity, 2)),
+        'unrealized_pnl': str(round(total_unrealized_pnl, 2)),
+        'realized_pnl': str(entry['realized_pnl']),
+        'total_pnl': str(
+            round(entry['realized_pnl'] + total_unrealized_pnl, 2)
+        ),
+        'win_rate': str(entry['win_rate']),
+        'total_trades': entry['total_trades'],
+        'winning_trades': entry['winning_trades'],
+        'losing_trades': entry['losing_trades'],
+        'open_trades_count': len(positions),
+    }
+    if settings.SHARED_CACHE:
+        cache.set(key, summary, settings.SUMMARY_CACHE_TTL)
+    return summary
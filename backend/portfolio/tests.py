@@ -1,11 +1,31 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
 from rest_framework import status
 from decimal import Decimal
-
-from .models import Portfolio, Watchlist
+from io import StringIO
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management import call_command
+from django.utils import timezone
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import random
+
+import numpy as np
+
+from .models import EquitySnapshot, Portfolio, Watchlist
+from .services.analytics import pnl_metrics, return_metrics
+from .services.leaderboard import Leaderboard, RankedSet
+from .services.equity import (
+    pick_resolution,
+    prune_equity_snapshots,
+    record_equity_snapshots,
+)
 from trading.models import Asset, Trade
+from trading.services.execution import close_trades
 
 User = get_user_model()
 
@@ -72,6 +92,438 @@ class PortfolioModelTest(TestCase):
         self.assertEqual(self.portfolio.win_rate, Decimal('50.00'))
 
 
+class IncrementalStatsTest(APITestCase):
+    """Tests for portfolio stats kept up to date on close."""
+
+    def setUp(self):
+        """Create a user with a portfolio and open trades."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.portfolio = Portfolio.objects.create(user=self.user)
+        self.asset = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        self.trades = [
+            Trade.objects.create(
+                user=self.user,
+                asset=self.asset,
+                quantity=Decimal('0.1'),
+                entry_price=Decimal('50000.00'),
+            )
+            for _ in range(3)
+        ]
+
+    def test_close_applies_deltas(self):
+        """Test closing trades bumps the counters and PnL."""
+        close_trades({
+            self.trades[0].id: Decimal('55000'),
+            self.trades[1].id: Decimal('48000'),
+        })
+        close_trades({self.trades[2].id: Decimal('51000')})
+
+        self.portfolio.refresh_from_db()
+        self.assertEqual(self.portfolio.total_trades, 3)
+        self.assertEqual(self.portfolio.winning_trades, 2)
+        self.assertEqual(self.portfolio.losing_trades, 1)
+        self.assertEqual(self.portfolio.total_pnl, Decimal('400.00'))
+        self.assertEqual(self.portfolio.win_rate, Decimal('66.67'))
+        self.assertEqual(self.portfolio.total_pnl_percent, Decimal('4.00'))
+
+    def test_reads_do_not_write(self):
+        """Test portfolio GETs are read-only."""
+        self.client.force_authenticate(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/portfolio/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(all(
+            query['sql'].startswith('SELECT') for query in queries
+        ))
+
+    def test_repair(self):
+        """Test the repair command finds and fixes drifted stats."""
+        close_trades({self.trades[0].id: Decimal('55000')})
+        Portfolio.objects.filter(pk=self.portfolio.pk).update(total_trades=9)
+        out = StringIO()
+
+        call_command('repair_portfolio_stats', stdout=out)
+        self.assertIn('1 portfolios differ', out.getvalue())
+        call_command('repair_portfolio_stats', fix=True, stdout=out)
+        call_command('repair_portfolio_stats', stdout=out)
+
+        self.assertIn('All portfolios match', out.getvalue())
+        self.portfolio.refresh_from_db()
+        self.assertEqual(self.portfolio.total_trades, 1)
+
+
+class EquitySnapshotTest(APITestCase):
+    """Tests for equity snapshots, rollups and the equity endpoint."""
+
+    def setUp(self):
+        """Create a user with one open position."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.user.account_balance = Decimal('5000.00')
+        self.user.save()
+        asset = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        Trade.objects.create(
+            user=self.user,
+            asset=asset,
+            quantity=Decimal('0.1'),
+            entry_price=Decimal('50000.00'),
+        )
+        self.service = MagicMock()
+        self.now = datetime(2026, 3, 1, 12, 30, 15, tzinfo=dt_timezone.utc)
+        self.client.force_authenticate(user=self.user)
+
+    def record(self, price, now):
+        self.service.get_prices.return_value = {'BTC': Decimal(price)}
+        return record_equity_snapshots(self.service, now=now)
+
+    def test_record_writes_every_resolution(self):
+        """Test a snapshot fills the minute, hour and day buckets."""
+        self.assertEqual(self.record('51000', self.now), 1)
+
+        snapshots = EquitySnapshot.objects.filter(user=self.user)
+        self.assertEqual(
+            sorted(snapshots.values_list('resolution', flat=True)),
+            ['1d', '1h', '1m']
+        )
+        minute = snapshots.get(resolution='1m')
+        self.assertEqual(
+            minute.bucket, self.now.replace(second=0)
+        )
+        self.assertEqual(minute.open_value, Decimal('5100.00'))
+        self.assertEqual(minute.unrealized_pnl, Decimal('100.00'))
+        self.assertEqual(minute.equity, Decimal('10100.00'))
+
+    def test_rollup_keeps_last_value(self):
+        """Test later snapshots overwrite their hour and day buckets."""
+        self.record('51000', self.now)
+        self.record('52000', self.now + timedelta(minutes=5))
+
+        self.assertEqual(
+            EquitySnapshot.objects.filter(resolution='1m').count(), 2
+        )
+        hour = EquitySnapshot.objects.get(resolution='1h')
+        self.assertEqual(hour.equity, Decimal('10200.00'))
+
+    def test_idle_users_are_skipped(self):
+        """Test users without positions or recent closes are not recorded."""
+        Trade.objects.update(status='CLOSED', closed_at=self.now)
+
+        recorded = self.record(
+            '51000', self.now + timedelta(hours=1)
+        )
+
+        self.assertEqual(recorded, 0)
+
+    def test_prune(self):
+        """Test minute rows past retention are dropped, days are kept."""
+        self.record('51000', self.now - timedelta(days=3))
+
+        prune_equity_snapshots(now=self.now)
+
+        self.assertEqual(
+            set(EquitySnapshot.objects.values_list('resolution', flat=True)),
+            {'1h', '1d'}
+        )
+
+    def test_pick_resolution(self):
+        """Test auto resolution stays within the point budget."""
+        now = timezone.now()
+
+        self.assertEqual(
+            pick_resolution(now - timedelta(hours=6), now), '1m'
+        )
+        self.assertEqual(
+            pick_resolution(now - timedelta(days=20), now), '1h'
+        )
+        self.assertEqual(
+            pick_resolution(now - timedelta(days=365), now), '1d'
+        )
+
+    def test_equity_endpoint(self):
+        """Test the endpoint returns the points of one resolution."""
+        self.record('51000', self.now)
+        self.record('52000', self.now + timedelta(minutes=1))
+
+        response = self.client.get('/api/portfolio/equity/', {
+            'start': self.now - timedelta(hours=1),
+            'end': self.now + timedelta(hours=1),
+            'resolution': '1m',
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['resolution'], '1m')
+        self.assertEqual(
+            [point['equity'] for point in response.data['points']],
+            ['10100.00', '10200.00']
+        )
+
+
+class AnalyticsTest(APITestCase):
+    """Tests for the risk analytics and the analytics endpoint."""
+
+    def setUp(self):
+        """Create a user with a portfolio and open trades."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        Portfolio.objects.create(user=self.user)
+        self.asset = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        self.trades = [
+            Trade.objects.create(
+                user=self.user,
+                asset=self.asset,
+                quantity=Decimal('0.1'),
+                entry_price=Decimal('50000.00'),
+            )
+            for _ in range(3)
+        ]
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+    def test_pnl_metrics(self):
+        """Test profit factor, averages and realized drawdown."""
+        metrics = pnl_metrics(np.array([500.0, -300.0, -200.0, 400.0]))
+
+        self.assertEqual(metrics['trades'], 4)
+        self.assertEqual(metrics['profit_factor'], 1.8)
+        self.assertEqual(metrics['average_win'], 450.0)
+        self.assertEqual(metrics['average_loss'], -250.0)
+        self.assertEqual(metrics['expectancy'], 100.0)
+        # Peak 10500 -> trough 10000
+        self.assertEqual(metrics['max_drawdown'], 500.0)
+        self.assertEqual(metrics['max_drawdown_percent'], 4.76)
+
+    def test_pnl_metrics_empty(self):
+        """Test a user without closed trades gets zeroed metrics."""
+        metrics = pnl_metrics(np.empty(0))
+
+        self.assertEqual(metrics['trades'], 0)
+        self.assertIsNone(metrics['profit_factor'])
+        self.assertEqual(metrics['max_drawdown'], 0.0)
+
+    def test_return_metrics(self):
+        """Test Sharpe, Sortino and rolling volatility of daily equity."""
+        returns = np.array([0.01, -0.02, 0.03, 0.01, -0.01])
+        equity = 10000 * np.concatenate(([1.0], np.cumprod(1 + returns)))
+
+        risk, rolling = return_metrics(equity, window=3)
+
+        annualize = np.sqrt(365)
+        std = returns.std(ddof=1)
+        downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+        self.assertAlmostEqual(
+            risk['sharpe_ratio'], returns.mean() / std * annualize, 3
+        )
+        self.assertAlmostEqual(
+            risk['sortino_ratio'], returns.mean() / downside * annualize, 3
+        )
+        self.assertEqual(len(rolling), 3)
+        self.assertAlmostEqual(
+            rolling[-1], returns[-3:].std(ddof=1) * annualize
+        )
+
+    def test_return_metrics_short_history(self):
+        """Test ratios are undefined without enough daily points."""
+        risk, rolling = return_metrics(np.array([10000.0, 10100.0]))
+
+        self.assertIsNone(risk['sharpe_ratio'])
+        self.assertEqual(len(rolling), 0)
+
+    def test_endpoint_cached_until_close(self):
+        """Test analytics are cached and refreshed by a close."""
+        close_trades({self.trades[0].id: Decimal('55000')})
+
+        response = self.client.get('/api/portfolio/analytics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['trades'], 1)
+        self.assertIsNone(response.data['profit_factor'])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/portfolio/analytics/')
+        self.assertFalse(any(
+            'trading_trade' in query['sql'] for query in queries
+        ))
+
+        close_trades({self.trades[1].id: Decimal('48000')})
+        response = self.client.get('/api/portfolio/analytics/')
+
+        self.assertEqual(response.data['trades'], 2)
+        self.assertEqual(response.data['profit_factor'], 2.5)
+        self.assertEqual(response.data['max_drawdown'], 200.0)
+
+
+class RankedSetTest(TestCase):
+    """Tests for the order-statistic treap behind the leaderboard."""
+
+    def test_matches_sorted_list(self):
+        """Test rank, slice and remove agree with a sorted list."""
+        rng = random.Random(7)
+        ranked, keys = RankedSet(), []
+        for key in rng.sample(range(10000), 500):
+            ranked.insert(key, str(key))
+            keys.append(key)
+        for key in rng.sample(keys, 200):
+            self.assertTrue(ranked.remove(key))
+            keys.remove(key)
+        keys.sort()
+
+        self.assertEqual(len(ranked), 300)
+        self.assertFalse(ranked.remove(-1))
+        self.assertIsNone(ranked.rank(-1))
+        for index in (0, 1, 150, 299):
+            self.assertEqual(ranked.rank(keys[index]), index)
+        self.assertEqual(
+            ranked.slice(95, 105),
+            [(key, str(key)) for key in keys[95:105]]
+        )
+        self.assertEqual(len(ranked.slice(290, 400)), 10)
+
+
+class LeaderboardTest(APITestCase):
+    """Tests for the leaderboard and its endpoints."""
+
+    def setUp(self):
+        """Create ranked users across two tiers."""
+        self.users = []
+        for i, (pnl, tier) in enumerate([
+            ('300.00', 'BASIC'),
+            ('100.00', 'PRO'),
+            ('-50.00', 'BASIC'),
+            ('200.00', 'PRO'),
+        ]):
+            user = User.objects.create_user(
+                username=f'trader{i}',
+                email=f'trader{i}@test.com',
+                password='testpass123',
+                trading_tier=tier,
+            )
+            portfolio = Portfolio(user=user)
+            portfolio.set_stats(2, 1, 1, Decimal(pnl))
+            portfolio.save()
+            self.users.append(user)
+
+        self.leaderboard = Leaderboard()
+        patcher = patch(
+            'portfolio.views.get_leaderboard', return_value=self.leaderboard
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(user=self.users[2])
+
+    def usernames(self, rows):
+        return [row['username'] for row in rows]
+
+    def test_top(self):
+        """Test the top of the overall and per-tier boards."""
+        self.leaderboard.load()
+
+        self.assertEqual(
+            self.usernames(self.leaderboard.top('pnl_percent', limit=3)),
+            ['trader0', 'trader3', 'trader1']
+        )
+        self.assertEqual(
+            self.usernames(self.leaderboard.top('pnl_percent', 'PRO')),
+            ['trader3', 'trader1']
+        )
+
+    def test_around(self):
+        """Test a user's rank and neighbours, and unranked users."""
+        self.leaderboard.load()
+
+        rank, rows = self.leaderboard.around(
+            'pnl_percent', 'ALL', self.users[3].pk, radius=1
+        )
+        self.assertEqual(rank, 2)
+        self.assertEqual(
+            self.usernames(rows), ['trader0', 'trader3', 'trader1']
+        )
+        self.assertEqual(
+            self.leaderboard.around('pnl_percent', 'PRO', self.users[0].pk),
+            (None, [])
+        )
+
+    def test_close_reranks(self):
+        """Test a committed close moves the user on the boards."""
+        asset = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        trade = Trade.objects.create(
+            user=self.users[2],
+            asset=asset,
+            quantity=Decimal('1'),
+            entry_price=Decimal('50000.00'),
+        )
+        self.leaderboard.load()
+
+        with patch('portfolio.services.leaderboard._leaderboard',
+                   self.leaderboard):
+            with self.captureOnCommitCallbacks(execute=True):
+                close_trades({trade.id: Decimal('51000')})
+
+        rank, _ = self.leaderboard.around(
+            'pnl_percent', 'ALL', self.users[2].pk
+        )
+        self.assertEqual(rank, 1)
+
+    def test_endpoints(self):
+        """Test the top-N and my-rank endpoints."""
+        response = self.client.get(
+            '/api/portfolio/leaderboard/', {'limit': 2}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(
+            self.usernames(response.data['results']), ['trader0', 'trader3']
+        )
+        self.assertEqual(response.data['results'][0]['score'], '3.00')
+
+        response = self.client.get(
+            '/api/portfolio/leaderboard/me/', {'tier': 'BASIC', 'radius': 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rank'], 2)
+        self.assertEqual(
+            self.usernames(response.data['results']), ['trader0', 'trader2']
+        )
+
+    def test_invalid_metric(self):
+        """Test unknown metrics are rejected."""
+        response = self.client.get(
+            '/api/portfolio/leaderboard/', {'metric': 'balance'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class WatchlistModelTest(TestCase):
     """Tests for Watchlist model."""
 
@@ -142,6 +594,135 @@ class PortfolioViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class PortfolioSummaryViewTest(APITestCase):
+    """Tests for portfolio summary endpoint."""
+
+    def setUp(self):
+        """Create test user with open trades on both sides."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        asset = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        for trade_type in ['BUY', 'SELL']:
+            Trade.objects.create(
+                user=self.user,
+                asset=asset,
+                trade_type=trade_type,
+                quantity=Decimal('0.1'),
+                entry_price=Decimal('50000.00'),
+            )
+        self.user.account_balance = Decimal('0.00')
+        self.user.save()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+    @patch('portfolio.views.get_price_service')
+    def test_summary(self, mock_price_service):
+        """Test open value and unrealized PnL across positions."""
+        mock_price_service.return_value.get_prices.return_value = {
+            'BTC': Decimal('51000.00'),
+        }
+
+        response = self.client.get('/api/portfolio/summary/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['open_positions_value'], '10200.00')
+        # +100 on the long, -100 on the short
+        self.assertEqual(response.data['unrealized_pnl'], '0.00')
+        self.assertEqual(response.data['open_trades_count'], 2)
+        self.assertEqual(
+            response['Cache-Control'], 'private, no-cache'
+        )
+
+    @override_settings(SHARED_CACHE=True)
+    @patch('portfolio.views.get_price_service')
+    def test_not_modified(self, mock_price_service):
+        """Test an unchanged summary is a 304 and a tick changes it."""
+        prices = mock_price_service.return_value.get_prices
+        prices.return_value = {'BTC': Decimal('51000.00')}
+
+        etag = self.client.get('/api/portfolio/summary/')['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                '/api/portfolio/summary/', HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(any(
+            'trading_trade' in query['sql'] for query in queries
+        ))
+
+        prices.return_value = {'BTC': Decimal('52000.00')}
+        response = self.client.get(
+            '/api/portfolio/summary/', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @patch('portfolio.views.get_price_service')
+    def test_trade_events_invalidate(self, mock_price_service):
+        """Test closing a trade and resetting the balance bump the version."""
+        mock_price_service.return_value.get_prices.return_value = {
+            'BTC': Decimal('51000.00'),
+        }
+        etag = self.client.get('/api/portfolio/summary/')['ETag']
+
+        trade = Trade.objects.get(user=self.user, trade_type='BUY')
+        with self.captureOnCommitCallbacks(execute=True):
+            close_trades({trade.id: Decimal('51000.00')})
+        response = self.client.get(
+            '/api/portfolio/summary/', HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['open_trades_count'], 1)
+        self.assertEqual(response.data['account_balance'], '5100.00')
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/auth/balance/reset/')
+        response = self.client.get(
+            '/api/portfolio/summary/', HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['account_balance'], '10000.00')
+
+    @override_settings(SHARED_CACHE=False)
+    @patch('portfolio.views.get_price_service')
+    def test_per_process_cache_is_not_used(self, mock_price_service):
+        """Test a change made by another worker shows up at once."""
+        mock_price_service.return_value.get_prices.return_value = {
+            'BTC': Decimal('51000.00'),
+        }
+        etag = self.client.get('/api/portfolio/summary/')['ETag']
+        unchanged = self.client.get(
+            '/api/portfolio/summary/', HTTP_IF_NONE_MATCH=etag
+        )
+
+        # No version bump reaches this process's cache
+        User.objects.filter(pk=self.user.pk).update(
+            account_balance=Decimal('250.00')
+        )
+        response = self.client.get(
+            '/api/portfolio/summary/', HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(
+            unchanged.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['account_balance'], '250.00')
+
+
 class WatchlistViewTest(APITestCase):
     """Tests for watchlist endpoints."""
 
@@ -2,6 +2,10 @@ from django.urls import path
 from .views import (
     PortfolioView,
     PortfolioSummaryView,
+    EquityCurveView,
+    PortfolioAnalyticsView,
+    LeaderboardView,
+    LeaderboardMeView,
     WatchlistView,
     AddToWatchlistView,
     RemoveFromWatchlistView,
@@ -11,6 +15,20 @@ urlpatterns = [
     # Portfolio
     path('', PortfolioView.as_view(), name='portfolio'),
     path('summary/', PortfolioSummaryView.as_view(), name='portfolio-summary'),
+    path('equity/', EquityCurveView.as_view(), name='portfolio-equity'),
+    path(
+        'analytics/',
+        PortfolioAnalyticsView.as_view(),
+        name='portfolio-analytics'
+    ),
+
+    # Leaderboard
+    path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path(
+        'leaderboard/me/',
+        LeaderboardMeView.as_view(),
+        name='leaderboard-me'
+    ),
 
     # Watchlist
     path('watchlist/', WatchlistView.as_view(), name='watchlist'),
@@ -2,16 +2,27 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from datetime import timedelta
 
-from .models import Portfolio, Watchlist
+from .models import EquitySnapshot, Watchlist
 from .serializers import (
     PortfolioSerializer,
     WatchlistSerializer,
     AddToWatchlistSerializer,
+    EquityQuerySerializer,
+    LeaderboardQuerySerializer,
+    LeaderboardRowSerializer,
 )
-from trading.models import Asset, Trade
-from trading.services.price_service import PriceService
+from .services.analytics import get_analytics
+from .services.equity import pick_resolution
+from .services.leaderboard import get_leaderboard
+from .services.stats import get_portfolio
+from .services.summary import build_summary, load_summary, summary_etag
+from trading.models import Asset
+from trading.services.price_service import get_price_service
 
 
 class PortfolioView(APIView):
@@ -24,11 +35,8 @@ class PortfolioView(APIView):
     def get(self, request):
         user = request.user
 
-        # Get or create portfolio
-        portfolio, created = Portfolio.objects.get_or_create(user=user)
-
-        # Update stats
-        portfolio.update_stats()
+        # Stats are kept up to date as trades close
+        portfolio = get_portfolio(user)
 
         serializer = PortfolioSerializer(portfolio)
         return Response(serializer.data)
@@ -44,47 +52,140 @@ class PortfolioSummaryView(APIView):
     def get(self, request):
         user = request.user
 
-        # Get portfolio
-        portfolio, created = Portfolio.objects.get_or_create(user=user)
-        portfolio.update_stats()
+        # Balance, stats and positions, cached until the next trade event
+        # when the cache is shared between workers
+        entry = load_summary(user)
+
+        # The ETag covers the version and the prices, so an unchanged
+        # summary is answered before any revaluation
+        price_service = get_price_service()
+        sources = entry['sources']
+        prices = price_service.get_prices(list(sources), sources=sources)
+        etag = summary_etag(entry, prices)
+
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if '*' in if_none_match or quote_etag(etag) in {
+            tag.removeprefix('W/') for tag in if_none_match
+        }:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(build_summary(user, entry, prices, etag))
+
+        response['ETag'] = quote_etag(etag)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class EquityCurveView(APIView):
+    """
+    GET /api/portfolio/equity/?start=&end=&resolution=auto|1m|1h|1d
+    Get the user's equity curve over a time range (default: last 30
+    days). With resolution=auto the finest stored resolution that fits
+    in EQUITY_MAX_POINTS points is used.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = EquityQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        params = serializer.validated_data
+        end = params.get('end') or timezone.now()
+        start = params.get('start') or end - timedelta(days=30)
+        resolution = params['resolution']
+        if resolution == 'auto':
+            resolution = pick_resolution(start, end)
+
+        points = EquitySnapshot.objects.filter(
+            user=request.user,
+            resolution=resolution,
+            bucket__gte=start,
+            bucket__lt=end,
+        ).values_list(
+            'bucket', 'balance', 'open_value', 'unrealized_pnl', 'equity'
+        )
+
+        return Response({
+            'resolution': resolution,
+            'start': start,
+            'end': end,
+            'points': [
+                {
+                    't': bucket,
+                    'balance': str(balance),
+                    'open_value': str(open_value),
+                    'unrealized_pnl': str(pnl),
+                    'equity': str(equity),
+                }
+                for bucket, balance, open_value, pnl, equity in points
+            ],
+        })
+
+
+class PortfolioAnalyticsView(APIView):
+    """
+    GET /api/portfolio/analytics/
+    Get risk analytics: Sharpe and Sortino ratios, volatility and rolling
+    volatility from daily equity, and profit factor, average win / loss
+    and max drawdown from closed trades.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(get_analytics(request.user))
 
-        # Get open positions
-        open_trades = Trade.objects.filter(user=user, status='OPEN')
 
-        # Calculate total open positions value
-        price_service = PriceService(
-            alpha_vantage_key=settings.ALPHA_VANTAGE_KEY
+class LeaderboardView(APIView):
+    """
+    GET /api/portfolio/leaderboard/?metric=pnl_percent|win_rate&tier=&limit=
+    Get the top users by a metric, overall (tier=ALL) or in one tier.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = LeaderboardQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        leaderboard = get_leaderboard()
+        leaderboard.sync()
+        rows = leaderboard.top(
+            params['metric'], params['tier'], params['limit']
         )
 
-        total_open_value = 0
-        total_unrealized_pnl = 0
+        return Response({
+            'metric': params['metric'],
+            'tier': params['tier'],
+            'total': leaderboard.size(params['metric'], params['tier']),
+            'results': LeaderboardRowSerializer(rows, many=True).data,
+        })
 
-        for trade in open_trades:
-            current_price = price_service.get_price(trade.asset.symbol)
-            if current_price:
-                position_value = trade.quantity * current_price
-                total_open_value += position_value
 
-                pnl, _ = trade.calculate_pnl(current_price)
-                total_unrealized_pnl += pnl
+class LeaderboardMeView(APIView):
+    """
+    GET /api/portfolio/leaderboard/me/?metric=&tier=&radius=
+    Get the current user's rank and the users ranked around them.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = LeaderboardQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
 
-        # Total equity = balance + open positions value
-        total_equity = user.account_balance + total_open_value
+        leaderboard = get_leaderboard()
+        leaderboard.sync()
+        rank, rows = leaderboard.around(
+            params['metric'], params['tier'], request.user.pk,
+            params['radius']
+        )
 
         return Response({
-            'account_balance': str(user.account_balance),
-            'open_positions_value': str(round(total_open_value, 2)),
-            'total_equity': str(round(total_equity, 2)),
-            'unrealized_pnl': str(round(total_unrealized_pnl, 2)),
-            'realized_pnl': str(portfolio.total_pnl),
-            'total_pnl': str(
-                round(portfolio.total_pnl + total_unrealized_pnl, 2)
-            ),
-            'win_rate': str(portfolio.win_rate),
-            'total_trades': portfolio.total_trades,
-            'winning_trades': portfolio.winning_trades,
-            'losing_trades': portfolio.losing_trades,
-            'open_trades_count': open_trades.count(),
+            'metric': params['metric'],
+            'tier': params['tier'],
+            'rank': rank,
+            'total': leaderboard.size(params['metric'], params['tier']),
+            'results': LeaderboardRowSerializer(rows, many=True).data,
         })
 
 
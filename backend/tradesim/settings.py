@@ -3,6 +3,8 @@ from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
 import dj_database_url
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 
 # Load .env file
 load_dotenv()
@@ -105,6 +107,38 @@ else:
         }
     }
 
+# Cache
+# Prices, refresh locks, rate budgets and summary versions are shared
+# between the web workers and the price feed through the cache, so
+# production needs a cache every process can reach: Redis via REDIS_URL,
+# or CACHE_BACKEND=database (run createcachetable first).
+# Without either each process gets its own in-memory cache.
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif CACHE_BACKEND == 'database':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+SHARED_CACHE = bool(REDIS_URL) or CACHE_BACKEND == 'database'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -180,6 +214,9 @@ if FRONTEND_URL:
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
 
+# Let clients send Idempotency-Key on trade requests
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 # Allauth Settings
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_AUTHENTICATION_METHOD = 'email'
@@ -194,6 +231,119 @@ REST_AUTH = {
 # Alpha Vantage API Key
 ALPHA_VANTAGE_KEY = os.environ.get('ALPHA_VANTAGE_KEY', '')
 
+# Alpha Vantage quota, shared by all workers. A share of it is reserved
+# for trade execution; dashboard refreshes are skipped when it runs low.
+ALPHA_VANTAGE_CALLS_PER_MINUTE = int(
+    os.environ.get('ALPHA_VANTAGE_CALLS_PER_MINUTE', 5)
+)
+ALPHA_VANTAGE_CALLS_PER_DAY = int(
+    os.environ.get('ALPHA_VANTAGE_CALLS_PER_DAY', 25)
+)
+ALPHA_VANTAGE_TRADE_RESERVE = float(
+    os.environ.get('ALPHA_VANTAGE_TRADE_RESERVE', 0.4)
+)
+# Seconds a trade lookup may wait for a budget token
+ALPHA_VANTAGE_TRADE_WAIT = float(os.environ.get('ALPHA_VANTAGE_TRADE_WAIT', 5))
+
+# Price fetching
+# Max parallel upstream calls per price list request
+PRICE_FETCH_MAX_WORKERS = int(os.environ.get('PRICE_FETCH_MAX_WORKERS', 8))
+
+# Upstream HTTP: pooled keep-alive connections per provider host
+PRICE_HTTP_POOL_SIZE = int(os.environ.get('PRICE_HTTP_POOL_SIZE', 10))
+PRICE_HTTP_CONNECT_TIMEOUT = float(
+    os.environ.get('PRICE_HTTP_CONNECT_TIMEOUT', 3.05)
+)
+PRICE_HTTP_READ_TIMEOUT = float(os.environ.get('PRICE_HTTP_READ_TIMEOUT', 10))
+# Retries on 429/5xx with exponential backoff (backoff * 2 ** attempt).
+# Read timeouts are never retried and Retry-After is capped in seconds.
+PRICE_HTTP_MAX_RETRIES = int(os.environ.get('PRICE_HTTP_MAX_RETRIES', 2))
+PRICE_HTTP_BACKOFF = float(os.environ.get('PRICE_HTTP_BACKOFF', 0.5))
+PRICE_HTTP_MAX_RETRY_AFTER = float(
+    os.environ.get('PRICE_HTTP_MAX_RETRY_AFTER', 2)
+)
+
+# Single-flight refresh: one caller fetches an expired symbol, others wait
+# up to PRICE_LOCK_WAIT seconds or get the previous price
+PRICE_LOCK_TIMEOUT = int(os.environ.get('PRICE_LOCK_TIMEOUT', 15))
+PRICE_LOCK_WAIT = float(os.environ.get('PRICE_LOCK_WAIT', 2))
+
+# Two-tier price cache: an in-process LRU in front of the Django cache.
+# Prices older than 30s are served stale and refreshed in the background
+# until PRICE_CACHE_HARD_TTL seconds, after which callers wait on upstream.
+# Opening or closing a trade only ever uses a price under 30s old.
+PRICE_LOCAL_CACHE_SIZE = int(os.environ.get('PRICE_LOCAL_CACHE_SIZE', 1024))
+PRICE_LOCAL_CACHE_TTL = float(os.environ.get('PRICE_LOCAL_CACHE_TTL', 2))
+PRICE_CACHE_HARD_TTL = int(os.environ.get('PRICE_CACHE_HARD_TTL', 300))
+
+# Circuit breaker per provider: open after N consecutive failures, then
+# let one probe through every PRICE_BREAKER_RESET seconds
+PRICE_BREAKER_FAILURES = int(os.environ.get('PRICE_BREAKER_FAILURES', 5))
+PRICE_BREAKER_RESET = int(os.environ.get('PRICE_BREAKER_RESET', 30))
+# Seconds a symbol that failed to price is not looked up again
+PRICE_NEGATIVE_CACHE_TTL = int(os.environ.get('PRICE_NEGATIVE_CACHE_TTL', 15))
+
+# Price stream (Server-Sent Events): seconds between ingest ticks and
+# between keep-alive comments on idle streams
+PRICE_STREAM_INTERVAL = float(os.environ.get('PRICE_STREAM_INTERVAL', 2))
+PRICE_STREAM_HEARTBEAT = int(os.environ.get('PRICE_STREAM_HEARTBEAT', 15))
+
+# Price feed worker (manage.py run_price_feed)
+# When enabled, API views only read cached prices written by the worker
+PRICE_FEED_ENABLED = os.environ.get('PRICE_FEED_ENABLED', 'False') == 'True'
+if PRICE_FEED_ENABLED and not SHARED_CACHE:
+    # Views would read a per-process cache the worker never writes to
+    raise ImproperlyConfigured(
+        'PRICE_FEED_ENABLED needs a shared cache: set REDIS_URL or '
+        'CACHE_BACKEND=database.'
+    )
+# Refresh interval in seconds per Asset.api_source. Trades need a price
+# under 30s old and fetch one themselves when the feed's is older.
+PRICE_FEED_INTERVALS = {
+    'BINANCE': int(os.environ.get('PRICE_FEED_BINANCE_INTERVAL', 5)),
+    'ALPHAVANTAGE': int(
+        os.environ.get('PRICE_FEED_ALPHAVANTAGE_INTERVAL', 300)
+    ),
+}
+# A price not refreshed within this many seconds is dropped from the cache
+PRICE_FEED_MAX_STALENESS = int(
+    os.environ.get('PRICE_FEED_MAX_STALENESS', 900)
+)
+
+# Seconds between equity snapshots taken by the price feed
+EQUITY_SNAPSHOT_INTERVAL = int(
+    os.environ.get('EQUITY_SNAPSHOT_INTERVAL', 60)
+)
+# Seconds each equity resolution is kept (None = forever)
+EQUITY_RETENTION = {
+    '1m': int(os.environ.get('EQUITY_MINUTE_RETENTION', 2 * 86400)),
+    '1h': int(os.environ.get('EQUITY_HOUR_RETENTION', 90 * 86400)),
+    '1d': None,
+}
+# Most points the equity endpoint returns at automatic resolution
+EQUITY_MAX_POINTS = int(os.environ.get('EQUITY_MAX_POINTS', 500))
+
+# Seconds the risk analytics of a user are cached between trade closes
+ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL', 3600))
+# Days in the rolling volatility window of the analytics endpoint
+ANALYTICS_ROLLING_WINDOW = int(
+    os.environ.get('ANALYTICS_ROLLING_WINDOW', 30)
+)
+
+# Closed trades a user needs before appearing on the leaderboard
+LEADERBOARD_MIN_TRADES = int(os.environ.get('LEADERBOARD_MIN_TRADES', 1))
+
+# Seconds a cached portfolio summary is kept without a trade event
+# (summaries are only cached with a shared cache)
+SUMMARY_CACHE_TTL = int(os.environ.get('SUMMARY_CACHE_TTL', 300))
+
+# How long a response is kept for replay under its Idempotency-Key
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+# How long a request holds its Idempotency-Key while executing
+IDEMPOTENCY_LOCK_TIMEOUT = int(
+    os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 30)
+)
+
 # Security settings for production
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
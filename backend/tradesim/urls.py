@@ -20,14 +20,25 @@ def api_root(request):
             'trading': {
                 'assets': '/api/trading/assets/',
                 'prices': '/api/trading/prices/',
+                'price_stream': '/api/trading/prices/stream/',
                 'open_trade': '/api/trading/trades/open/',
+                'basket_order': '/api/trading/trades/basket/',
                 'close_trade': '/api/trading/trades/close/',
+                'close_all_trades': '/api/trading/trades/close-all/',
                 'positions': '/api/trading/trades/positions/',
                 'history': '/api/trading/trades/history/',
+                'export': '/api/trading/trades/export/<csv|ndjson>/',
+                'orders': '/api/trading/orders/',
+                'place_order': '/api/trading/orders/place/',
+                'cancel_order': '/api/trading/orders/cancel/',
             },
             'portfolio': {
                 'stats': '/api/portfolio/',
                 'summary': '/api/portfolio/summary/',
+                'equity': '/api/portfolio/equity/',
+                'analytics': '/api/portfolio/analytics/',
+                'leaderboard': '/api/portfolio/leaderboard/',
+                'leaderboard_me': '/api/portfolio/leaderboard/me/',
                 'watchlist': '/api/portfolio/watchlist/',
             },
         }
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Asset, Trade
+from .models import Asset, Order, Trade
 
 
 @admin.register(Asset)
@@ -11,4 +11,13 @@ class AssetAdmin(admin.ModelAdmin):
 @admin.register(Trade)
 class TradeAdmin(admin.ModelAdmin):
     list_display = ['user', 'asset', 'trade_type', 'quantity', 'entry_price', 'pnl', 'status']
-    list_filter = ['status', 'trade_type', 'asset']
\ No newline at end of file
+    list_filter = ['status', 'trade_type', 'asset']
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = [
+        'user', 'asset', 'order_type', 'trade_type',
+        'trigger_price', 'amount_usd', 'status'
+    ]
+    list_filter = ['status', 'order_type', 'trade_type', 'asset']
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+
+EXPORT_FIELDS = [
+    ('id', 'id'),
+    ('symbol', 'asset__symbol'),
+    ('trade_type', 'trade_type'),
+    ('quantity', 'quantity'),
+    ('entry_price', 'entry_price'),
+    ('exit_price', 'exit_price'),
+    ('stop_loss', 'stop_loss'),
+    ('take_profit', 'take_profit'),
+    ('pnl', 'pnl'),
+    ('pnl_percent', 'pnl_percent'),
+    ('opened_at', 'opened_at'),
+    ('closed_at', 'closed_at'),
+]
+
+# Rows fetched per round trip of the database cursor
+CHUNK_SIZE = 2000
+# Rows encoded into each piece of the response body
+BATCH_SIZE = 500
+
+
+def _value(value):
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _batches(queryset):
+    """Rows of the queryset, BATCH_SIZE at a time, in constant memory."""
+    rows = queryset.values_list(
+        *(lookup for _, lookup in EXPORT_FIELDS)
+    ).iterator(chunk_size=CHUNK_SIZE)
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return
+        yield [[_value(value) for value in row] for row in batch]
+
+
+def csv_chunks(queryset):
+    """Encode trades as CSV, yielding the header before any query."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(name for name, _ in EXPORT_FIELDS)
+    yield buffer.getvalue()
+
+    for batch in _batches(queryset):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(queryset):
+    """Encode trades as newline-delimited JSON, one object per line."""
+    names = [name for name, _ in EXPORT_FIELDS]
+    for batch in _batches(queryset):
+        yield ''.join(
+            json.dumps(dict(zip(names, row))) + '\n' for row in batch
+        )
+
+
+FORMATS = {
+    'csv': (csv_chunks, 'text/csv'),
+    'ndjson': (ndjson_chunks, 'application/x-ndjson'),
+}
+
+
+async def _aiter(chunks):
+    # Each chunk is produced in the sync thread that owns the DB
+    # connection, so the cursor stays open across chunks.
+    pull = sync_to_async(next)
+    while True:
+        chunk = await pull(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def stream(chunks, asynchronous=False):
+    """
+    The chunks as a StreamingHttpResponse body.
+
+    Under ASGI Django buffers sync iterators in full before sending
+    them, so the export is wrapped in an async iterator there.
+    """
+    return _aiter(chunks) if asynchronous else chunks
@@ -0,0 +1,113 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()[:16]
+
+
+def _claim(user, view, key, fingerprint):
+    """
+    Insert the key row for a request.
+
+    Returns ``(row, created)``; ``row`` is None if a concurrent request
+    removed the existing row in the meantime. Expired keys of the user
+    and a lock left behind by a worker that died are dropped first.
+    """
+    now = timezone.now()
+    IdempotencyKey.objects.filter(user=user).filter(
+        Q(created_at__lt=now - timedelta(
+            seconds=settings.IDEMPOTENCY_KEY_TTL
+        ))
+        | Q(view=view, key=key, status_code__isnull=True,
+            created_at__lt=now - timedelta(
+                seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT
+            ))
+    ).delete()
+
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, view=view, key=key, fingerprint=fingerprint
+            ), True
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(
+            user=user, view=view, key=key
+        ).first(), False
+
+
+def idempotent(view_method):
+    """
+    Make a POST handler honour the Idempotency-Key header.
+
+    The first response for a (user, view, key) is stored in the
+    IdempotencyKey table and replayed for retries without running the
+    view again, whichever worker they reach. While the first request is
+    still executing, duplicates get 409; reusing a key with a different
+    body gets 422. Server errors are not stored, so those can be
+    retried. Requests without the header run as usual.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most '
+                          f'{MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        fingerprint = _fingerprint(request)
+        stored, created = _claim(
+            request.user, type(self).__name__, digest, fingerprint
+        )
+
+        if created:
+            response = None
+            try:
+                response = view_method(self, request, *args, **kwargs)
+            finally:
+                if response is not None and response.status_code < 500:
+                    stored.status_code = response.status_code
+                    stored.response = response.data
+                    stored.save(update_fields=['status_code', 'response'])
+                else:
+                    stored.delete()
+            return response
+
+        if stored is None or stored.status_code is None:
+            return Response(
+                {'error': f'A request with this {HEADER} '
+                          f'is already in progress'},
+                status=status.HTTP_409_CONFLICT
+            )
+        if stored.fingerprint != fingerprint:
+            return Response(
+                {'error': f'{HEADER} was already used '
+                          f'with a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        response = Response(stored.response, status=stored.status_code)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    return wrapper
@@ -0,0 +1,204 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from trading.models import Asset, Trade
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the hot Trade queries against a large seeded table.
+
+    Seeds ``--trades`` trades spread over ``--users`` benchmark users,
+    then prints the query plan and median latency of each access path
+    and whether the plan uses the index meant for it. Works on SQLite
+    and PostgreSQL. The seeded users and trades are removed afterwards
+    unless ``--keep`` is given. Run it against a scratch database.
+    """
+
+    help = 'Seed trades and report plan and latency of the Trade queries.'
+
+    USER_PREFIX = 'bench_'
+    BATCH_SIZE = 10000
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trades', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Runs per query used for the median latency.',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data (reuse it with --trades 0).',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Database: {connection.vendor}')
+        users = self.seed_users(options['users'])
+        assets = list(Asset.objects.all()[:20]) or self.seed_assets()
+        if options['trades']:
+            self.seed_trades(users, assets, options['trades'])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        user = random.choice(users)
+        for name, queryset, index in self.queries(user, assets[0]):
+            self.report(name, queryset, index, options['repeat'])
+
+        if not options['keep']:
+            self.cleanup(users)
+
+    def queries(self, user, asset):
+        """(name, queryset, expected index) for each hot query."""
+        trades = Trade.objects.filter(user=user)
+        history = trades.filter(status='CLOSED').order_by('-closed_at', '-id')
+        middle = history.values_list('closed_at', 'id')[
+            history.count() // 2:
+        ].first() or (timezone.now(), 0)
+        return [
+            (
+                'open positions',
+                trades.filter(status='OPEN').order_by('-opened_at'),
+                'trade_user_status_opened_idx',
+            ),
+            (
+                'history first page',
+                history[:50],
+                'trade_user_closed_idx',
+            ),
+            (
+                'history deep page',
+                history.filter(closed_at__lte=middle[0]).filter(
+                    Q(closed_at__lt=middle[0]) | Q(id__lt=middle[1])
+                )[:50],
+                'trade_user_closed_idx',
+            ),
+            (
+                'portfolio stats',
+                trades.filter(status='CLOSED').values('user').annotate(
+                    total=Count('id'),
+                    winning=Count('id', filter=Q(pnl__gt=0)),
+                    total_pnl=Sum('pnl'),
+                ).order_by(),
+                'trade_user_',
+            ),
+            (
+                'open per asset',
+                Trade.objects.filter(
+                    asset=asset, status='OPEN'
+                ).values_list('id', flat=True).order_by(),
+                'trade_open_asset_idx',
+            ),
+        ]
+
+    def report(self, name, queryset, index, repeat):
+        plan = queryset.explain()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - start) * 1000)
+
+        uses_index = index in plan
+        self.stdout.write(
+            f'\n{name}: median {statistics.median(timings):.2f} ms, '
+            f'max {max(timings):.2f} ms over {repeat} runs'
+        )
+        self.stdout.write(plan)
+        if uses_index:
+            self.stdout.write(self.style.SUCCESS(f'uses {index}'))
+        else:
+            self.stdout.write(self.style.WARNING(f'does not use {index}'))
+
+    def seed_users(self, count):
+        User = get_user_model()
+        existing = User.objects.filter(username__startswith=self.USER_PREFIX)
+        missing = count - existing.count()
+        if missing > 0:
+            start = existing.count()
+            User.objects.bulk_create([
+                User(
+                    username=f'{self.USER_PREFIX}{i}',
+                    email=f'{self.USER_PREFIX}{i}@example.com',
+                    password='!',
+                )
+                for i in range(start, start + missing)
+            ], batch_size=self.BATCH_SIZE)
+        return list(existing.values_list('id', flat=True)[:count])
+
+    def seed_assets(self):
+        return [
+            Asset.objects.create(
+                symbol=f'BENCH{i}',
+                name=f'Benchmark {i}',
+                asset_type='CRYPTO',
+                api_source='BINANCE',
+            )
+            for i in range(20)
+        ]
+
+    def seed_trades(self, users, assets, count):
+        """Insert trades directly so opened_at can be spread over time."""
+        columns = [
+            'user_id', 'asset_id', 'trade_type', 'quantity', 'entry_price',
+            'exit_price', 'pnl', 'pnl_percent', 'status', 'opened_at',
+            'closed_at',
+        ]
+        sql = (
+            f'INSERT INTO {Trade._meta.db_table} ({", ".join(columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))})'
+        )
+        now = timezone.now()
+        asset_ids = [asset.id for asset in assets]
+
+        self.stdout.write(f'Seeding {count} trades...')
+        start = time.perf_counter()
+        for offset in range(0, count, self.BATCH_SIZE):
+            rows = []
+            for _ in range(min(self.BATCH_SIZE, count - offset)):
+                opened_at = now - timedelta(minutes=random.randint(0, 525600))
+                entry = Decimal(random.randint(100, 60000))
+                if random.random() < 0.1:
+                    rows.append((
+                        random.choice(users), random.choice(asset_ids),
+                        'BUY', Decimal('1'), entry,
+                        None, None, None, 'OPEN', opened_at, None,
+                    ))
+                else:
+                    pnl = Decimal(random.randint(-500, 500))
+                    rows.append((
+                        random.choice(users), random.choice(asset_ids),
+                        'BUY', Decimal('1'), entry,
+                        entry + pnl, pnl, Decimal('0'), 'CLOSED', opened_at,
+                        opened_at + timedelta(hours=random.randint(1, 72)),
+                    ))
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+        self.stdout.write(f'Seeded in {time.perf_counter() - start:.1f} s')
+
+    def cleanup(self, users):
+        User = get_user_model()
+        with transaction.atomic(), connection.cursor() as cursor:
+            for offset in range(0, len(users), 500):
+                chunk = users[offset:offset + 500]
+                cursor.execute(
+                    f'DELETE FROM {Trade._meta.db_table} '
+                    f'WHERE user_id IN ({", ".join(["%s"] * len(chunk))})',
+                    chunk
+                )
+        User.objects.filter(username__startswith=self.USER_PREFIX).delete()
+        Asset.objects.filter(symbol__startswith='BENCH').delete()
+        self.stdout.write('Removed benchmark data.')
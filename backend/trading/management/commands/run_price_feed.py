@@ -0,0 +1,126 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from portfolio.services.equity import (
+    prune_equity_snapshots,
+    record_equity_snapshots,
+)
+from trading.models import Asset
+from trading.services.order_engine import OrderEngine
+from trading.services.price_service import PriceService
+from trading.services.trigger_engine import TriggerEngine
+
+
+class Command(BaseCommand):
+    """
+    Keep cached prices fresh for all active assets.
+
+    Each api_source is refreshed on its own interval from
+    PRICE_FEED_INTERVALS, so Binance can tick every few seconds while
+    Alpha Vantage stays inside its quota. Run with PRICE_FEED_ENABLED=True
+    on the web processes so views only read what this worker caches.
+
+    Every refresh is also fed to the OrderEngine, which fills pending
+    limit and stop orders the price has reached, and then to the
+    TriggerEngine, which closes open trades whose stop loss or take
+    profit was hit. Every EQUITY_SNAPSHOT_INTERVAL seconds the equity
+    of active users is snapshotted for their equity curves.
+    """
+
+    help = 'Continuously refresh cached prices for all active assets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Refresh every provider once and exit.',
+        )
+
+    def handle(self, *args, **options):
+        service = PriceService(
+            alpha_vantage_key=settings.ALPHA_VANTAGE_KEY,
+            read_only=False,
+        )
+        intervals = settings.PRICE_FEED_INTERVALS
+        next_run = dict.fromkeys(intervals, 0)
+        next_snapshot = 0
+        self.pruned_at = None
+        self.orders = OrderEngine()
+        self.orders.load()
+        self.triggers = TriggerEngine()
+        self.triggers.load()
+
+        if not settings.SHARED_CACHE:
+            self.stderr.write(self.style.WARNING(
+                'The cache is per process: web workers will not see the '
+                'prices, locks or budget of this feed. Set REDIS_URL or '
+                'CACHE_BACKEND=database.'
+            ))
+        self.stdout.write('Price feed started.')
+        try:
+            while True:
+                now = time.monotonic()
+                due = [
+                    source for source, at in next_run.items() if at <= now
+                ]
+                if due:
+                    self.refresh(service, due)
+                    for source in due:
+                        next_run[source] = now + intervals[source]
+
+                if now >= next_snapshot:
+                    self.snapshot(service)
+                    next_snapshot = now + settings.EQUITY_SNAPSHOT_INTERVAL
+
+                if options['once']:
+                    break
+
+                next_at = min(*next_run.values(), next_snapshot)
+                wait = next_at - time.monotonic()
+                time.sleep(max(wait, 0.1))
+        except KeyboardInterrupt:
+            self.stdout.write('Price feed stopped.')
+
+    def refresh(self, service, sources):
+        """Refresh prices for all active assets of the given sources."""
+        close_old_connections()
+        assets = list(
+            Asset.objects.filter(is_active=True, api_source__in=sources)
+        )
+        if not assets:
+            return {}
+
+        prices = service.refresh_prices(assets)
+        missing = [symbol for symbol, price in prices.items() if not price]
+        self.stdout.write(
+            f'{", ".join(sources)}: refreshed '
+            f'{len(prices) - len(missing)}/{len(prices)} prices'
+            + (f' (missing {", ".join(missing)})' if missing else '')
+        )
+
+        self.orders.sync()
+        filled = self.orders.on_prices(prices)
+        if filled:
+            self.stdout.write(f'Filled {len(filled)} orders')
+
+        # Picks up SL/TP on the trades just opened by filled orders
+        self.triggers.sync()
+        closed = self.triggers.on_prices(prices)
+        if closed:
+            self.stdout.write(f'Closed {len(closed)} trades on SL/TP')
+        return prices
+
+    def snapshot(self, service):
+        """Record equity snapshots, pruning old ones once an hour."""
+        close_old_connections()
+        users = record_equity_snapshots(service)
+        if users:
+            self.stdout.write(f'Recorded equity of {users} users')
+
+        hour = time.time() // 3600
+        if self.pruned_at != hour:
+            self.pruned_at = hour
+            prune_equity_snapshots()
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0002_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', 'status', '-opened_at'], name='trade_user_status_opened_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(condition=models.Q(('status', 'CLOSED')), fields=['user', '-closed_at'], name='trade_user_closed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(condition=models.Q(('status', 'OPEN')), fields=['asset'], name='trade_open_asset_idx'),
+        ),
+    ]
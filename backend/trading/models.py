@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from decimal import Decimal
 
 
@@ -86,6 +87,25 @@ class Trade(models.Model):
 
     class Meta:
         ordering = ['-opened_at']
+        indexes = [
+            # A user's open or closed trades, newest first
+            models.Index(
+                fields=['user', 'status', '-opened_at'],
+                name='trade_user_status_opened_idx',
+            ),
+            # A user's closed trades by close time (history pages)
+            models.Index(
+                fields=['user', '-closed_at', '-id'],
+                name='trade_user_closed_idx',
+                condition=models.Q(status='CLOSED'),
+            ),
+            # Open trades per asset (trigger engine, price feed)
+            models.Index(
+                fields=['asset'],
+                name='trade_open_asset_idx',
+                condition=models.Q(status='OPEN'),
+            ),
+        ]
 
     def __str__(self):
         return (
@@ -113,13 +133,127 @@ class Trade(models.Model):
         return (round(pnl_amount, 2), round(pnl_percent, 2))
 
     def close_trade(self, exit_price):
-        """Close the trade at exit price."""
+        """
+        Close the trade at exit price.
+
+        Goes through execution.close_trades, so the user is credited and
+        their portfolio stats and cached summary stay in sync. Does
+        nothing if the trade is no longer open.
+        """
+        from trading.services.execution import CLOSE_FIELDS, close_trades
+
+        for closed in close_trades({self.pk: exit_price}):
+            for field in CLOSE_FIELDS:
+                setattr(self, field, getattr(closed, field))
+
+        return self.pnl
+
+    def apply_close(self, exit_price, closed_at=None):
+        """Set the closing fields without saving (for bulk updates)."""
         from django.utils import timezone
 
         self.exit_price = Decimal(str(exit_price))
         self.pnl, self.pnl_percent = self.calculate_pnl(exit_price)
         self.status = 'CLOSED'
-        self.closed_at = timezone.now()
-        self.save()
+        self.closed_at = closed_at or timezone.now()
+
+        return self.pnl
+
+
+class Order(models.Model):
+    """
+    Pending limit or stop entry order.
+
+    The order amount is reserved from the user's balance when the order
+    is placed and becomes the trade's position when it fills.
+    """
+
+    ORDER_TYPES = [
+        ('LIMIT', 'Limit'),
+        ('STOP', 'Stop'),
+    ]
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('FILLED', 'Filled'),
+        ('CANCELLED', 'Cancelled'),
+    ]
 
-        return self.pnl
\ No newline at end of file
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='orders'
+    )
+    asset = models.ForeignKey(
+        Asset,
+        on_delete=models.CASCADE,
+        related_name='orders'
+    )
+    order_type = models.CharField(max_length=5, choices=ORDER_TYPES)
+    trade_type = models.CharField(
+        max_length=4, choices=Trade.TRADE_TYPES, default='BUY'
+    )
+    trigger_price = models.DecimalField(max_digits=18, decimal_places=8)
+    amount_usd = models.DecimalField(max_digits=12, decimal_places=2)
+    stop_loss = models.DecimalField(
+        max_digits=18, decimal_places=8, null=True, blank=True
+    )
+    take_profit = models.DecimalField(
+        max_digits=18, decimal_places=8, null=True, blank=True
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default='PENDING'
+    )
+    trade = models.OneToOneField(
+        Trade,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='order'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    filled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return (
+            f'{self.order_type} {self.trade_type} {self.asset.symbol} '
+            f'@ {self.trigger_price}'
+        )
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored for an Idempotency-Key on a trade execution endpoint.
+
+    The row is inserted before the view runs, so the unique constraint
+    stops a duplicate on any web worker. ``status_code`` stays null
+    while the first request is still executing.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys'
+    )
+    view = models.CharField(max_length=100)
+    key = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=16)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(
+        null=True, blank=True, encoder=DjangoJSONEncoder
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'view', 'key'],
+                name='idempotency_key_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.view} {self.key}'
@@ -0,0 +1,83 @@
+import base64
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class ClosedAtCursorPagination(BasePagination):
+    """
+    Keyset pagination over closed trades, newest first.
+
+    Pages are ordered by (closed_at, id) descending and the cursor is the
+    last row's key, so fetching any page is one index range scan of
+    page_size rows no matter how deep it is. Unlike DRF's
+    CursorPagination, rows sharing a closed_at (trades closed together
+    in one batch) are split on id rather than skipped with an offset.
+    """
+
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by('-closed_at', '-id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            closed_at, last_id = self.decode_cursor(cursor)
+            # The range on closed_at uses the index; the id tie-break
+            # only applies to rows on the boundary timestamp.
+            queryset = queryset.filter(closed_at__lte=closed_at).filter(
+                Q(closed_at__lt=closed_at) | Q(id__lt=last_id)
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.encode_cursor(
+            last.closed_at, last.id
+        )
+        url = self.request.build_absolute_uri(self.request.path)
+        return f'{url}?{params.urlencode()}'
+
+    def encode_cursor(self, closed_at, trade_id):
+        key = f'{closed_at.isoformat()}|{trade_id}'
+        return base64.urlsafe_b64encode(key.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            key = base64.urlsafe_b64decode(cursor.encode()).decode()
+            closed_at, trade_id = key.split('|')
+            closed_at = parse_datetime(closed_at)
+            trade_id = int(trade_id)
+        except (ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+        if closed_at is None:
+            raise NotFound('Invalid cursor')
+        return closed_at, trade_id
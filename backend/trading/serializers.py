@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Asset, Trade
+from .models import Asset, Order, Trade
 
 
 class AssetSerializer(serializers.ModelSerializer):
@@ -80,7 +80,87 @@ class OpenTradeSerializer(serializers.Serializer):
         return value
 
 
+class BasketOrderSerializer(serializers.Serializer):
+    """Serializer for opening several trades in one request."""
+
+    orders = serializers.ListField(
+        child=OpenTradeSerializer(), min_length=1, max_length=50
+    )
+
+
 class CloseTradeSerializer(serializers.Serializer):
     """Serializer for closing a trade."""
 
-    trade_id = serializers.IntegerField()
\ No newline at end of file
+    trade_id = serializers.IntegerField()
+
+
+class BulkCloseTradeSerializer(serializers.Serializer):
+    """Serializer for closing all open trades matching a filter."""
+
+    symbol = serializers.CharField(required=False)
+    asset_type = serializers.ChoiceField(
+        choices=['CRYPTO', 'STOCK', 'FOREX'], required=False
+    )
+    trade_type = serializers.ChoiceField(
+        choices=['BUY', 'SELL'], required=False
+    )
+
+
+class TradeHistoryFilterSerializer(serializers.Serializer):
+    """Serializer for trade history query filters."""
+
+    symbol = serializers.CharField(required=False)
+    side = serializers.ChoiceField(choices=['BUY', 'SELL'], required=False)
+    start = serializers.DateTimeField(
+        required=False, input_formats=['iso-8601', '%Y-%m-%d']
+    )
+    end = serializers.DateTimeField(
+        required=False, input_formats=['iso-8601', '%Y-%m-%d']
+    )
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    """Serializer for Order model."""
+
+    asset_symbol = serializers.CharField(source='asset.symbol', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id',
+            'asset',
+            'asset_symbol',
+            'order_type',
+            'trade_type',
+            'trigger_price',
+            'amount_usd',
+            'stop_loss',
+            'take_profit',
+            'status',
+            'trade',
+            'created_at',
+            'filled_at',
+        ]
+        read_only_fields = fields
+
+
+class PlaceOrderSerializer(OpenTradeSerializer):
+    """Serializer for placing a limit or stop order."""
+
+    order_type = serializers.ChoiceField(choices=['LIMIT', 'STOP'])
+    trigger_price = serializers.DecimalField(
+        max_digits=18, decimal_places=8
+    )
+
+    def validate_trigger_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError(
+                'Trigger price must be positive'
+            )
+        return value
+
+
+class CancelOrderSerializer(serializers.Serializer):
+    """Serializer for cancelling a pending order."""
+
+    order_id = serializers.IntegerField()
@@ -0,0 +1,81 @@
+import time
+
+from django.core.cache import cache
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for an upstream provider, shared through the cache.
+
+    After ``failure_threshold`` consecutive failures the breaker opens
+    and calls are rejected without touching the network. Once
+    ``reset_timeout`` seconds have passed, one probe call per timeout
+    window is let through (half-open); a success closes the breaker
+    and a failure keeps it open for another window.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @property
+    def _failures_key(self):
+        return f'breaker_{self.name}_failures'
+
+    @property
+    def _opened_key(self):
+        return f'breaker_{self.name}_opened'
+
+    @property
+    def _probe_key(self):
+        return f'breaker_{self.name}_probe'
+
+    def allow_request(self):
+        """Whether a call to the provider may go ahead."""
+        opened_at = cache.get(self._opened_key)
+        if opened_at is None:
+            return True
+        if time.time() - opened_at < self.reset_timeout:
+            return False
+        # Half-open: only one caller gets to probe per window
+        return cache.add(self._probe_key, 1, self.reset_timeout)
+
+    def record_success(self):
+        """Close the breaker after a successful call."""
+        if cache.get(self._failures_key):
+            cache.delete_many(
+                [self._failures_key, self._opened_key, self._probe_key]
+            )
+
+    def record_failure(self):
+        """Count a failed call, opening the breaker at the threshold."""
+        cache.add(self._failures_key, 0, None)
+        try:
+            failures = cache.incr(self._failures_key)
+        except ValueError:
+            failures = 1
+            cache.set(self._failures_key, failures, None)
+
+        if failures >= self.failure_threshold:
+            cache.set(self._opened_key, time.time(), None)
+
+    def status(self):
+        """Current state and failure count, for monitoring."""
+        values = cache.get_many([self._failures_key, self._opened_key])
+        opened_at = values.get(self._opened_key)
+        if opened_at is None:
+            state = self.CLOSED
+        elif time.time() - opened_at < self.reset_timeout:
+            state = self.OPEN
+        else:
+            state = self.HALF_OPEN
+        return {
+            'state': state,
+            'failures': values.get(self._failures_key, 0),
+            'opened_at': opened_at,
+        }
@@ -0,0 +1,223 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from portfolio.services.stats import record_closed_trades
+from portfolio.services.summary import bump_summary_version
+from trading.models import Order, Trade
+
+
+CLOSE_FIELDS = ['exit_price', 'pnl', 'pnl_percent', 'status', 'closed_at']
+
+
+class InsufficientFunds(Exception):
+    """The user's balance does not cover the trade."""
+
+
+def open_trade(user, asset, trade_type, amount_usd, entry_price,
+               stop_loss=None, take_profit=None):
+    """
+    Debit ``amount_usd`` from the user and open a trade for it.
+
+    The debit is a conditional update on the balance column only, so
+    concurrent requests can never overdraw the account, and the trade is
+    inserted in the same transaction. Raises InsufficientFunds if the
+    balance does not cover the amount.
+    """
+    return open_trades(user, [{
+        'asset': asset,
+        'trade_type': trade_type,
+        'amount_usd': amount_usd,
+        'entry_price': entry_price,
+        'stop_loss': stop_loss,
+        'take_profit': take_profit,
+    }])[0]
+
+
+def open_trades(user, orders):
+    """
+    Open several trades for one user in one transaction.
+
+    Each order is a dict with asset, trade_type, amount_usd, entry_price
+    and optionally stop_loss / take_profit. The total is debited with a
+    single conditional balance update and the trades are inserted with
+    one bulk_create; either all of them open or none do. Raises
+    InsufficientFunds if the balance does not cover the total.
+    """
+    User = get_user_model()
+    total = sum((order['amount_usd'] for order in orders), Decimal('0'))
+    trades = [
+        Trade(
+            user=user,
+            asset=order['asset'],
+            trade_type=order['trade_type'],
+            quantity=order['amount_usd'] / order['entry_price'],
+            entry_price=order['entry_price'],
+            stop_loss=order.get('stop_loss'),
+            take_profit=order.get('take_profit'),
+            status='OPEN',
+        )
+        for order in orders
+    ]
+
+    with transaction.atomic():
+        debited = User.objects.filter(
+            pk=user.pk, account_balance__gte=total
+        ).update(account_balance=F('account_balance') - total)
+        if not debited:
+            raise InsufficientFunds()
+
+        bump_summary_version([user.pk])
+        return Trade.objects.bulk_create(trades)
+
+
+def close_trades(exit_prices):
+    """
+    Close many open trades in one transaction.
+
+    ``exit_prices`` maps trade id -> exit price. Trades that are no longer
+    open are skipped. Each trade is closed with Trade.apply_close,
+    the rows are written with one bulk update, every user
+    is credited position value + PnL with a single balance update,
+    their portfolio stats are bumped by the closed trades and their
+    cached summaries are invalidated.
+
+    Returns the list of trades that were closed.
+    """
+    if not exit_prices:
+        return []
+
+    User = get_user_model()
+    closed_at = timezone.now()
+
+    with transaction.atomic():
+        trades = list(
+            Trade.objects.select_for_update()
+            .filter(id__in=list(exit_prices), status='OPEN')
+            .order_by('id')
+        )
+
+        credits = defaultdict(Decimal)
+        for trade in trades:
+            pnl = trade.apply_close(exit_prices[trade.id], closed_at)
+            credits[trade.user_id] += trade.position_value + pnl
+
+        Trade.objects.bulk_update(trades, CLOSE_FIELDS, batch_size=500)
+
+        for user_id, amount in credits.items():
+            User.objects.filter(pk=user_id).update(
+                account_balance=F('account_balance') + amount
+            )
+
+        record_closed_trades(trades)
+        bump_summary_version(credits)
+
+    return trades
+
+
+def place_order(user, asset, order_type, trade_type, trigger_price,
+                amount_usd, stop_loss=None, take_profit=None):
+    """
+    Reserve ``amount_usd`` from the user and place a pending order.
+
+    Raises InsufficientFunds if the balance does not cover the amount.
+    """
+    User = get_user_model()
+
+    with transaction.atomic():
+        debited = User.objects.filter(
+            pk=user.pk, account_balance__gte=amount_usd
+        ).update(account_balance=F('account_balance') - amount_usd)
+        if not debited:
+            raise InsufficientFunds()
+
+        bump_summary_version([user.pk])
+        return Order.objects.create(
+            user=user,
+            asset=asset,
+            order_type=order_type,
+            trade_type=trade_type,
+            trigger_price=trigger_price,
+            amount_usd=amount_usd,
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+        )
+
+
+def cancel_order(user, order_id):
+    """
+    Cancel a pending order and refund its reserved amount.
+
+    Returns the refunded amount, or None if the order was not pending.
+    """
+    User = get_user_model()
+
+    with transaction.atomic():
+        order = (
+            Order.objects.select_for_update()
+            .filter(id=order_id, user=user, status='PENDING')
+            .first()
+        )
+        if order is None:
+            return None
+
+        order.status = 'CANCELLED'
+        order.save(update_fields=['status'])
+        User.objects.filter(pk=user.pk).update(
+            account_balance=F('account_balance') + order.amount_usd
+        )
+        bump_summary_version([user.pk])
+
+    return order.amount_usd
+
+
+def fill_orders(fill_prices):
+    """
+    Fill many pending orders in one transaction.
+
+    ``fill_prices`` maps order id -> fill price. Orders that are no
+    longer pending are skipped. The amounts were reserved when the
+    orders were placed, so filling only inserts the trades (one
+    bulk_create) and marks the orders filled (one bulk update).
+
+    Returns the list of trades that were opened.
+    """
+    if not fill_prices:
+        return []
+
+    filled_at = timezone.now()
+
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update()
+            .filter(id__in=list(fill_prices), status='PENDING')
+            .order_by('id')
+        )
+        trades = Trade.objects.bulk_create([
+            Trade(
+                user_id=order.user_id,
+                asset_id=order.asset_id,
+                trade_type=order.trade_type,
+                quantity=order.amount_usd / fill_prices[order.id],
+                entry_price=fill_prices[order.id],
+                stop_loss=order.stop_loss,
+                take_profit=order.take_profit,
+                status='OPEN',
+            )
+            for order in orders
+        ], batch_size=500)
+
+        for order, trade in zip(orders, trades):
+            order.status = 'FILLED'
+            order.trade = trade
+            order.filled_at = filled_at
+        Order.objects.bulk_update(
+            orders, ['status', 'trade', 'filled_at'], batch_size=500
+        )
+        bump_summary_version({order.user_id for order in orders})
+
+    return trades
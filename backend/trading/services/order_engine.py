@@ -0,0 +1,105 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from trading.models import Order
+from .execution import fill_orders
+from .trigger_engine import TriggerIndex
+
+
+# (order_type, trade_type) -> which way the price must cross the trigger
+DIRECTIONS = {
+    ('LIMIT', 'BUY'): 'below',
+    ('LIMIT', 'SELL'): 'above',
+    ('STOP', 'BUY'): 'above',
+    ('STOP', 'SELL'): 'below',
+}
+
+
+class OrderEngine:
+    """
+    Fills pending limit and stop orders when the price reaches them.
+
+    Resting orders are kept in per-symbol TriggerIndexes sorted by
+    trigger price, so a tick costs O(log n + k) for the k orders it
+    fills no matter how many are resting. Like the TriggerEngine it is
+    rebuilt from the database with ``load()`` and picks up new orders
+    with ``sync()``. Cancelled orders are left in the index and skipped
+    by fill_orders when they are crossed.
+    """
+
+    # How far back sync() looks for orders committed out of id order
+    SYNC_LOOKBACK = timedelta(seconds=60)
+
+    def __init__(self):
+        # symbol -> {'below': TriggerIndex, 'above': TriggerIndex}
+        self._symbols = defaultdict(lambda: {
+            'below': TriggerIndex('below'),
+            'above': TriggerIndex('above'),
+        })
+        self._orders = set()
+        self._synced_at = None
+
+    def __len__(self):
+        return len(self._orders)
+
+    def load(self):
+        """Rebuild the indexes from every pending order."""
+        self._symbols.clear()
+        self._orders.clear()
+        self._synced_at = timezone.now()
+        self._add_rows(self._pending_orders())
+
+    def sync(self):
+        """Index orders placed since the last load or sync."""
+        if self._synced_at is None:
+            return self.load()
+        since = self._synced_at - self.SYNC_LOOKBACK
+        self._synced_at = timezone.now()
+        self._add_rows(self._pending_orders().filter(created_at__gte=since))
+
+    def add(self, order_id, symbol, order_type, trade_type, trigger_price):
+        """Index one resting order."""
+        if order_id in self._orders:
+            return
+        self._orders.add(order_id)
+        direction = DIRECTIONS[(order_type, trade_type)]
+        self._symbols[symbol][direction].add(trigger_price, order_id)
+
+    def check(self, symbol, price):
+        """Ids of orders crossed at this price, removed from the index."""
+        if symbol not in self._symbols:
+            return []
+
+        crossed = []
+        for index in self._symbols[symbol].values():
+            crossed.extend(index.pop_crossed(price))
+        self._orders.difference_update(crossed)
+        return crossed
+
+    def on_prices(self, prices):
+        """
+        Process a tick of {symbol: price} and fill crossed orders.
+
+        All orders crossed by the tick are filled together in one
+        transaction at the tick price. Returns the opened trades.
+        """
+        fill_prices = {}
+        for symbol, price in prices.items():
+            if price is None:
+                continue
+            for order_id in self.check(symbol, price):
+                fill_prices[order_id] = price
+        return fill_orders(fill_prices)
+
+    def _pending_orders(self):
+        return Order.objects.filter(status='PENDING')
+
+    def _add_rows(self, queryset):
+        rows = queryset.values_list(
+            'id', 'asset__symbol', 'order_type', 'trade_type',
+            'trigger_price'
+        ).order_by()
+        for row in rows.iterator(chunk_size=2000):
+            self.add(*row)
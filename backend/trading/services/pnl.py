@@ -0,0 +1,39 @@
+from collections import defaultdict
+from decimal import Decimal
+
+
+HUNDRED = Decimal(100)
+
+
+def unrealized_pnl(positions, prices):
+    """
+    Mark many open positions to market in one pass.
+
+    ``positions`` is an iterable of (trade_id, symbol, trade_type,
+    quantity, entry_price) rows and ``prices`` maps symbol -> price.
+    Returns {trade_id: (pnl, pnl_percent)} rounded like
+    Trade.calculate_pnl; positions without a price are left out.
+
+    Each symbol's price is converted once, and positions are grouped by
+    (symbol, side) so the side's sign is applied per group rather than
+    branched on per row.
+    """
+    groups = defaultdict(list)
+    for trade_id, symbol, trade_type, quantity, entry_price in positions:
+        groups[(symbol, trade_type)].append((trade_id, quantity, entry_price))
+
+    results = {}
+    for (symbol, trade_type), rows in groups.items():
+        price = prices.get(symbol)
+        if not price:
+            continue
+        price = Decimal(str(price))
+        sign = 1 if trade_type == 'BUY' else -1
+
+        for trade_id, quantity, entry_price in rows:
+            price_diff = sign * (price - entry_price)
+            results[trade_id] = (
+                round(price_diff * quantity, 2),
+                round(price_diff / entry_price * HUNDRED, 2),
+            )
+    return results
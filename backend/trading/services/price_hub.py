@@ -0,0 +1,126 @@
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .price_service import get_price_service
+
+
+class Subscription:
+    """
+    One streaming client's interest in a set of symbols.
+
+    Updates are merged into a single pending dict rather than queued, so
+    a slow client only ever holds the latest price per symbol.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = set(symbols)
+        self._pending = {}
+        self._ready = asyncio.Event()
+
+    def push(self, prices):
+        """Merge changed prices for this client's symbols."""
+        update = {s: p for s, p in prices.items() if s in self.symbols}
+        if update:
+            self._pending.update(update)
+            self._ready.set()
+
+    async def next(self, timeout=None):
+        """Wait for the next batch of changes; {} on timeout."""
+        if not self._ready.is_set():
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return {}
+        update, self._pending = self._pending, {}
+        self._ready.clear()
+        return update
+
+
+class PriceHub:
+    """
+    In-process fan-out of price changes to streaming clients.
+
+    A single ingest task per event loop reads the prices of every
+    subscribed symbol once per tick and pushes only the ones that
+    changed, so the cost of a tick does not grow with the number of
+    connected clients. The task stops when the last client leaves.
+    """
+
+    def __init__(self, interval=2):
+        self.interval = interval
+        self._subscriptions = set()
+        self._sources = {}
+        self._last = {}
+        self._task = None
+
+    def subscribe(self, sources):
+        """
+        Register a client for symbols (a symbol -> api_source dict).
+
+        Returns the subscription, primed with the last known prices.
+        """
+        subscription = Subscription(sources)
+        self._subscriptions.add(subscription)
+        self._sources.update(sources)
+        subscription.push(self._last)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a client and forget symbols nobody watches any more."""
+        self._subscriptions.discard(subscription)
+        watched = set()
+        for other in self._subscriptions:
+            watched |= other.symbols
+        for symbol in list(self._sources):
+            if symbol not in watched:
+                del self._sources[symbol]
+                self._last.pop(symbol, None)
+
+    async def tick(self):
+        """Read current prices once and publish the changes."""
+        sources = dict(self._sources)
+        if not sources:
+            return {}
+
+        prices = await sync_to_async(
+            get_price_service().get_prices, thread_sensitive=False
+        )(list(sources), sources=sources)
+
+        changed = {
+            symbol: str(price) for symbol, price in prices.items()
+            if price is not None and self._last.get(symbol) != str(price)
+        }
+        if changed:
+            self._last.update(changed)
+            for subscription in list(self._subscriptions):
+                subscription.push(changed)
+        return changed
+
+    async def _run(self):
+        while self._subscriptions:
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f'Price hub error: {e}')
+            await asyncio.sleep(self.interval)
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_price_hub():
+    """The PriceHub for the running event loop."""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = PriceHub(
+            interval=getattr(settings, 'PRICE_STREAM_INTERVAL', 2)
+        )
+        _hubs[loop] = hub
+    return hub
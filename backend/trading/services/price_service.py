@@ -1,7 +1,51 @@
+import json
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
 from decimal import Decimal
+from django.conf import settings
 from django.core.cache import cache
 
+from .circuit_breaker import CircuitBreaker
+from .local_cache import LocalCache
+from .rate_budget import (
+    PRIORITY_DEFAULT,
+    PRIORITY_REFRESH,
+    PRIORITY_TRADE,
+    RateBudget,
+)
+
+
+class UpstreamError(Exception):
+    """A provider answered, but not with a usable price (e.g. throttled)."""
+
+
+class BoundedRetry(Retry):
+    """
+    Retry policy that never sleeps long on an upstream Retry-After.
+
+    urllib3 honours Retry-After without a cap, so one throttled call
+    could hold a request worker for minutes.
+    """
+
+    max_retry_after = getattr(settings, 'PRICE_HTTP_MAX_RETRY_AFTER', 2)
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+# Fetch result for a symbol that was never sent upstream (no API key,
+# budget too low or breaker open). Unlike None it is not negatively cached.
+SKIPPED = object()
+
 
 class PriceService:
     """
@@ -11,7 +55,8 @@ class PriceService:
     BINANCE_URL = 'https://api.binance.com/api/v3/ticker/price'
     ALPHA_VANTAGE_URL = 'https://www.alphavantage.co/query'
     
-    # Cache timeout (30 seconds)
+    # Cache timeout (30 seconds): after this a price is stale and is
+    # refreshed in the background while still being served
     CACHE_TIMEOUT = 30
     
     # Symbol mapping for APIs
@@ -26,82 +71,638 @@ class PriceService:
         'JPYUSD': ('JPY', 'USD'),
     }
     
-    def __init__(self, alpha_vantage_key=None):
+    # Upstream responses worth retrying with backoff
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    # Keep-alive sessions shared by every instance, one per provider host
+    _sessions = {}
+    _sessions_lock = threading.Lock()
+
+    # In-process tier in front of the Django cache
+    _local = LocalCache(
+        maxsize=getattr(settings, 'PRICE_LOCAL_CACHE_SIZE', 1024),
+        ttl=getattr(settings, 'PRICE_LOCAL_CACHE_TTL', 2),
+    )
+    _executor = None
+
+    # One circuit breaker per upstream provider
+    _breakers = {
+        provider: CircuitBreaker(
+            provider,
+            failure_threshold=getattr(settings, 'PRICE_BREAKER_FAILURES', 5),
+            reset_timeout=getattr(settings, 'PRICE_BREAKER_RESET', 30),
+        )
+        for provider in ('binance', 'alphavantage_stock', 'alphavantage_fx')
+    }
+
+    # Alpha Vantage quota, shared by all workers through the cache
+    _alpha_vantage_budget = RateBudget(
+        'alphavantage',
+        per_minute=getattr(settings, 'ALPHA_VANTAGE_CALLS_PER_MINUTE', 5),
+        per_day=getattr(settings, 'ALPHA_VANTAGE_CALLS_PER_DAY', 25),
+        reserve=getattr(settings, 'ALPHA_VANTAGE_TRADE_RESERVE', 0.4),
+    )
+
+    def __init__(self, alpha_vantage_key=None, max_workers=None,
+                 read_only=None):
         self.alpha_vantage_key = alpha_vantage_key
+        self.timeout = (
+            getattr(settings, 'PRICE_HTTP_CONNECT_TIMEOUT', 3.05),
+            getattr(settings, 'PRICE_HTTP_READ_TIMEOUT', 10),
+        )
+        if max_workers is None:
+            max_workers = getattr(settings, 'PRICE_FETCH_MAX_WORKERS', 1)
+        self.max_workers = max_workers
+        # When the price feed worker is running, request paths only read
+        # what it has cached and never call the upstream APIs themselves,
+        # except to price a trade the feed has no fresh price for.
+        if read_only is None:
+            read_only = getattr(settings, 'PRICE_FEED_ENABLED', False)
+        self.read_only = read_only
+        # Single-flight refresh: how long the refresh lock is held at most
+        # and how long other callers wait for the refreshed price.
+        self.lock_timeout = getattr(settings, 'PRICE_LOCK_TIMEOUT', 15)
+        self.lock_wait = getattr(settings, 'PRICE_LOCK_WAIT', 2)
+        # Stale-while-revalidate: prices older than the soft TTL are served
+        # and refreshed in the background until the hard TTL drops them.
+        self.soft_ttl = self.CACHE_TIMEOUT
+        self.hard_ttl = getattr(settings, 'PRICE_CACHE_HARD_TTL', 300)
+        self.trade_budget_wait = getattr(
+            settings, 'ALPHA_VANTAGE_TRADE_WAIT', 5
+        )
+        # Failed lookups are remembered briefly so they are not retried
+        # on every request.
+        self.negative_ttl = getattr(settings, 'PRICE_NEGATIVE_CACHE_TTL', 15)
     
-    def get_price(self, symbol):
+    def get_price(self, symbol, priority=PRIORITY_DEFAULT, api_source=None):
         """
         Get price for a symbol. Uses cache to avoid rate limits.
+
+        A price older than the soft TTL is still returned immediately
+        and refreshed in the background; callers only wait on upstream
+        when there is no price cached at all. Trade lookups never fill
+        at a stale price: they fetch a fresh one, even on read-only
+        workers. ``priority`` decides who gets the Alpha Vantage budget
+        when it runs low, and ``api_source`` routes symbols not in
+        BINANCE_SYMBOLS.
         """
         # Check cache first
-        cache_key = f'price_{symbol}'
-        cached = cache.get(cache_key)
-        if cached:
-            return Decimal(str(cached))
-        
-        # Fetch from API
-        price = None
-        
-        if symbol in self.BINANCE_SYMBOLS:
-            price = self._fetch_binance(symbol)
-        elif symbol in self.FOREX_PAIRS:
-            price = self._fetch_forex(symbol)
-        else:
-            price = self._fetch_stock(symbol)
+        entries, failed = self._read([symbol])
+        entry = entries.get(symbol)
+        if entry and (priority > PRIORITY_TRADE or self._is_fresh(entry)):
+            self._revalidate({symbol: entry}, {symbol: api_source}, priority)
+            return self._unpack(entry)
+
+        # Trade lookups retry symbols that failed recently
+        if priority > PRIORITY_TRADE and (self.read_only or failed):
+            return None
+
+        # Another caller is already refreshing this symbol
+        if not self._claim(symbol):
+            return self._await_refresh([symbol], priority)[symbol]
         
-        # Cache the price
-        if price:
-            cache.set(cache_key, str(price), self.CACHE_TIMEOUT)
+        # Fetch from API and cache the price
+        try:
+            price = self._fetch(symbol, priority, api_source)
+            self._store({symbol: price})
+        finally:
+            self._release([symbol])
         
-        return price
+        return self._settle({symbol: price})[symbol]
     
-    def get_all_prices(self, assets):
+    def get_all_prices(self, assets, max_workers=None,
+                       priority=PRIORITY_REFRESH):
         """
         Get prices for multiple assets.
         """
-        prices = {}
-        for asset in assets:
+        return self.get_prices(
+            [asset.symbol for asset in assets],
+            sources={asset.symbol: asset.api_source for asset in assets},
+            max_workers=max_workers,
+            priority=priority,
+        )
+
+    def get_prices(self, symbols, sources=None, max_workers=None,
+                   priority=PRIORITY_DEFAULT):
+        """
+        Get prices for many symbols with one cache read and one write.
+
+        ``sources`` optionally maps symbol -> api_source so symbols not in
+        BINANCE_SYMBOLS still route to the right provider. Binance-backed
+        misses are resolved with a single multi-symbol ticker request,
+        and the Binance batch and per-symbol Alpha Vantage calls run in
+        parallel on up to ``max_workers`` threads. As in get_price, stale
+        prices count as misses for trade lookups.
+        """
+        sources = {
+            symbol: (sources or {}).get(symbol) for symbol in symbols
+        }
+        entries, failed = self._read(list(sources))
+        if priority <= PRIORITY_TRADE:
+            entries = {
+                symbol: entry for symbol, entry in entries.items()
+                if self._is_fresh(entry)
+            }
+        self._revalidate(entries, sources, priority)
+
+        prices = {
+            symbol: self._unpack(entries.get(symbol)) for symbol in sources
+        }
+        misses = [
+            symbol for symbol in sources
+            if symbol not in entries
+            and (symbol not in failed or priority <= PRIORITY_TRADE)
+        ]
+
+        if misses and (not self.read_only or priority <= PRIORITY_TRADE):
+            claimed = [symbol for symbol in misses if self._claim(symbol)]
+            waiting = [symbol for symbol in misses if symbol not in claimed]
+
+            if claimed:
+                try:
+                    fetched = self._fetch_many(
+                        {symbol: sources[symbol] for symbol in claimed},
+                        max_workers,
+                        priority
+                    )
+                    self._store(fetched)
+                finally:
+                    self._release(claimed)
+                prices.update(self._settle(fetched))
+            if waiting:
+                prices.update(self._await_refresh(waiting, priority))
+
+        return prices
+
+    def refresh_prices(self, assets, timeout=None,
+                       priority=PRIORITY_REFRESH):
+        """
+        Fetch fresh prices for assets, bypassing the cache, and store them.
+
+        Used by the price feed worker. ``timeout`` bounds how long a price
+        may be served after its last successful refresh.
+        """
+        if timeout is None:
+            timeout = getattr(
+                settings, 'PRICE_FEED_MAX_STALENESS', self.hard_ttl
+            )
+        prices = self._fetch_many(
+            {asset.symbol: asset.api_source for asset in assets},
+            priority=priority
+        )
+        self._store(prices, timeout)
+        return self._settle(prices)
+
+    def get_stats(self):
+        """Counters for monitoring, shared by all workers."""
+        return {
+            'suppressed_fetches': cache.get('price_stats_suppressed', 0),
+            'background_refreshes': cache.get(
+                'price_stats_background', 0
+            ),
+            'local_cache_size': len(self._local),
+            'budget_skipped': cache.get('price_stats_budget_skipped', 0),
+            'alpha_vantage_budget': self._alpha_vantage_budget.remaining(),
+            'breaker_rejected': cache.get('price_stats_breaker_rejected', 0),
+            'breakers': {
+                name: breaker.status()
+                for name, breaker in self._breakers.items()
+            },
+        }
+
+    def get_last_updated(self, symbol):
+        """Unix timestamp of the cached price for a symbol, if any."""
+        entry = self._read([symbol])[0].get(symbol)
+        if not entry:
+            return None
+        return entry[1]
+
+    def refresh_in_background(self, sources, priority=PRIORITY_REFRESH):
+        """
+        Refresh symbols on the background pool without blocking.
+
+        ``sources`` maps symbol -> api_source. Symbols someone else is
+        already refreshing are skipped. Returns the Future, or None if
+        there was nothing to refresh.
+        """
+        claimed = {
+            symbol: source for symbol, source in sources.items()
+            if self._claim(symbol)
+        }
+        if not claimed:
+            return None
+
+        def refresh():
             try:
-                prices[asset.symbol] = self.get_price(asset.symbol)
+                self._store(self._fetch_many(claimed, priority=priority))
             except Exception as e:
-                print(f'Error fetching {asset.symbol}: {e}')
-                prices[asset.symbol] = None
+                print(f'Background refresh error: {e}')
+            finally:
+                self._release(list(claimed))
+
+        self._count('background', len(claimed))
+        return self._background().submit(refresh)
+
+    def _read(self, symbols):
+        """
+        Cached entries for symbols, checking the in-process tier first.
+
+        Returns ``(entries, failed)`` where ``failed`` is the set of
+        symbols with a negative cache entry. Only symbols missing locally
+        cost a cache round trip, and all of them share a single one.
+        """
+        entries = {}
+        failed = set()
+        remote = []
+        for symbol in symbols:
+            entry = self._local.get(symbol)
+            if entry:
+                entries[symbol] = entry
+            else:
+                remote.append(symbol)
+
+        if remote:
+            found = cache.get_many(
+                [f'price_{symbol}' for symbol in remote]
+                + [f'price_miss_{symbol}' for symbol in remote]
+            )
+            for symbol in remote:
+                entry = found.get(f'price_{symbol}')
+                if entry:
+                    entries[symbol] = entry
+                    self._local.set(symbol, entry)
+                elif f'price_miss_{symbol}' in found:
+                    failed.add(symbol)
+        return entries, failed
+
+    def _revalidate(self, entries, sources=None,
+                    priority=PRIORITY_REFRESH):
+        """Schedule a background refresh for entries past the soft TTL."""
+        if self.read_only:
+            return None
+        sources = sources or {}
+        now = time.time()
+        stale = {
+            symbol: sources.get(symbol)
+            for symbol, entry in entries.items()
+            if now - entry[1] > self.soft_ttl
+        }
+        if stale:
+            return self.refresh_in_background(stale, priority)
+        return None
+
+    def _fetch_many(self, sources, max_workers=None,
+                    priority=PRIORITY_REFRESH):
+        """
+        Fetch prices for symbols, batching Binance symbols together.
+
+        ``sources`` maps symbol -> api_source (or None if unknown).
+        """
+        binance = []
+        jobs = []
+        for symbol, api_source in sources.items():
+            if self.is_binance(symbol, api_source):
+                binance.append(symbol)
+            else:
+                jobs.append(
+                    (partial(self._fetch_one, priority=priority), symbol)
+                )
+        if binance:
+            jobs.insert(0, (self._fetch_binance_batch, binance))
+
+        fetched = {}
+        for result in self._run_jobs(jobs, max_workers):
+            fetched.update(result)
+        return fetched
+
+    def _store(self, prices, timeout=None):
+        """
+        Write fetched prices to both cache tiers in one call.
+
+        Symbols upstream answered without a price get a short negative
+        cache entry instead. SKIPPED symbols are left alone.
+        """
+        if timeout is None:
+            timeout = self.hard_ttl
+        entries = {
+            symbol: self._pack(price)
+            for symbol, price in prices.items()
+            if price and price is not SKIPPED
+        }
+        failed = [symbol for symbol, price in prices.items() if price is None]
+        if failed and self.negative_ttl:
+            cache.set_many(
+                {f'price_miss_{symbol}': 1 for symbol in failed},
+                self.negative_ttl
+            )
+        if not entries:
+            return
+        cache.set_many(
+            {f'price_{symbol}': entry for symbol, entry in entries.items()},
+            timeout
+        )
+        for symbol, entry in entries.items():
+            self._local.set(symbol, entry)
+
+    def _claim(self, symbol):
+        """Take the refresh lock for a symbol; False if already held."""
+        return cache.add(f'price_lock_{symbol}', 1, self.lock_timeout)
+
+    def _release(self, symbols):
+        """Release refresh locks taken with _claim."""
+        cache.delete_many([f'price_lock_{symbol}' for symbol in symbols])
+
+    def _await_refresh(self, symbols, priority=PRIORITY_DEFAULT):
+        """
+        Price for symbols another caller is fetching from scratch.
+
+        Waits up to ``lock_wait`` seconds for the refresh to land. Trade
+        lookups keep waiting past a stale price.
+        """
+        self._count('suppressed', len(symbols))
+
+        prices = dict.fromkeys(symbols)
+        deadline = time.monotonic() + self.lock_wait
+        pending = list(symbols)
+        while pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+            found = cache.get_many([f'price_{symbol}' for symbol in pending])
+            for symbol in pending:
+                entry = found.get(f'price_{symbol}')
+                if priority <= PRIORITY_TRADE and not self._is_fresh(entry):
+                    entry = None
+                prices[symbol] = self._unpack(entry)
+            pending = [symbol for symbol in pending if not prices[symbol]]
         return prices
-    
+
+    @classmethod
+    def _background(cls):
+        """Shared pool for stale-while-revalidate refreshes."""
+        if cls._executor is None:
+            with cls._sessions_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=2,
+                        thread_name_prefix='price-refresh',
+                    )
+        return cls._executor
+
+    @staticmethod
+    def _count(name, amount=1):
+        """Increment a shared monitoring counter."""
+        key = f'price_stats_{name}'
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            cache.set(key, amount, None)
+
+    def _is_fresh(self, entry):
+        """Whether a cache entry is within the soft TTL."""
+        return bool(entry) and time.time() - entry[1] <= self.soft_ttl
+
+    @staticmethod
+    def _settle(prices):
+        """Fetched prices as returned to callers, with SKIPPED as None."""
+        return {
+            symbol: None if price is SKIPPED else price
+            for symbol, price in prices.items()
+        }
+
+    @staticmethod
+    def _pack(price):
+        """Cache entry for a price: (price string, fetched-at timestamp)."""
+        return (str(price), time.time())
+
+    @staticmethod
+    def _unpack(entry):
+        """Price from a cache entry, or None."""
+        if not entry:
+            return None
+        return Decimal(entry[0])
+
+    def _run_jobs(self, jobs, max_workers=None):
+        """
+        Run fetch jobs, in parallel when more than one worker is allowed.
+
+        Each job is a ``(func, arg)`` pair returning a dict of prices.
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+        workers = min(max_workers, len(jobs))
+
+        if workers <= 1:
+            return [func(arg) for func, arg in jobs]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(func, arg) for func, arg in jobs]
+            return [future.result() for future in futures]
+
+    def _fetch_one(self, symbol, priority=PRIORITY_DEFAULT):
+        """Fetch a single price, returned as a one-item dict."""
+        try:
+            return {symbol: self._fetch(symbol, priority)}
+        except Exception as e:
+            print(f'Error fetching {symbol}: {e}')
+            return {symbol: None}
+
+    def _get(self, url, params):
+        """GET through the pooled session for the url's host."""
+        return self._session(url).get(
+            url, params=params, timeout=self.timeout
+        )
+
+    @classmethod
+    def _session(cls, url):
+        """
+        Long-lived keep-alive session for a provider host.
+
+        Each host gets its own connection pool, and 429/5xx responses are
+        retried with exponential backoff (honouring a capped Retry-After).
+        Read timeouts are not retried and connect errors only once;
+        sustained failures are left to the circuit breakers.
+        """
+        host = urlsplit(url).netloc
+        session = cls._sessions.get(host)
+        if session is not None:
+            return session
+
+        with cls._sessions_lock:
+            session = cls._sessions.get(host)
+            if session is None:
+                pool_size = getattr(settings, 'PRICE_HTTP_POOL_SIZE', 10)
+                retry = BoundedRetry(
+                    total=getattr(settings, 'PRICE_HTTP_MAX_RETRIES', 2),
+                    connect=1,
+                    read=0,
+                    backoff_factor=getattr(
+                        settings, 'PRICE_HTTP_BACKOFF', 0.5
+                    ),
+                    status_forcelist=cls.RETRY_STATUSES,
+                    allowed_methods=frozenset(['GET']),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=pool_size,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                cls._sessions[host] = session
+        return session
+
+    def _fetch(self, symbol, priority=PRIORITY_DEFAULT, api_source=None):
+        """Fetch a single price from the provider that serves it."""
+        if self.is_binance(symbol, api_source):
+            return self._fetch_binance(symbol)
+        if symbol in self.FOREX_PAIRS:
+            return self._fetch_forex(symbol, priority)
+        return self._fetch_stock(symbol, priority)
+
+    def is_binance(self, symbol, api_source=None):
+        """Whether a symbol is priced through Binance."""
+        return symbol in self.BINANCE_SYMBOLS or api_source == 'BINANCE'
+
+    def _binance_symbol(self, symbol):
+        """Binance trading pair for a symbol (quoted in USDT)."""
+        return self.BINANCE_SYMBOLS.get(symbol, f'{symbol}USDT')
+
+    def _provider_available(self, provider):
+        """Check the provider's circuit breaker before calling it."""
+        if self._breakers[provider].allow_request():
+            return True
+        self._count('breaker_rejected')
+        return False
+
+    def _record_result(self, provider, error=None):
+        """
+        Feed a call outcome to the provider's circuit breaker.
+
+        Only outages count as failures: timeouts, connection errors,
+        throttling and 5xx responses. Bad symbols do not open the breaker.
+        """
+        breaker = self._breakers[provider]
+        if error is None:
+            breaker.record_success()
+            return
+
+        outage = isinstance(error, (
+            requests.ConnectionError, requests.Timeout, UpstreamError
+        ))
+        if isinstance(error, requests.HTTPError):
+            response = error.response
+            code = response.status_code if response is not None else None
+            outage = code is None or code == 429 or code >= 500
+        if outage:
+            breaker.record_failure()
+
+    @staticmethod
+    def _check_alpha_vantage(data):
+        """Raise if Alpha Vantage answered with a throttling notice."""
+        notice = data.get('Note') or data.get('Information')
+        if notice:
+            raise UpstreamError(notice)
+
     def _fetch_binance(self, symbol):
         """Fetch crypto price from Binance."""
+        if not self._provider_available('binance'):
+            return SKIPPED
+
         try:
-            api_symbol = self.BINANCE_SYMBOLS.get(symbol)
-            response = requests.get(
+            api_symbol = self._binance_symbol(symbol)
+            response = self._get(
                 self.BINANCE_URL,
-                params={'symbol': api_symbol},
-                timeout=10
+                params={'symbol': api_symbol}
             )
             response.raise_for_status()
             data = response.json()
+            self._record_result('binance')
             return Decimal(data['price'])
         except Exception as e:
             print(f'Binance error for {symbol}: {e}')
+            self._record_result('binance', e)
             return None
         
-    def _fetch_stock(self, symbol):
+    def _fetch_binance_batch(self, symbols):
+        """
+        Fetch several crypto prices from Binance in one request.
+
+        Returns a dict of symbol -> price (None for symbols Binance did
+        not return, SKIPPED if the breaker is open). If Binance rejects
+        the batch because of an unknown pair, the full ticker list is
+        fetched once instead, so the cost stays at two requests however
+        many symbols there are.
+        """
+        pairs = {self._binance_symbol(symbol): symbol for symbol in symbols}
+        prices = dict.fromkeys(symbols)
+        if not self._provider_available('binance'):
+            return dict.fromkeys(symbols, SKIPPED)
+
+        try:
+            response = self._get(
+                self.BINANCE_URL,
+                params={
+                    'symbols': json.dumps(
+                        list(pairs), separators=(',', ':')
+                    ),
+                }
+            )
+            if response.status_code == 400 and len(symbols) > 1:
+                # One unknown pair makes Binance reject the whole batch,
+                # so take every ticker in one call and pick ours from it
+                response = self._get(self.BINANCE_URL, params={})
+            response.raise_for_status()
+            for ticker in response.json():
+                symbol = pairs.get(ticker.get('symbol'))
+                if symbol:
+                    prices[symbol] = Decimal(ticker['price'])
+            self._record_result('binance')
+        except Exception as e:
+            print(f'Binance batch error for {", ".join(symbols)}: {e}')
+            self._record_result('binance', e)
+        return prices
+
+    def _spend_alpha_vantage(self, priority):
+        """
+        Take one Alpha Vantage call from the shared budget.
+
+        Trade lookups may wait briefly for a token; anything else is
+        skipped when the budget is low and keeps serving its cached price.
+        """
+        wait = self.trade_budget_wait if priority <= PRIORITY_TRADE else 0
+        if self._alpha_vantage_budget.acquire(priority, wait):
+            return True
+        self._count('budget_skipped')
+        return False
+
+    def _fetch_stock(self, symbol, priority=PRIORITY_DEFAULT):
         """Fetch stock price from Alpha Vantage."""
         if not self.alpha_vantage_key:
             print('Alpha Vantage API key not set')
-            return None
+            return SKIPPED
+
+        if not self._provider_available('alphavantage_stock'):
+            return SKIPPED
+
+        if not self._spend_alpha_vantage(priority):
+            return SKIPPED
         
         try:
-            response = requests.get(
+            response = self._get(
                 self.ALPHA_VANTAGE_URL,
                 params={
                     'function': 'GLOBAL_QUOTE',
                     'symbol': symbol,
                     'apikey': self.alpha_vantage_key,
-                },
-                timeout=10
+                }
             )
             response.raise_for_status()
             data = response.json()
+            self._check_alpha_vantage(data)
+            self._record_result('alphavantage_stock')
             
             quote = data.get('Global Quote', {})
             price = quote.get('05. price')
@@ -111,28 +712,36 @@ class PriceService:
             return None
         except Exception as e:
             print(f'Alpha Vantage error for {symbol}: {e}')
+            self._record_result('alphavantage_stock', e)
             return None    
         
-    def _fetch_forex(self, symbol):
+    def _fetch_forex(self, symbol, priority=PRIORITY_DEFAULT):
         """Fetch forex rate from Alpha Vantage."""
         if not self.alpha_vantage_key:
             print('Alpha Vantage API key not set')
-            return None
+            return SKIPPED
+
+        if not self._provider_available('alphavantage_fx'):
+            return SKIPPED
+
+        if not self._spend_alpha_vantage(priority):
+            return SKIPPED
         
         try:
             from_curr, to_curr = self.FOREX_PAIRS.get(symbol)
-            response = requests.get(
+            response = self._get(
                 self.ALPHA_VANTAGE_URL,
                 params={
                     'function': 'CURRENCY_EXCHANGE_RATE',
                     'from_currency': from_curr,
                     'to_currency': to_curr,
                     'apikey': self.alpha_vantage_key,
-                },
-                timeout=10
+                }
             )
             response.raise_for_status()
             data = response.json()
+            self._check_alpha_vantage(data)
+            self._record_result('alphavantage_fx')
             
             rate_data = data.get('Realtime Currency Exchange Rate', {})
             rate = rate_data.get('5. Exchange Rate')
@@ -142,7 +751,26 @@ class PriceService:
             return None
         except Exception as e:
             print(f'Alpha Vantage forex error for {symbol}: {e}')
+            self._record_result('alphavantage_fx', e)
             return None    
-        
-# Singleton instance
-price_service = PriceService()
\ No newline at end of file
+
+
+_price_service = None
+_price_service_lock = threading.Lock()
+
+
+def get_price_service():
+    """
+    Process-wide PriceService configured from settings.
+
+    Views share this instance (and its pooled HTTP sessions) instead of
+    building a new service per request.
+    """
+    global _price_service
+    if _price_service is None:
+        with _price_service_lock:
+            if _price_service is None:
+                _price_service = PriceService(
+                    alpha_vantage_key=settings.ALPHA_VANTAGE_KEY
+                )
+    return _price_service
@@ -0,0 +1,110 @@
+import heapq
+import itertools
+import threading
+import time
+
+from django.core.cache import cache
+
+
+# Call priorities (lower runs first)
+PRIORITY_TRADE = 0      # price needed to open or close a trade
+PRIORITY_DEFAULT = 1    # single price lookups
+PRIORITY_REFRESH = 2    # price lists, dashboards, background refreshes
+
+
+class RateBudget:
+    """
+    Token-bucket call budget shared by all workers through the cache.
+
+    Two buckets are kept for a provider: one refilling per minute and
+    one per day. A share of both (``reserve``) is held back for
+    PRIORITY_TRADE calls, so dashboard refreshes cannot spend the quota
+    needed to open or close a trade.
+
+    Within a process, callers queue by priority: a lower priority call
+    never takes a token while a higher priority one is waiting.
+    """
+
+    LOCK_ATTEMPTS = 20
+
+    def __init__(self, name, per_minute, per_day, reserve=0.4):
+        self.name = name
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.reserve_minute = per_minute * reserve
+        self.reserve_day = per_day * reserve
+        self._waiting = []
+        self._waiting_lock = threading.Lock()
+        self._tickets = itertools.count()
+
+    def acquire(self, priority=PRIORITY_DEFAULT, wait=0):
+        """
+        Take one call from the budget.
+
+        Waits up to ``wait`` seconds for a token (and for any higher
+        priority callers to go first). Returns False if the call should
+        be skipped.
+        """
+        ticket = (priority, next(self._tickets))
+        with self._waiting_lock:
+            heapq.heappush(self._waiting, ticket)
+
+        deadline = time.monotonic() + wait
+        try:
+            while True:
+                with self._waiting_lock:
+                    first = self._waiting[0] == ticket
+                if first and self._take(priority):
+                    return True
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.1)
+        finally:
+            with self._waiting_lock:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+
+    def remaining(self):
+        """Tokens currently left in each bucket."""
+        minute, day, _ = self._refill(cache.get(self._key), time.time())
+        return {'minute': int(minute), 'day': int(day)}
+
+    @property
+    def _key(self):
+        return f'rate_budget_{self.name}'
+
+    def _refill(self, state, now):
+        """Bucket state after topping up for the time elapsed."""
+        if state is None:
+            return self.per_minute, self.per_day, now
+        minute, day, updated_at = state
+        elapsed = max(now - updated_at, 0)
+        minute = min(self.per_minute, minute + elapsed * self.per_minute / 60)
+        day = min(self.per_day, day + elapsed * self.per_day / 86400)
+        return minute, day, now
+
+    def _take(self, priority):
+        """Atomically spend one token from both buckets if allowed."""
+        lock_key = f'{self._key}_lock'
+        for _ in range(self.LOCK_ATTEMPTS):
+            if cache.add(lock_key, 1, 2):
+                break
+            time.sleep(0.01)
+        else:
+            return False
+
+        try:
+            minute, day, now = self._refill(cache.get(self._key), time.time())
+            needed_minute = needed_day = 1
+            if priority > PRIORITY_TRADE:
+                needed_minute += self.reserve_minute
+                needed_day += self.reserve_day
+
+            allowed = minute >= needed_minute and day >= needed_day
+            if allowed:
+                minute -= 1
+                day -= 1
+            cache.set(self._key, (minute, day, now), None)
+            return allowed
+        finally:
+            cache.delete(lock_key)
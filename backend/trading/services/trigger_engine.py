@@ -0,0 +1,161 @@
+import bisect
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from trading.models import Trade
+from .execution import close_trades
+
+
+class TriggerIndex:
+    """
+    Price levels kept sorted so the crossed ones are always a suffix.
+
+    ``direction`` is 'below' for levels that fire when the price falls to
+    or under them, and 'above' for levels that fire when it rises to or
+    over them ('above' levels are stored negated). Finding and removing
+    the k crossed levels is O(log n + k).
+    """
+
+    def __init__(self, direction):
+        self.sign = 1 if direction == 'below' else -1
+        self._keys = []
+
+    def add(self, level, item_id):
+        bisect.insort(self._keys, (self.sign * level, item_id))
+
+    def remove(self, level, item_id):
+        key = (self.sign * level, item_id)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def pop_crossed(self, price):
+        """Remove and return ids of every level the price has crossed."""
+        i = bisect.bisect_left(self._keys, (self.sign * price,))
+        crossed = [item_id for _, item_id in self._keys[i:]]
+        del self._keys[i:]
+        return crossed
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class SymbolTriggers:
+    """Stop-loss and take-profit indexes for one symbol."""
+
+    def __init__(self):
+        # (trade_type, kind) -> index
+        self.indexes = {
+            ('BUY', 'SL'): TriggerIndex('below'),
+            ('BUY', 'TP'): TriggerIndex('above'),
+            ('SELL', 'SL'): TriggerIndex('above'),
+            ('SELL', 'TP'): TriggerIndex('below'),
+        }
+
+
+class TriggerEngine:
+    """
+    Closes open trades whose stop loss or take profit has been hit.
+
+    Open trades with a stop loss or take profit are kept in per-symbol
+    price-ordered indexes, so a tick only touches the trades it
+    triggers instead of scanning the Trade table. The engine is rebuilt
+    from the database with ``load()`` and picks up newly opened trades
+    with ``sync()``.
+    """
+
+    # How far back sync() looks for trades committed out of id order
+    SYNC_LOOKBACK = timedelta(seconds=60)
+
+    def __init__(self):
+        self._symbols = defaultdict(SymbolTriggers)
+        # trade id -> (symbol, trade_type, stop_loss, take_profit)
+        self._trades = {}
+        self._synced_at = None
+
+    def __len__(self):
+        return len(self._trades)
+
+    def load(self):
+        """Rebuild the indexes from every open trade with SL/TP set."""
+        self._symbols.clear()
+        self._trades.clear()
+        self._synced_at = timezone.now()
+        self._add_rows(self._open_trades())
+
+    def sync(self):
+        """Index trades opened since the last load or sync."""
+        if self._synced_at is None:
+            return self.load()
+        since = self._synced_at - self.SYNC_LOOKBACK
+        self._synced_at = timezone.now()
+        self._add_rows(self._open_trades().filter(opened_at__gte=since))
+
+    def add(self, trade_id, symbol, trade_type, stop_loss, take_profit):
+        """Index one trade's triggers."""
+        if trade_id in self._trades:
+            return
+        if stop_loss is None and take_profit is None:
+            return
+        self._trades[trade_id] = (symbol, trade_type, stop_loss, take_profit)
+        indexes = self._symbols[symbol].indexes
+        if stop_loss is not None:
+            indexes[(trade_type, 'SL')].add(stop_loss, trade_id)
+        if take_profit is not None:
+            indexes[(trade_type, 'TP')].add(take_profit, trade_id)
+
+    def remove(self, trade_id):
+        """Drop a trade's triggers (e.g. after it was closed manually)."""
+        entry = self._trades.pop(trade_id, None)
+        if entry is None:
+            return
+        symbol, trade_type, stop_loss, take_profit = entry
+        indexes = self._symbols[symbol].indexes
+        if stop_loss is not None:
+            indexes[(trade_type, 'SL')].remove(stop_loss, trade_id)
+        if take_profit is not None:
+            indexes[(trade_type, 'TP')].remove(take_profit, trade_id)
+
+    def check(self, symbol, price):
+        """Ids of trades triggered at this price, removed from the index."""
+        if symbol not in self._symbols:
+            return []
+
+        triggered = []
+        for index in self._symbols[symbol].indexes.values():
+            for trade_id in index.pop_crossed(price):
+                if trade_id in self._trades:
+                    triggered.append(trade_id)
+                    # Also drop the trade's other trigger
+                    self.remove(trade_id)
+        return triggered
+
+    def on_prices(self, prices):
+        """
+        Process a tick of {symbol: price} and close triggered trades.
+
+        All trades triggered by the tick are closed together in one
+        transaction. Returns the closed trades.
+        """
+        exit_prices = {}
+        for symbol, price in prices.items():
+            if price is None:
+                continue
+            for trade_id in self.check(symbol, price):
+                exit_prices[trade_id] = price
+        return close_trades(exit_prices)
+
+    def _open_trades(self):
+        return Trade.objects.filter(status='OPEN').filter(
+            Q(stop_loss__isnull=False) | Q(take_profit__isnull=False)
+        )
+
+    def _add_rows(self, queryset):
+        rows = queryset.values_list(
+            'id', 'asset__symbol', 'trade_type', 'stop_loss', 'take_profit'
+        ).order_by()
+        for row in rows.iterator(chunk_size=2000):
+            self.add(*row)
@@ -1,11 +1,40 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
+import asyncio
+import json
+import threading
+import time
+import requests
+from datetime import timedelta
 from decimal import Decimal
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from django.db import OperationalError, connection, connections
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
 
-from .models import Asset, Trade
+from .models import Asset, IdempotencyKey, Order, Trade
+from portfolio.models import Portfolio
+from .export import csv_chunks, stream
+from .services.circuit_breaker import CircuitBreaker
+from .services.order_engine import OrderEngine
+from .services.pnl import unrealized_pnl
+from .services.price_hub import PriceHub
+from .services.price_service import (
+    SKIPPED,
+    PriceService,
+    get_price_service,
+)
+from .services.rate_budget import (
+    PRIORITY_REFRESH,
+    PRIORITY_TRADE,
+    RateBudget,
+)
+from .services.trigger_engine import TriggerEngine, TriggerIndex
 
 User = get_user_model()
 
@@ -95,6 +124,22 @@ class TradeModelTest(TestCase):
         self.assertEqual(self.trade.exit_price, Decimal('55000.00'))
         self.assertEqual(pnl, Decimal('500.00'))
         self.assertIsNotNone(self.trade.closed_at)    
+
+    def test_close_trade_updates_account(self):
+        """Test closing credits the user and updates portfolio stats."""
+        balance = self.user.account_balance
+
+        self.trade.close_trade(Decimal('55000.00'))
+
+        self.user.refresh_from_db()
+        self.trade.refresh_from_db()
+        self.assertEqual(self.trade.status, 'CLOSED')
+        self.assertEqual(
+            self.user.account_balance, balance + Decimal('5500.00')
+        )
+        portfolio = Portfolio.objects.get(user=self.user)
+        self.assertEqual(portfolio.total_trades, 1)
+        self.assertEqual(portfolio.total_pnl, Decimal('500.00'))
         
 class AssetListViewTest(APITestCase):
     """Tests for asset list endpoint."""
@@ -143,7 +188,7 @@ class OpenTradeViewTest(APITestCase):
         )
         self.client.force_authenticate(user=self.user)
     
-    @patch('trading.views.PriceService')
+    @patch('trading.views.get_price_service')
     def test_open_trade_success(self, mock_price_service):
         """Test successful trade opening."""
         # Mock price service
@@ -161,7 +206,7 @@ class OpenTradeViewTest(APITestCase):
         self.assertIn('trade', response.data)
         self.assertEqual(response.data['trade']['status'], 'OPEN')
     
-    @patch('trading.views.PriceService')
+    @patch('trading.views.get_price_service')
     def test_open_trade_insufficient_funds(self, mock_price_service):
         """Test trade with insufficient balance."""
         mock_instance = mock_price_service.return_value
@@ -230,7 +275,7 @@ class CloseTradeViewTest(APITestCase):
         
         self.client.force_authenticate(user=self.user)
     
-    @patch('trading.views.PriceService')  
+    @patch('trading.views.get_price_service')  
     def test_close_trade_success(self, mock_price_service):
         """Test successful trade closing."""
         mock_instance = mock_price_service.return_value
@@ -300,14 +345,1587 @@ class OpenPositionsViewTest(APITestCase):
         )
         self.client.force_authenticate(user=self.user)
     
-    @patch('trading.views.PriceService')           
+    @patch('trading.views.get_price_service')           
     def test_get_open_positions(self, mock_price_service):
         """Test getting open positions only."""
         mock_instance = mock_price_service.return_value
-        mock_instance.get_price.return_value = Decimal('51000.00')
+        mock_instance.get_prices.return_value = {'BTC': Decimal('51000.00')}
         
         response = self.client.get('/api/trading/trades/positions/')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)  # Only open trade
-        self.assertEqual(response.data[0]['status'], 'OPEN')
\ No newline at end of file
+        self.assertEqual(response.data[0]['status'], 'OPEN')
+        self.assertEqual(response.data[0]['current_price'], '51000.00')
+        mock_instance.get_prices.assert_called_once_with(
+            ['BTC'], sources={'BTC': 'BINANCE'}
+        )
+
+    @patch('trading.views.get_price_service')
+    def test_query_count_is_constant(self, mock_price_service):
+        """Test many positions across assets cost a fixed set of queries."""
+        mock_price_service.return_value.get_prices.return_value = {
+            'BTC': Decimal('51000.00'),
+        }
+        for i in range(20):
+            asset = Asset.objects.create(
+                symbol=f'COIN{i}',
+                name=f'Coin {i}',
+                asset_type='CRYPTO',
+                api_source='BINANCE'
+            )
+            Trade.objects.create(
+                user=self.user,
+                asset=asset,
+                trade_type='SELL',
+                quantity=Decimal('1'),
+                entry_price=Decimal('10.00'),
+            )
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/trading/trades/positions/')
+
+        self.assertEqual(len(response.data), 21)
+        priced = [row for row in response.data if row['current_price']]
+        self.assertEqual(len(priced), 1)
+        self.assertEqual(priced[0]['unrealized_pnl'], '100.00')
+
+
+class UnrealizedPnlTest(TestCase):
+    """Tests for batch unrealized PnL."""
+
+    def test_matches_calculate_pnl(self):
+        """Test batch results match Trade.calculate_pnl per trade."""
+        trades = [
+            Trade(id=1, trade_type='BUY', quantity=Decimal('0.3'),
+                  entry_price=Decimal('50000.12345678')),
+            Trade(id=2, trade_type='SELL', quantity=Decimal('7'),
+                  entry_price=Decimal('1.0843')),
+            Trade(id=3, trade_type='BUY', quantity=Decimal('2'),
+                  entry_price=Decimal('180')),
+        ]
+        symbols = {1: 'BTC', 2: 'EURUSD', 3: 'AAPL'}
+        prices = {'BTC': Decimal('51234.5'), 'EURUSD': Decimal('1.0791')}
+
+        pnls = unrealized_pnl(
+            [
+                (t.id, symbols[t.id], t.trade_type, t.quantity, t.entry_price)
+                for t in trades
+            ],
+            prices,
+        )
+
+        self.assertEqual(
+            pnls[1], trades[0].calculate_pnl(prices['BTC'])
+        )
+        self.assertEqual(
+            pnls[2], trades[1].calculate_pnl(prices['EURUSD'])
+        )
+        self.assertNotIn(3, pnls)
+
+class TradeHistoryViewTest(APITestCase):
+    """Tests for paginated trade history."""
+
+    def setUp(self):
+        """Create closed trades, several sharing a close time."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.btc = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        self.eth = Asset.objects.create(
+            symbol='ETH',
+            name='Ethereum',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        now = timezone.now()
+        # Trades 1-4 were closed together in one batch
+        days = [1, 2, 2, 2, 2, 3, 4]
+        for i in range(7):
+            Trade.objects.create(
+                user=self.user,
+                asset=self.btc if i % 2 else self.eth,
+                trade_type='BUY' if i < 4 else 'SELL',
+                quantity=Decimal('1'),
+                entry_price=Decimal('100'),
+                exit_price=Decimal('110'),
+                pnl=Decimal('10'),
+                status='CLOSED',
+                closed_at=now - timedelta(days=days[i]),
+            )
+        Trade.objects.create(
+            user=self.user,
+            asset=self.btc,
+            quantity=Decimal('1'),
+            entry_price=Decimal('100'),
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_pages_cover_every_trade_once(self):
+        """Test walking the cursor returns each closed trade once."""
+        seen = []
+        url = '/api/trading/trades/history/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(trade['id'] for trade in response.data['results'])
+            url = response.data['next']
+
+        expected = Trade.objects.filter(status='CLOSED').order_by(
+            '-closed_at', '-id'
+        ).values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_filters(self):
+        """Test symbol, side and date range filters."""
+        by_symbol = self.client.get(
+            '/api/trading/trades/history/?symbol=btc'
+        )
+        by_side = self.client.get('/api/trading/trades/history/?side=SELL')
+        by_date = self.client.get('/api/trading/trades/history/', {
+            'start': timezone.now() - timedelta(days=2, hours=12),
+            'end': timezone.now() - timedelta(days=1, hours=12),
+        })
+
+        self.assertEqual(len(by_symbol.data['results']), 3)
+        self.assertEqual(len(by_side.data['results']), 3)
+        self.assertEqual(len(by_date.data['results']), 4)
+
+    def test_invalid_cursor(self):
+        """Test a garbled cursor is rejected."""
+        response = self.client.get('/api/trading/trades/history/?cursor=x')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TradeExportViewTest(APITestCase):
+    """Tests for streaming trade history export."""
+
+    def setUp(self):
+        """Create closed trades on two assets."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        for symbol in ['BTC', 'ETH']:
+            asset = Asset.objects.create(
+                symbol=symbol,
+                name=symbol,
+                asset_type='CRYPTO',
+                api_source='BINANCE'
+            )
+            Trade.objects.create(
+                user=self.user,
+                asset=asset,
+                quantity=Decimal('1'),
+                entry_price=Decimal('100'),
+                exit_price=Decimal('110'),
+                pnl=Decimal('10'),
+                status='CLOSED',
+                closed_at=timezone.now(),
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        """Test CSV export has a header and one line per trade."""
+        response = self.client.get('/api/trading/trades/export/csv/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment', response['Content-Disposition'])
+        lines = self.content(response).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('id,symbol,trade_type'))
+        self.assertIn(',BTC,BUY,', lines[1])
+
+    def test_ndjson_with_filter(self):
+        """Test NDJSON export honours the history filters."""
+        response = self.client.get(
+            '/api/trading/trades/export/ndjson/?symbol=ETH'
+        )
+
+        lines = self.content(response).splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(row['symbol'], 'ETH')
+        self.assertEqual(row['pnl'], '10.00')
+
+    def test_unknown_format(self):
+        """Test an unsupported format returns 404."""
+        response = self.client.get('/api/trading/trades/export/xlsx/')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_header_sent_before_query(self):
+        """Test the first chunk is ready without touching the database."""
+        chunks = csv_chunks(Trade.objects.all())
+
+        with self.assertNumQueries(0):
+            header = next(chunks)
+
+        self.assertTrue(header.startswith('id,symbol'))
+
+    async def test_async_stream(self):
+        """Test the ASGI body yields the same chunks asynchronously."""
+        queryset = Trade.objects.order_by('id')
+        chunks = [
+            chunk async for chunk in stream(
+                csv_chunks(queryset), asynchronous=True
+            )
+        ]
+
+        self.assertEqual(len(''.join(chunks).splitlines()), 3)
+
+
+class PriceServiceBatchTest(TestCase):
+    """Tests for batched price lookups."""
+
+    def setUp(self):
+        """Create crypto assets and clear the price cache."""
+        cache.clear()
+        PriceService._local.clear()
+        self.assets = [
+            Asset.objects.create(
+                symbol='BTC',
+                name='Bitcoin',
+                asset_type='CRYPTO',
+                api_source='BINANCE'
+            ),
+            Asset.objects.create(
+                symbol='SOL',
+                name='Solana',
+                asset_type='CRYPTO',
+                api_source='BINANCE'
+            ),
+        ]
+        self.service = PriceService()
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_binance_symbols_fetched_in_one_request(self, mock_get):
+        """Test all Binance symbols are resolved with one call."""
+        mock_get.return_value.json.return_value = [
+            {'symbol': 'BTCUSDT', 'price': '50000.00'},
+            {'symbol': 'SOLUSDT', 'price': '150.00'},
+        ]
+
+        prices = self.service.get_all_prices(self.assets)
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(prices['BTC'], Decimal('50000.00'))
+        self.assertEqual(prices['SOL'], Decimal('150.00'))
+        self.assertEqual(cache.get('price_SOL')[0], '150.00')
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_cached_symbols_not_refetched(self, mock_get):
+        """Test cached prices skip the upstream call."""
+        cache.set('price_BTC', ('50000.00', time.time()))
+        cache.set('price_SOL', ('150.00', time.time()))
+
+        prices = self.service.get_all_prices(self.assets)
+
+        mock_get.assert_not_called()
+        self.assertEqual(prices['SOL'], Decimal('150.00'))
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_rejected_batch_falls_back_to_all_tickers(self, mock_get):
+        """Test an unknown pair does not null the rest of the batch."""
+        def fake_get(url, params=None, **kwargs):
+            response = MagicMock()
+            if 'symbols' in params:
+                response.status_code = 400
+                response.raise_for_status.side_effect = requests.HTTPError(
+                    response=response
+                )
+            else:
+                response.status_code = 200
+                response.json.return_value = [
+                    {'symbol': 'BTCUSDT', 'price': '50000.00'},
+                    {'symbol': 'ETHUSDT', 'price': '3000.00'},
+                ]
+            return response
+        mock_get.side_effect = fake_get
+
+        prices = self.service.get_all_prices(self.assets)
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args.kwargs['params'], {})
+        self.assertEqual(prices, {'BTC': Decimal('50000.00'), 'SOL': None})
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_get_price_routes_by_api_source(self, mock_get):
+        """Test a Binance asset outside BINANCE_SYMBOLS goes to Binance."""
+        mock_get.return_value.json.return_value = {'price': '150.00'}
+
+        price = self.service.get_price('SOL', api_source='BINANCE')
+
+        self.assertEqual(price, Decimal('150.00'))
+        self.assertEqual(
+            mock_get.call_args.kwargs['params'], {'symbol': 'SOLUSDT'}
+        )
+
+
+class PriceServiceConcurrentTest(TestCase):
+    """Tests for concurrent fetching of mixed asset lists."""
+
+    def setUp(self):
+        """Create one asset per provider."""
+        cache.clear()
+        PriceService._local.clear()
+        self.assets = [
+            Asset.objects.create(
+                symbol='BTC',
+                name='Bitcoin',
+                asset_type='CRYPTO',
+                api_source='BINANCE'
+            ),
+            Asset.objects.create(
+                symbol='AAPL',
+                name='Apple',
+                asset_type='STOCK',
+                api_source='ALPHAVANTAGE'
+            ),
+            Asset.objects.create(
+                symbol='EURUSD',
+                name='Euro / US Dollar',
+                asset_type='FOREX',
+                api_source='ALPHAVANTAGE'
+            ),
+        ]
+
+    @staticmethod
+    def fake_get(url, params=None, **kwargs):
+        """Return a canned response for each provider."""
+        response = MagicMock()
+        if 'symbols' in params:
+            response.json.return_value = [
+                {'symbol': 'BTCUSDT', 'price': '50000.00'}
+            ]
+        elif params['function'] == 'GLOBAL_QUOTE':
+            response.json.return_value = {
+                'Global Quote': {'05. price': '190.50'}
+            }
+        else:
+            response.json.return_value = {
+                'Realtime Currency Exchange Rate': {
+                    '5. Exchange Rate': '1.0850'
+                }
+            }
+        return response
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_parallel_results_are_merged(self, mock_get):
+        """Test results from all providers end up in one dict."""
+        mock_get.side_effect = self.fake_get
+        service = PriceService(alpha_vantage_key='test', max_workers=3)
+
+        prices = service.get_all_prices(self.assets)
+
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(prices, {
+            'BTC': Decimal('50000.00'),
+            'AAPL': Decimal('190.50'),
+            'EURUSD': Decimal('1.0850'),
+        })
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_single_worker_runs_sequentially(self, mock_get):
+        """Test max_workers=1 gives the same result without threads."""
+        mock_get.side_effect = self.fake_get
+        service = PriceService(alpha_vantage_key='test')
+
+        prices = service.get_all_prices(self.assets, max_workers=1)
+
+        self.assertEqual(prices['AAPL'], Decimal('190.50'))
+        self.assertEqual(prices['EURUSD'], Decimal('1.0850'))
+
+
+class PriceFeedTest(TestCase):
+    """Tests for the background price feed."""
+
+    def setUp(self):
+        """Create a crypto asset and clear the price cache."""
+        cache.clear()
+        PriceService._local.clear()
+        Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_run_price_feed_once(self, mock_get):
+        """Test the feed command caches prices with a timestamp."""
+        mock_get.return_value.json.return_value = [
+            {'symbol': 'BTCUSDT', 'price': '50000.00'}
+        ]
+
+        call_command(
+            'run_price_feed', once=True, stdout=StringIO(), stderr=StringIO()
+        )
+
+        service = PriceService(read_only=True)
+        self.assertEqual(service.get_price('BTC'), Decimal('50000.00'))
+        self.assertIsNotNone(service.get_last_updated('BTC'))
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_read_only_service_never_fetches(self, mock_get):
+        """Test views in feed mode never call upstream on a miss."""
+        service = PriceService(read_only=True)
+
+        self.assertIsNone(service.get_price('BTC'))
+        mock_get.assert_not_called()
+
+
+class PriceServiceSessionTest(TestCase):
+    """Tests for pooled upstream HTTP sessions."""
+
+    def test_session_reused_per_host(self):
+        """Test each provider host gets one long-lived session."""
+        binance = PriceService._session(PriceService.BINANCE_URL)
+        alpha = PriceService._session(PriceService.ALPHA_VANTAGE_URL)
+
+        self.assertIs(binance, PriceService._session(PriceService.BINANCE_URL))
+        self.assertIsNot(binance, alpha)
+
+    def test_session_retries_rate_limits(self):
+        """Test 429 and 5xx responses are retried with backoff."""
+        session = PriceService._session(PriceService.BINANCE_URL)
+        retry = session.get_adapter(PriceService.BINANCE_URL).max_retries
+
+        self.assertIn(429, retry.status_forcelist)
+        self.assertIn(503, retry.status_forcelist)
+        self.assertGreater(retry.backoff_factor, 0)
+
+    def test_session_retries_are_bounded(self):
+        """Test read timeouts are not retried and Retry-After is capped."""
+        session = PriceService._session(PriceService.BINANCE_URL)
+        retry = session.get_adapter(PriceService.BINANCE_URL).max_retries
+        response = MagicMock()
+        response.headers = {'Retry-After': '3600'}
+
+        self.assertEqual(retry.read, 0)
+        self.assertEqual(
+            retry.get_retry_after(response), retry.max_retry_after
+        )
+        self.assertLessEqual(retry.max_retry_after, 5)
+
+    def test_views_share_one_service(self):
+        """Test get_price_service returns a process-wide instance."""
+        self.assertIs(get_price_service(), get_price_service())
+
+
+class PriceServiceSingleFlightTest(TestCase):
+    """Tests for cache-stampede protection."""
+
+    def setUp(self):
+        """Clear the price cache."""
+        cache.clear()
+        PriceService._local.clear()
+        self.service = PriceService()
+        self.service.lock_wait = 0
+
+    @patch.object(PriceService, '_fetch')
+    def test_only_lock_holder_fetches(self, mock_fetch):
+        """Test callers that lose the lock do not hit upstream."""
+        cache.add('price_lock_BTC', 1)
+
+        price = self.service.get_price('BTC')
+
+        mock_fetch.assert_not_called()
+        self.assertIsNone(price)
+        self.assertEqual(self.service.get_stats()['suppressed_fetches'], 1)
+
+    @patch.object(PriceService, '_fetch')
+    def test_lock_released_after_fetch(self, mock_fetch):
+        """Test the refresh lock is released once the price is cached."""
+        mock_fetch.return_value = Decimal('50000.00')
+
+        self.service.get_price('BTC')
+
+        self.assertIsNone(cache.get('price_lock_BTC'))
+        self.assertEqual(cache.get('price_BTC')[0], '50000.00')
+
+    def test_status_endpoint(self):
+        """Test the monitoring endpoint reports suppressed fetches."""
+        admin = User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+
+        response = client.get('/api/trading/prices/status/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('suppressed_fetches', response.json())
+
+    def test_status_endpoint_is_staff_only(self):
+        """Test anonymous and regular users cannot read breaker state."""
+        user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        client = APIClient()
+        anonymous = client.get('/api/trading/prices/status/')
+        client.force_authenticate(user=user)
+        regular = client.get('/api/trading/prices/status/')
+
+        self.assertEqual(anonymous.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(regular.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PriceServiceTwoTierCacheTest(TestCase):
+    """Tests for the in-process tier and stale-while-revalidate."""
+
+    def setUp(self):
+        """Clear both cache tiers."""
+        cache.clear()
+        PriceService._local.clear()
+        self.service = PriceService()
+
+    @patch.object(PriceService, 'refresh_in_background')
+    @patch.object(PriceService, '_fetch')
+    def test_stale_price_served_and_refreshed(self, mock_fetch, mock_refresh):
+        """Test a stale price is returned at once and refreshed later."""
+        stale_at = time.time() - self.service.soft_ttl - 1
+        cache.set('price_BTC', ('50000.00', stale_at))
+
+        price = self.service.get_price('BTC')
+
+        self.assertEqual(price, Decimal('50000.00'))
+        mock_fetch.assert_not_called()
+        mock_refresh.assert_called_once()
+        self.assertEqual(mock_refresh.call_args.args[0], {'BTC': None})
+
+    @patch.object(PriceService, '_fetch')
+    def test_trade_lookup_refetches_stale_price(self, mock_fetch):
+        """Test trades are never filled at a stale cached price."""
+        stale_at = time.time() - self.service.soft_ttl - 1
+        cache.set('price_BTC', ('50000.00', stale_at))
+        mock_fetch.return_value = Decimal('51000.00')
+
+        price = self.service.get_price('BTC', priority=PRIORITY_TRADE)
+
+        self.assertEqual(price, Decimal('51000.00'))
+        mock_fetch.assert_called_once()
+
+    @patch.object(PriceService, '_fetch_many')
+    def test_bulk_trade_lookup_refetches_stale_price(self, mock_fetch_many):
+        """Test bulk trade lookups treat stale prices as misses."""
+        stale_at = time.time() - self.service.soft_ttl - 1
+        cache.set('price_BTC', ('50000.00', stale_at))
+        cache.set('price_ETH', ('3000.00', time.time()))
+        mock_fetch_many.return_value = {'BTC': Decimal('51000.00')}
+
+        prices = self.service.get_prices(
+            ['BTC', 'ETH'], priority=PRIORITY_TRADE
+        )
+
+        self.assertEqual(list(mock_fetch_many.call_args.args[0]), ['BTC'])
+        self.assertEqual(prices, {
+            'BTC': Decimal('51000.00'),
+            'ETH': Decimal('3000.00'),
+        })
+
+    @patch.object(PriceService, '_fetch')
+    def test_read_only_trade_lookup_fetches_stale_price(self, mock_fetch):
+        """Test read-only workers fetch trade prices the feed has not."""
+        service = PriceService(read_only=True)
+        stale_at = time.time() - service.soft_ttl - 1
+        cache.set('price_AAPL', ('190.00', stale_at))
+        mock_fetch.return_value = Decimal('191.00')
+
+        self.assertEqual(service.get_price('AAPL'), Decimal('190.00'))
+        mock_fetch.assert_not_called()
+
+        price = service.get_price(
+            'AAPL', priority=PRIORITY_TRADE, api_source='ALPHAVANTAGE'
+        )
+
+        self.assertEqual(price, Decimal('191.00'))
+        mock_fetch.assert_called_once_with(
+            'AAPL', PRIORITY_TRADE, 'ALPHAVANTAGE'
+        )
+
+    @patch.object(PriceService, '_fetch_many')
+    def test_background_refresh_updates_cache(self, mock_fetch_many):
+        """Test the background refresh stores the new price."""
+        mock_fetch_many.return_value = {'BTC': Decimal('51000.00')}
+
+        future = self.service.refresh_in_background({'BTC': 'BINANCE'})
+        future.result(timeout=5)
+
+        self.assertEqual(cache.get('price_BTC')[0], '51000.00')
+        self.assertIsNone(cache.get('price_lock_BTC'))
+
+    def test_local_tier_avoids_cache_backend(self):
+        """Test a fresh price is read from the in-process tier."""
+        self.service._store({'BTC': Decimal('50000.00')})
+
+        with patch('trading.services.price_service.cache') as mock_cache:
+            price = self.service.get_price('BTC')
+
+        mock_cache.get_many.assert_not_called()
+        self.assertEqual(price, Decimal('50000.00'))
+
+
+class RateBudgetTest(TestCase):
+    """Tests for the shared Alpha Vantage call budget."""
+
+    def setUp(self):
+        """Clear the cache and create a small budget."""
+        cache.clear()
+        self.budget = RateBudget('test', per_minute=5, per_day=100)
+
+    def test_refresh_calls_stop_at_reserve(self):
+        """Test low priority calls leave the reserve untouched."""
+        granted = [
+            self.budget.acquire(PRIORITY_REFRESH) for _ in range(5)
+        ]
+
+        self.assertEqual(granted.count(True), 3)
+        self.assertTrue(self.budget.acquire(PRIORITY_TRADE))
+
+    def test_trade_calls_use_reserve(self):
+        """Test trade lookups can spend the whole minute budget."""
+        granted = [self.budget.acquire(PRIORITY_TRADE) for _ in range(6)]
+
+        self.assertEqual(granted.count(True), 5)
+        self.assertEqual(self.budget.remaining()['minute'], 0)
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_price_service_skips_refresh_without_budget(self, mock_get):
+        """Test dashboard fetches are skipped when the budget is low."""
+        service = PriceService(alpha_vantage_key='test')
+        PriceService._local.clear()
+        with patch.object(
+            PriceService, '_alpha_vantage_budget', self.budget
+        ):
+            for _ in range(3):
+                self.budget.acquire(PRIORITY_REFRESH)
+
+            price = service._fetch_stock('AAPL', PRIORITY_REFRESH)
+
+        self.assertIs(price, SKIPPED)
+        mock_get.assert_not_called()
+        self.assertEqual(service.get_stats()['budget_skipped'], 1)
+
+
+class CircuitBreakerTest(TestCase):
+    """Tests for per-provider circuit breakers and negative caching."""
+
+    def setUp(self):
+        """Clear the cache and create a breaker."""
+        cache.clear()
+        PriceService._local.clear()
+        self.breaker = CircuitBreaker('test', failure_threshold=3)
+
+    def test_opens_after_repeated_failures(self):
+        """Test the breaker rejects calls once the threshold is hit."""
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow_request())
+            self.breaker.record_failure()
+
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.breaker.status()['state'], 'open')
+
+    def test_single_probe_when_half_open(self):
+        """Test only one probe is allowed after the reset timeout."""
+        for _ in range(3):
+            self.breaker.record_failure()
+        cache.set('breaker_test_opened', time.time() - 60, None)
+
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.status()['state'], 'closed')
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_outage_opens_provider_breaker(self, mock_get):
+        """Test Binance timeouts open its breaker and stop calls."""
+        mock_get.side_effect = requests.Timeout('timed out')
+        service = PriceService()
+        breaker = CircuitBreaker('binance', failure_threshold=2)
+
+        with patch.dict(PriceService._breakers, {'binance': breaker}):
+            for _ in range(3):
+                service._fetch_binance('BTC')
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(breaker.status()['state'], 'open')
+
+    @patch.object(PriceService, '_fetch')
+    def test_failed_lookup_is_negatively_cached(self, mock_fetch):
+        """Test a symbol that failed is not fetched again right away."""
+        mock_fetch.return_value = None
+        service = PriceService()
+
+        self.assertIsNone(service.get_price('BTC'))
+        self.assertIsNone(service.get_price('BTC'))
+
+        self.assertEqual(mock_fetch.call_count, 1)
+
+    @patch('trading.services.price_service.requests.Session.get')
+    def test_budget_skip_is_not_negatively_cached(self, mock_get):
+        """Test a lookup skipped for budget still lets trades fetch."""
+        response = MagicMock()
+        response.json.return_value = {
+            'Global Quote': {'05. price': '190.50'}
+        }
+        mock_get.return_value = response
+        service = PriceService(alpha_vantage_key='test')
+        budget = RateBudget('test', per_minute=5, per_day=100)
+
+        with patch.object(PriceService, '_alpha_vantage_budget', budget):
+            for _ in range(3):
+                budget.acquire(PRIORITY_REFRESH)
+            prices = service.get_prices(['AAPL'], priority=PRIORITY_REFRESH)
+            self.assertIsNone(cache.get('price_miss_AAPL'))
+
+            price = service.get_price(
+                'AAPL', priority=PRIORITY_TRADE, api_source='ALPHAVANTAGE'
+            )
+
+        self.assertEqual(prices, {'AAPL': None})
+        self.assertEqual(price, Decimal('190.50'))
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch.object(PriceService, '_fetch')
+    def test_trade_lookup_ignores_negative_cache(self, mock_fetch):
+        """Test trade lookups retry a symbol that failed recently."""
+        mock_fetch.side_effect = [None, Decimal('50000.00')]
+        service = PriceService()
+
+        self.assertIsNone(service.get_price('BTC'))
+        price = service.get_price('BTC', priority=PRIORITY_TRADE)
+
+        self.assertEqual(price, Decimal('50000.00'))
+        self.assertEqual(mock_fetch.call_count, 2)
+
+
+class PriceServiceBulkLookupTest(TestCase):
+    """Tests for bulk multi-symbol price lookups."""
+
+    def setUp(self):
+        """Clear both cache tiers."""
+        cache.clear()
+        PriceService._local.clear()
+        self.service = PriceService()
+
+    @patch.object(PriceService, '_fetch_many')
+    def test_fetches_only_misses(self, mock_fetch_many):
+        """Test cached symbols are served and only misses are fetched."""
+        cache.set('price_BTC', ('50000.00', time.time()))
+        mock_fetch_many.return_value = {'ETH': Decimal('3000.00')}
+
+        prices = self.service.get_prices(['BTC', 'ETH'])
+
+        mock_fetch_many.assert_called_once()
+        self.assertEqual(list(mock_fetch_many.call_args.args[0]), ['ETH'])
+        self.assertEqual(prices, {
+            'BTC': Decimal('50000.00'),
+            'ETH': Decimal('3000.00'),
+        })
+
+    @patch.object(PriceService, '_fetch_many')
+    def test_one_cache_read_and_write(self, mock_fetch_many):
+        """Test the lookup reads and writes the cache in bulk."""
+        mock_fetch_many.return_value = {
+            'BTC': Decimal('50000.00'),
+            'ETH': Decimal('3000.00'),
+        }
+
+        with patch(
+            'trading.services.price_service.cache', wraps=cache
+        ) as mock_cache:
+            self.service.get_prices(['BTC', 'ETH'])
+
+        mock_cache.get.assert_not_called()
+        mock_cache.set.assert_not_called()
+        self.assertEqual(mock_cache.get_many.call_count, 1)
+        self.assertEqual(mock_cache.set_many.call_count, 1)
+
+
+class PriceHubTest(TestCase):
+    """Tests for the in-process price fan-out hub."""
+
+    @patch('trading.services.price_hub.get_price_service')
+    async def test_tick_pushes_only_changes(self, mock_service):
+        """Test clients receive changed prices for their symbols only."""
+        mock_get_prices = mock_service.return_value.get_prices
+        mock_get_prices.return_value = {
+            'BTC': Decimal('50000.00'),
+            'ETH': Decimal('3000.00'),
+        }
+        hub = PriceHub()
+        btc = hub.subscribe({'BTC': 'BINANCE'})
+        both = hub.subscribe({'BTC': 'BINANCE', 'ETH': 'BINANCE'})
+        hub._task.cancel()
+
+        await hub.tick()
+        self.assertEqual(await btc.next(0), {'BTC': '50000.00'})
+        self.assertEqual(len(await both.next(0)), 2)
+
+        mock_get_prices.return_value = {
+            'BTC': Decimal('50000.00'),
+            'ETH': Decimal('3100.00'),
+        }
+        await hub.tick()
+        self.assertEqual(await btc.next(0), {})
+        self.assertEqual(await both.next(0), {'ETH': '3100.00'})
+        self.assertEqual(mock_get_prices.call_count, 2)
+
+    async def test_unsubscribe_forgets_symbols(self):
+        """Test symbols nobody watches are dropped from the hub."""
+        hub = PriceHub()
+        subscription = hub.subscribe({'BTC': 'BINANCE'})
+        hub._task.cancel()
+
+        hub.unsubscribe(subscription)
+
+        self.assertEqual(hub._sources, {})
+
+
+class PriceStreamViewTest(TestCase):
+    """Tests for the Server-Sent Events price stream."""
+
+    async def test_unknown_symbols_rejected(self):
+        """Test streaming unknown symbols returns 404."""
+        response = await self.async_client.get(
+            '/api/trading/prices/stream/?symbols=XYZ'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_wsgi_request_rejected(self):
+        """Test a WSGI server gets 501 instead of a buffered stream."""
+        response = self.client.get('/api/trading/prices/stream/')
+
+        self.assertEqual(
+            response.status_code, status.HTTP_501_NOT_IMPLEMENTED
+        )
+        self.assertFalse(response.streaming)
+
+    @override_settings(PRICE_STREAM_INTERVAL=0.01)
+    @patch('trading.services.price_hub.get_price_service')
+    async def test_streams_prices(self, mock_service):
+        """Test a client receives the current prices as an SSE event."""
+        await Asset.objects.acreate(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        mock_service.return_value.get_prices.return_value = {
+            'BTC': Decimal('50000.00'),
+        }
+
+        response = await self.async_client.get(
+            '/api/trading/prices/stream/?symbols=btc'
+        )
+        events = aiter(response.streaming_content)
+        try:
+            retry = await anext(events)
+            prices = await asyncio.wait_for(anext(events), timeout=5)
+        finally:
+            await events.aclose()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(retry, b'retry: 5000\n\n')
+        self.assertEqual(
+            prices, b'event: prices\ndata: {"BTC": "50000.00"}\n\n'
+        )
+
+
+class TriggerIndexTest(TestCase):
+    """Tests for price-ordered trigger indexes."""
+
+    def test_below_index_pops_levels_at_or_above_price(self):
+        """Test 'below' levels fire once the price falls to them."""
+        index = TriggerIndex('below')
+        for trade_id, level in enumerate([100, 95, 90, 85], start=1):
+            index.add(Decimal(level), trade_id)
+
+        self.assertEqual(index.pop_crossed(Decimal('101')), [])
+        self.assertEqual(sorted(index.pop_crossed(Decimal('90'))), [1, 2, 3])
+        self.assertEqual(len(index), 1)
+
+    def test_above_index_pops_levels_at_or_below_price(self):
+        """Test 'above' levels fire once the price rises to them."""
+        index = TriggerIndex('above')
+        for trade_id, level in enumerate([100, 105, 110], start=1):
+            index.add(Decimal(level), trade_id)
+
+        self.assertEqual(sorted(index.pop_crossed(Decimal('105'))), [1, 2])
+        index.remove(Decimal('110'), 3)
+        self.assertEqual(len(index), 0)
+
+
+class TriggerEngineTest(TestCase):
+    """Tests for stop-loss / take-profit execution."""
+
+    def setUp(self):
+        """Create a user with BUY and SELL trades carrying SL/TP."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.asset = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        self.buy = Trade.objects.create(
+            user=self.user,
+            asset=self.asset,
+            trade_type='BUY',
+            quantity=Decimal('0.1'),
+            entry_price=Decimal('50000.00'),
+            stop_loss=Decimal('45000.00'),
+            take_profit=Decimal('55000.00'),
+        )
+        self.sell = Trade.objects.create(
+            user=self.user,
+            asset=self.asset,
+            trade_type='SELL',
+            quantity=Decimal('0.1'),
+            entry_price=Decimal('50000.00'),
+            stop_loss=Decimal('55000.00'),
+        )
+        self.engine = TriggerEngine()
+        self.engine.load()
+
+    def test_load_indexes_open_trades(self):
+        """Test open trades with SL/TP are indexed at startup."""
+        self.assertEqual(len(self.engine), 2)
+
+    def test_no_trigger_inside_range(self):
+        """Test prices between the levels close nothing."""
+        closed = self.engine.on_prices({'BTC': Decimal('50500.00')})
+
+        self.assertEqual(closed, [])
+        self.assertEqual(len(self.engine), 2)
+
+    def test_take_profit_and_stop_loss_close_in_bulk(self):
+        """Test one tick closes every crossed trade and credits balance."""
+        closed = self.engine.on_prices({'BTC': Decimal('55000.00')})
+
+        self.assertEqual({t.id for t in closed}, {self.buy.id, self.sell.id})
+        self.buy.refresh_from_db()
+        self.sell.refresh_from_db()
+        self.assertEqual(self.buy.status, 'CLOSED')
+        self.assertEqual(self.buy.pnl, Decimal('500.00'))
+        self.assertEqual(self.sell.pnl, Decimal('-500.00'))
+        self.user.refresh_from_db()
+        # Both positions returned (2 x $5,000) with net zero PnL
+        self.assertEqual(self.user.account_balance, Decimal('20000.00'))
+        self.assertEqual(len(self.engine), 0)
+
+    def test_sync_picks_up_new_trades(self):
+        """Test trades opened after load are indexed by sync."""
+        Trade.objects.create(
+            user=self.user,
+            asset=self.asset,
+            trade_type='BUY',
+            quantity=Decimal('0.1'),
+            entry_price=Decimal('50000.00'),
+            stop_loss=Decimal('49000.00'),
+        )
+
+        self.engine.sync()
+
+        self.assertEqual(len(self.engine), 3)
+
+
+class BulkCloseTradeViewTest(APITestCase):
+    """Tests for the bulk close endpoint."""
+
+    def setUp(self):
+        """Create a user with open trades on two assets."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.btc = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        self.aapl = Asset.objects.create(
+            symbol='AAPL',
+            name='Apple',
+            asset_type='STOCK',
+            api_source='ALPHAVANTAGE'
+        )
+        for _ in range(20):
+            Trade.objects.create(
+                user=self.user,
+                asset=self.btc,
+                trade_type='BUY',
+                quantity=Decimal('0.002'),
+                entry_price=Decimal('50000.00'),
+            )
+        Trade.objects.create(
+            user=self.user,
+            asset=self.aapl,
+            trade_type='SELL',
+            quantity=Decimal('1'),
+            entry_price=Decimal('200.00'),
+        )
+        self.user.account_balance = Decimal('7800.00')
+        self.user.save()
+        Portfolio.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    @patch('trading.views.get_price_service')
+    def test_close_all(self, mock_price_service):
+        """Test every open trade closes with one price per symbol."""
+        mock_get_prices = mock_price_service.return_value.get_prices
+        mock_get_prices.return_value = {
+            'BTC': Decimal('55000.00'),
+            'AAPL': Decimal('190.00'),
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/trading/trades/close-all/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['closed_count'], 21)
+        # 20 x $10 profit on BTC + $10 profit on the AAPL short
+        self.assertEqual(response.data['total_pnl'], '210.00')
+        self.assertEqual(response.data['new_balance'], '10210.00')
+        mock_get_prices.assert_called_once()
+        self.assertLess(len(queries), 10)
+        self.assertFalse(
+            Trade.objects.filter(user=self.user, status='OPEN').exists()
+        )
+        portfolio = Portfolio.objects.get(user=self.user)
+        self.assertEqual(portfolio.total_trades, 21)
+        self.assertEqual(portfolio.winning_trades, 21)
+        self.assertEqual(portfolio.total_pnl, Decimal('210.00'))
+        self.assertEqual(portfolio.win_rate, Decimal('100.00'))
+
+    @patch('trading.views.get_price_service')
+    def test_close_by_filter(self, mock_price_service):
+        """Test only trades matching the filter are closed."""
+        mock_price_service.return_value.get_prices.return_value = {
+            'AAPL': Decimal('190.00'),
+        }
+
+        response = self.client.post(
+            '/api/trading/trades/close-all/', {'asset_type': 'STOCK'}
+        )
+
+        self.assertEqual(response.data['closed_count'], 1)
+        self.assertEqual(
+            Trade.objects.filter(user=self.user, status='OPEN').count(), 20
+        )
+
+    def test_no_matching_trades(self):
+        """Test a filter matching nothing returns 404."""
+        response = self.client.post(
+            '/api/trading/trades/close-all/', {'symbol': 'ETH'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BasketOrderViewTest(APITestCase):
+    """Tests for opening a basket of trades."""
+
+    def setUp(self):
+        """Create a user and two assets."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.btc = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        self.aapl = Asset.objects.create(
+            symbol='AAPL',
+            name='Apple',
+            asset_type='STOCK',
+            api_source='ALPHAVANTAGE'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def basket(self, btc_amount='1000.00'):
+        return {'orders': [
+            {'asset_id': self.btc.id, 'amount_usd': btc_amount},
+            {'asset_id': self.aapl.id, 'amount_usd': '500.00',
+             'trade_type': 'SELL', 'stop_loss': '210.00'},
+        ]}
+
+    @patch('trading.views.get_price_service')
+    def test_open_basket(self, mock_price_service):
+        """Test all trades open with one price lookup and one debit."""
+        mock_get_prices = mock_price_service.return_value.get_prices
+        mock_get_prices.return_value = {
+            'BTC': Decimal('50000.00'),
+            'AAPL': Decimal('200.00'),
+        }
+
+        response = self.client.post(
+            '/api/trading/trades/basket/', self.basket(), format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['trades']), 2)
+        self.assertEqual(response.data['total_amount'], '1500.00')
+        self.assertEqual(response.data['new_balance'], '8500.00')
+        mock_get_prices.assert_called_once()
+        aapl_trade = Trade.objects.get(asset=self.aapl)
+        self.assertEqual(aapl_trade.trade_type, 'SELL')
+        self.assertEqual(aapl_trade.quantity, Decimal('2.5'))
+        self.assertEqual(aapl_trade.stop_loss, Decimal('210.00'))
+
+    @patch('trading.views.get_price_service')
+    def test_insufficient_funds_opens_nothing(self, mock_price_service):
+        """Test a basket over the balance is rejected as a whole."""
+        mock_price_service.return_value.get_prices.return_value = {
+            'BTC': Decimal('50000.00'),
+            'AAPL': Decimal('200.00'),
+        }
+
+        response = self.client.post(
+            '/api/trading/trades/basket/',
+            self.basket(btc_amount='9600.00'),
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Trade.objects.exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.account_balance, Decimal('10000.00'))
+
+    def test_invalid_order_rejects_basket(self):
+        """Test one invalid order fails validation for the whole basket."""
+        basket = self.basket(btc_amount='0.50')
+
+        response = self.client.post(
+            '/api/trading/trades/basket/', basket, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Trade.objects.exists())
+
+
+class OrderViewTest(APITestCase):
+    """Tests for placing and cancelling orders."""
+
+    def setUp(self):
+        """Create a user and an asset."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.asset = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def place(self, amount='1000.00'):
+        return self.client.post('/api/trading/orders/place/', {
+            'asset_id': self.asset.id,
+            'order_type': 'LIMIT',
+            'trade_type': 'BUY',
+            'trigger_price': '45000.00',
+            'amount_usd': amount,
+        })
+
+    def test_place_reserves_amount(self):
+        """Test placing an order reserves its amount."""
+        response = self.place()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['order']['status'], 'PENDING')
+        self.assertEqual(response.data['new_balance'], '9000.00')
+
+    def test_place_insufficient_funds(self):
+        """Test an order over the balance is rejected."""
+        response = self.place(amount='20000.00')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_cancel_refunds_amount(self):
+        """Test cancelling refunds the reserved amount once."""
+        order_id = self.place().data['order']['id']
+
+        response = self.client.post(
+            '/api/trading/orders/cancel/', {'order_id': order_id}
+        )
+        again = self.client.post(
+            '/api/trading/orders/cancel/', {'order_id': order_id}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['new_balance'], '10000.00')
+        self.assertEqual(again.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_orders(self):
+        """Test listing the user's pending orders."""
+        self.place()
+
+        response = self.client.get('/api/trading/orders/?status=pending')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+
+class OrderEngineTest(TestCase):
+    """Tests for filling limit and stop orders."""
+
+    def setUp(self):
+        """Create a user, an asset and one order of each kind."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.asset = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        self.limit_buy = self.order('LIMIT', 'BUY', '45000')
+        self.limit_sell = self.order('LIMIT', 'SELL', '55000')
+        self.stop_buy = self.order('STOP', 'BUY', '52000')
+        self.stop_sell = self.order('STOP', 'SELL', '48000')
+        self.engine = OrderEngine()
+        self.engine.load()
+
+    def order(self, order_type, trade_type, trigger_price):
+        return Order.objects.create(
+            user=self.user,
+            asset=self.asset,
+            order_type=order_type,
+            trade_type=trade_type,
+            trigger_price=Decimal(trigger_price),
+            amount_usd=Decimal('1000.00'),
+            take_profit=Decimal('60000'),
+        )
+
+    def test_load(self):
+        """Test every pending order is indexed."""
+        self.assertEqual(len(self.engine), 4)
+
+    def test_price_between_triggers_fills_nothing(self):
+        """Test no order fills while the price stays inside the range."""
+        trades = self.engine.on_prices({'BTC': Decimal('50000')})
+
+        self.assertEqual(trades, [])
+        self.assertEqual(len(self.engine), 4)
+
+    def test_falling_price_fills_limit_buy_and_stop_sell(self):
+        """Test a drop fills the orders resting below the price."""
+        trades = self.engine.on_prices({'BTC': Decimal('44000')})
+
+        self.assertEqual(len(trades), 2)
+        self.limit_buy.refresh_from_db()
+        self.stop_sell.refresh_from_db()
+        self.assertEqual(self.limit_buy.status, 'FILLED')
+        self.assertEqual(self.stop_sell.status, 'FILLED')
+        trade = self.limit_buy.trade
+        self.assertEqual(trade.entry_price, Decimal('44000'))
+        self.assertEqual(trade.take_profit, Decimal('60000'))
+        self.assertEqual(len(self.engine), 2)
+
+    def test_rising_price_fills_stop_buy_and_limit_sell(self):
+        """Test a rise fills the orders resting above the price."""
+        self.engine.on_prices({'BTC': Decimal('56000')})
+
+        self.assertEqual(
+            set(Order.objects.filter(status='FILLED')),
+            {self.stop_buy, self.limit_sell}
+        )
+
+    def test_cancelled_order_is_not_filled(self):
+        """Test an order cancelled after loading is skipped."""
+        Order.objects.filter(id=self.limit_buy.id).update(
+            status='CANCELLED'
+        )
+
+        trades = self.engine.on_prices({'BTC': Decimal('44000')})
+
+        self.assertEqual(len(trades), 1)
+
+    def test_sync_picks_up_new_orders(self):
+        """Test sync indexes orders placed after the load."""
+        self.order('LIMIT', 'BUY', '40000')
+
+        self.engine.sync()
+
+        self.assertEqual(len(self.engine), 5)
+
+    def test_fill_does_not_touch_balance(self):
+        """Test filling uses the amount reserved at placement."""
+        self.engine.on_prices({'BTC': Decimal('44000')})
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.account_balance, Decimal('10000.00'))
+
+
+class IdempotencyTest(APITestCase):
+    """Tests for Idempotency-Key handling on trade execution."""
+
+    def setUp(self):
+        """Create a user and an asset."""
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.asset = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def open(self, key, amount='1000.00'):
+        return self.client.post(
+            '/api/trading/trades/open/',
+            {'asset_id': self.asset.id, 'amount_usd': amount},
+            HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    @patch('trading.views.get_price_service')
+    def test_retry_replays_response(self, mock_price_service):
+        """Test a retry returns the first response without re-executing."""
+        mock_get_price = mock_price_service.return_value.get_price
+        mock_get_price.return_value = Decimal('50000.00')
+
+        first = self.open('abc')
+        retry = self.open('abc')
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(mock_get_price.call_count, 1)
+        self.assertEqual(Trade.objects.count(), 1)
+
+    @patch('trading.views.get_price_service')
+    def test_different_keys_execute(self, mock_price_service):
+        """Test each new key opens its own trade."""
+        mock_price_service.return_value.get_price.return_value = (
+            Decimal('50000.00')
+        )
+
+        self.open('abc')
+        self.open('def')
+
+        self.assertEqual(Trade.objects.count(), 2)
+
+    @patch('trading.views.get_price_service')
+    def test_key_reused_with_different_body(self, mock_price_service):
+        """Test reusing a key for another request is rejected."""
+        mock_price_service.return_value.get_price.return_value = (
+            Decimal('50000.00')
+        )
+
+        self.open('abc')
+        response = self.open('abc', amount='2000.00')
+
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(Trade.objects.count(), 1)
+
+    def test_concurrent_duplicate_conflicts(self):
+        """Test a duplicate arriving mid-execution gets 409."""
+        with patch('trading.views.get_price_service') as mock_service:
+            def get_price(*args, **kwargs):
+                # The duplicate arrives while the first is executing
+                self.duplicate = self.open('abc')
+                return Decimal('50000.00')
+            mock_service.return_value.get_price.side_effect = get_price
+
+            first = self.open('abc')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.duplicate.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Trade.objects.count(), 1)
+
+    @patch('trading.views.get_price_service')
+    def test_server_error_not_stored(self, mock_price_service):
+        """Test a failed price fetch can be retried under the same key."""
+        mock_get_price = mock_price_service.return_value.get_price
+        mock_get_price.return_value = None
+
+        failed = self.open('abc')
+        mock_get_price.return_value = Decimal('50000.00')
+        retry = self.open('abc')
+
+        self.assertEqual(
+            failed.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+
+    @patch('trading.views.get_price_service')
+    def test_retry_on_another_worker_replays(self, mock_price_service):
+        """Test a retry replays even without the first worker's cache."""
+        mock_price_service.return_value.get_price.return_value = (
+            Decimal('50000.00')
+        )
+
+        first = self.open('abc')
+        cache.clear()
+        retry = self.open('abc')
+
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Trade.objects.count(), 1)
+
+    @patch('trading.views.get_price_service')
+    def test_abandoned_key_can_be_retried(self, mock_price_service):
+        """Test a key held by a request that died is taken over."""
+        mock_price_service.return_value.get_price.return_value = (
+            Decimal('50000.00')
+        )
+        self.open('abc')
+        stale_at = timezone.now() - timedelta(hours=1)
+        IdempotencyKey.objects.update(status_code=None, created_at=stale_at)
+
+        retry = self.open('abc')
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Trade.objects.count(), 2)
+
+
+class BenchmarkTradeQueriesTest(TestCase):
+    """Tests for the benchmark_trade_queries command."""
+
+    def test_runs_and_cleans_up(self):
+        """Test the benchmark reports every query and removes its data."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_trade_queries',
+            trades=500, users=5, repeat=1, stdout=out
+        )
+
+        self.assertIn('open positions', out.getvalue())
+        self.assertIn('open per asset', out.getvalue())
+        self.assertFalse(Trade.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+
+class ConcurrentBalanceTest(TransactionTestCase):
+    """Stress test balance updates from many threads at once."""
+
+    THREADS = 10
+
+    def setUp(self):
+        """Create a user who can afford half of the trades."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.user.account_balance = Decimal('5000.00')
+        self.user.save()
+        self.asset = Asset.objects.create(
+            symbol='BTC',
+            name='Bitcoin',
+            asset_type='CRYPTO',
+            api_source='BINANCE'
+        )
+
+    def run_threads(self, target, args_list):
+        """Run target once per args from THREADS threads together."""
+        barrier = threading.Barrier(len(args_list))
+        results = []
+
+        def worker(*args):
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            try:
+                barrier.wait()
+                while True:
+                    try:
+                        results.append(target(client, *args))
+                        break
+                    except OperationalError:
+                        # SQLite locks whole tables; the writer that lost
+                        # was rolled back, so simply try again.
+                        time.sleep(0.01)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker, args=args) for args in args_list
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def open_trade(self, client):
+        return client.post('/api/trading/trades/open/', {
+            'asset_id': self.asset.id,
+            'trade_type': 'BUY',
+            'amount_usd': '1000.00',
+        }).status_code
+
+    def close_trade(self, client, trade_id):
+        return client.post('/api/trading/trades/close/', {
+            'trade_id': trade_id,
+        }).status_code
+
+    @patch('trading.views.get_price_service')
+    def test_concurrent_open_and_close(self, mock_price_service):
+        """Test balance is never overdrawn and no update is lost."""
+        mock_price_service.return_value.get_price.return_value = (
+            Decimal('50000.00')
+        )
+
+        codes = self.run_threads(self.open_trade, [()] * self.THREADS)
+
+        self.assertIn(status.HTTP_400_BAD_REQUEST, codes)
+        self.assertEqual(Trade.objects.count(), 5)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.account_balance, Decimal('0.00'))
+
+        # Close every trade twice over; each must only be credited once
+        mock_price_service.return_value.get_price.return_value = (
+            Decimal('55000.00')
+        )
+        trade_ids = list(Trade.objects.values_list('id', flat=True))
+        self.run_threads(
+            self.close_trade, [(trade_id,) for trade_id in trade_ids * 2]
+        )
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.account_balance, Decimal('5500.00'))
+        self.assertFalse(Trade.objects.filter(status='OPEN').exists())
@@ -3,10 +3,18 @@ from .views import (
     AssetListView,
     PriceListView,
     PriceDetailView,
+    PriceServiceStatusView,
+    PriceStreamView,
     OpenTradeView,
+    BasketOrderView,
     CloseTradeView,
+    BulkCloseTradeView,
     OpenPositionsView,
     TradeHistoryView,
+    TradeExportView,
+    OrderListView,
+    PlaceOrderView,
+    CancelOrderView,
 )
 
 urlpatterns = [
@@ -15,13 +23,27 @@ urlpatterns = [
 
     # Prices
     path('prices/', PriceListView.as_view(), name='price-list'),
+    path('prices/stream/', PriceStreamView.as_view(),
+         name='price-stream'),
+    path('prices/status/', PriceServiceStatusView.as_view(),
+         name='price-status'),
     path('prices/<str:symbol>/', PriceDetailView.as_view(),
          name='price-detail'),
 
     # Trades
     path('trades/open/', OpenTradeView.as_view(), name='trade-open'),
+    path('trades/basket/', BasketOrderView.as_view(), name='trade-basket'),
     path('trades/close/', CloseTradeView.as_view(), name='trade-close'),
+    path('trades/close-all/', BulkCloseTradeView.as_view(),
+         name='trade-close-all'),
     path('trades/positions/', OpenPositionsView.as_view(),
          name='open-positions'),
     path('trades/history/', TradeHistoryView.as_view(), name='trade-history'),
+    path('trades/export/<str:export_format>/', TradeExportView.as_view(),
+         name='trade-export'),
+
+    # Orders
+    path('orders/', OrderListView.as_view(), name='order-list'),
+    path('orders/place/', PlaceOrderView.as_view(), name='order-place'),
+    path('orders/cancel/', CancelOrderView.as_view(), name='order-cancel'),
 ]
\ No newline at end of file
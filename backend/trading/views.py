@@ -1,19 +1,47 @@
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import (
+    AllowAny,
+    IsAdminUser,
+    IsAuthenticated,
+)
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from decimal import Decimal
+import json
 
-from .models import Asset, Trade
+from .export import FORMATS, stream
+from .idempotency import idempotent
+from .models import Asset, Order, Trade
+from .pagination import ClosedAtCursorPagination
 from .serializers import (
     AssetSerializer,
     AssetPriceSerializer,
     TradeSerializer,
     OpenTradeSerializer,
+    BasketOrderSerializer,
     CloseTradeSerializer,
+    BulkCloseTradeSerializer,
+    TradeHistoryFilterSerializer,
+    OrderSerializer,
+    PlaceOrderSerializer,
+    CancelOrderSerializer,
+)
+from .services.execution import (
+    InsufficientFunds,
+    cancel_order,
+    close_trades,
+    open_trade,
+    open_trades,
+    place_order,
 )
-from .services.price_service import PriceService
+from .services.pnl import unrealized_pnl
+from .services.price_hub import get_price_hub
+from .services.price_service import get_price_service
+from .services.rate_budget import PRIORITY_TRADE
 
 
 class AssetListView(generics.ListAPIView):
@@ -36,10 +64,7 @@ class PriceListView(APIView):
     def get(self, request):
         assets = Asset.objects.filter(is_active=True)
 
-        # Initialize price service with API key
-        price_service = PriceService(
-            alpha_vantage_key=settings.ALPHA_VANTAGE_KEY
-        )
+        price_service = get_price_service()
 
         prices = price_service.get_all_prices(assets)
 
@@ -73,10 +98,10 @@ class PriceDetailView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        price_service = PriceService(
-            alpha_vantage_key=settings.ALPHA_VANTAGE_KEY
+        price_service = get_price_service()
+        price = price_service.get_price(
+            asset.symbol, api_source=asset.api_source
         )
-        price = price_service.get_price(asset.symbol)
 
         return Response({
             'id': asset.id,
@@ -87,6 +112,77 @@ class PriceDetailView(APIView):
         })
 
 
+class PriceStreamView(View):
+    """
+    GET /api/trading/prices/stream/?symbols=BTC,ETH
+    Server-Sent Events stream of price changes.
+
+    Sends the latest known prices on connect, then only prices that
+    changed. Without ``symbols`` every active asset is streamed.
+    Needs an ASGI server so open streams do not hold a worker each;
+    under WSGI the stream would be buffered forever, so it answers 501
+    and clients fall back to polling /prices/.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {'error': 'Price streaming needs an ASGI server'},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+
+        assets = Asset.objects.filter(is_active=True)
+        symbols = request.GET.get('symbols')
+        if symbols:
+            assets = assets.filter(
+                symbol__in=[s.strip().upper() for s in symbols.split(',')]
+            )
+        sources = {
+            asset.symbol: asset.api_source async for asset in assets
+        }
+        if not sources:
+            return JsonResponse(
+                {'error': 'No matching assets'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        hub = get_price_hub()
+        subscription = hub.subscribe(sources)
+
+        response = StreamingHttpResponse(
+            self.events(hub, subscription),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def events(self, hub, subscription):
+        """Yield SSE messages until the client disconnects."""
+        heartbeat = getattr(settings, 'PRICE_STREAM_HEARTBEAT', 15)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                update = await subscription.next(timeout=heartbeat)
+                if update:
+                    yield f'event: prices\ndata: {json.dumps(update)}\n\n'
+                else:
+                    yield ': keep-alive\n\n'
+        finally:
+            hub.unsubscribe(subscription)
+
+
+class PriceServiceStatusView(APIView):
+    """
+    GET /api/trading/prices/status/
+    Price service counters for monitoring (staff only).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_price_service().get_stats())
+
+
 class OpenTradeView(APIView):
     """
     POST /api/trading/trades/open/
@@ -94,6 +190,7 @@ class OpenTradeView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         serializer = OpenTradeSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -111,10 +208,10 @@ class OpenTradeView(APIView):
             )
 
         # Get current price
-        price_service = PriceService(
-            alpha_vantage_key=settings.ALPHA_VANTAGE_KEY
+        price_service = get_price_service()
+        current_price = price_service.get_price(
+            asset.symbol, priority=PRIORITY_TRADE, api_source=asset.api_source
         )
-        current_price = price_service.get_price(asset.symbol)
 
         if not current_price:
             return Response(
@@ -124,36 +221,102 @@ class OpenTradeView(APIView):
 
         amount_usd = Decimal(str(data['amount_usd']))
 
-        # Check balance
-        if amount_usd > user.account_balance:
+        try:
+            trade = open_trade(
+                user,
+                asset,
+                data['trade_type'],
+                amount_usd,
+                current_price,
+                stop_loss=data.get('stop_loss'),
+                take_profit=data.get('take_profit'),
+            )
+        except InsufficientFunds:
+            user.refresh_from_db(fields=['account_balance'])
             avail = user.account_balance
             return Response(
                 {'error': f'Insufficient funds. Available: ${avail}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        user.refresh_from_db(fields=['account_balance'])
+
+        return Response({
+            'message': 'Trade opened successfully!',
+            'trade': TradeSerializer(trade).data,
+            'new_balance': str(user.account_balance),
+        }, status=status.HTTP_201_CREATED)
+
+
+class BasketOrderView(APIView):
+    """
+    POST /api/trading/trades/basket/
+    Open several trade positions at once, all or nothing.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request):
+        serializer = BasketOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        orders = serializer.validated_data['orders']
+        user = request.user
 
-        # Calculate quantity
-        quantity = amount_usd / current_price
-
-        # Create trade
-        trade = Trade.objects.create(
-            user=user,
-            asset=asset,
-            trade_type=data['trade_type'],
-            quantity=quantity,
-            entry_price=current_price,
-            stop_loss=data.get('stop_loss'),
-            take_profit=data.get('take_profit'),
-            status='OPEN',
+        # Get assets
+        asset_ids = {order['asset_id'] for order in orders}
+        assets = Asset.objects.filter(is_active=True).in_bulk(asset_ids)
+        missing = sorted(asset_ids - set(assets))
+        if missing:
+            return Response(
+                {'error': f'Asset not found: '
+                          f'{", ".join(map(str, missing))}'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Get current prices in one lookup
+        sources = {
+            asset.symbol: asset.api_source for asset in assets.values()
+        }
+        prices = get_price_service().get_prices(
+            list(sources), sources=sources, priority=PRIORITY_TRADE
         )
+        missing = [symbol for symbol in sources if not prices.get(symbol)]
+        if missing:
+            return Response(
+                {'error': f'Could not fetch current price for '
+                          f'{", ".join(missing)}'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
 
-        # Deduct from balance
-        user.account_balance -= amount_usd
-        user.save()
+        basket = []
+        for order in orders:
+            asset = assets[order['asset_id']]
+            basket.append({
+                'asset': asset,
+                'trade_type': order['trade_type'],
+                'amount_usd': Decimal(str(order['amount_usd'])),
+                'entry_price': prices[asset.symbol],
+                'stop_loss': order.get('stop_loss'),
+                'take_profit': order.get('take_profit'),
+            })
+        total = sum((order['amount_usd'] for order in basket), Decimal('0'))
+
+        try:
+            trades = open_trades(user, basket)
+        except InsufficientFunds:
+            user.refresh_from_db(fields=['account_balance'])
+            avail = user.account_balance
+            return Response(
+                {'error': f'Insufficient funds. Required: ${total}, '
+                          f'available: ${avail}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        user.refresh_from_db(fields=['account_balance'])
 
         return Response({
-            'message': 'Trade opened successfully!',
-            'trade': TradeSerializer(trade).data,
+            'message': f'{len(trades)} trades opened successfully!',
+            'trades': TradeSerializer(trades, many=True).data,
+            'total_amount': str(total),
             'new_balance': str(user.account_balance),
         }, status=status.HTTP_201_CREATED)
 
@@ -165,6 +328,7 @@ class CloseTradeView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         serializer = CloseTradeSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -182,10 +346,12 @@ class CloseTradeView(APIView):
             )
 
         # Get current price
-        price_service = PriceService(
-            alpha_vantage_key=settings.ALPHA_VANTAGE_KEY
+        price_service = get_price_service()
+        current_price = price_service.get_price(
+            trade.asset.symbol,
+            priority=PRIORITY_TRADE,
+            api_source=trade.asset.api_source
         )
-        current_price = price_service.get_price(trade.asset.symbol)
 
         if not current_price:
             return Response(
@@ -193,14 +359,16 @@ class CloseTradeView(APIView):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
 
-        # Close trade and calculate PnL
-        pnl = trade.close_trade(current_price)
-
-        # Return position value + PnL to balance
-        position_value = trade.quantity * trade.entry_price
-        return_amount = position_value + pnl
-        user.account_balance += return_amount
-        user.save()
+        # Close trade and credit position value + PnL atomically
+        closed = close_trades({trade.id: current_price})
+        if not closed:
+            return Response(
+                {'error': 'Trade not found or already closed'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        trade = closed[0]
+        pnl = trade.pnl
+        user.refresh_from_db(fields=['account_balance'])
 
         return Response({
             'message': 'Trade closed successfully!',
@@ -210,6 +378,75 @@ class CloseTradeView(APIView):
         })
 
 
+class BulkCloseTradeView(APIView):
+    """
+    POST /api/trading/trades/close-all/
+    Close all open positions, optionally filtered by
+    symbol, asset_type and trade_type.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkCloseTradeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        filters = serializer.validated_data
+        user = request.user
+
+        trades = Trade.objects.filter(user=user, status='OPEN')
+        if 'symbol' in filters:
+            trades = trades.filter(asset__symbol=filters['symbol'].upper())
+        if 'asset_type' in filters:
+            trades = trades.filter(asset__asset_type=filters['asset_type'])
+        if 'trade_type' in filters:
+            trades = trades.filter(trade_type=filters['trade_type'])
+
+        rows = list(
+            trades.values_list('id', 'asset__symbol', 'asset__api_source')
+        )
+        if not rows:
+            return Response(
+                {'error': 'No open trades match'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # One price per distinct symbol
+        sources = {symbol: api_source for _, symbol, api_source in rows}
+        prices = get_price_service().get_prices(
+            list(sources), sources=sources, priority=PRIORITY_TRADE
+        )
+        missing = [symbol for symbol in sources if not prices.get(symbol)]
+        if missing:
+            return Response(
+                {'error': f'Could not fetch current price for '
+                          f'{", ".join(missing)}'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        symbols = {trade_id: symbol for trade_id, symbol, _ in rows}
+        closed = close_trades({
+            trade_id: prices[symbol] for trade_id, symbol in symbols.items()
+        })
+        user.refresh_from_db(fields=['account_balance'])
+
+        total_pnl = sum((trade.pnl for trade in closed), Decimal('0.00'))
+        return Response({
+            'message': f'{len(closed)} trades closed successfully!',
+            'closed_count': len(closed),
+            'trades': [
+                {
+                    'id': trade.id,
+                    'asset_symbol': symbols[trade.id],
+                    'exit_price': str(trade.exit_price),
+                    'pnl': str(trade.pnl),
+                }
+                for trade in closed
+            ],
+            'total_pnl': str(total_pnl),
+            'new_balance': str(user.account_balance),
+        })
+
+
 class OpenPositionsView(generics.ListAPIView):
     """
     GET /api/trading/trades/open/
@@ -222,21 +459,32 @@ class OpenPositionsView(generics.ListAPIView):
         return Trade.objects.filter(user=self.request.user, status='OPEN')
 
     def list(self, request, *args, **kwargs):
-        trades = self.get_queryset()
-
-        # Get current prices
-        price_service = PriceService(
-            alpha_vantage_key=settings.ALPHA_VANTAGE_KEY
+        # One joined query for the trades and their assets
+        trades = list(self.get_queryset().select_related('asset'))
+
+        # Get current prices in one bulk lookup
+        sources = {
+            trade.asset.symbol: trade.asset.api_source for trade in trades
+        }
+        prices = get_price_service().get_prices(
+            list(sources), sources=sources
         )
 
-        data = []
-        for trade in trades:
-            current_price = price_service.get_price(trade.asset.symbol)
-            trade_data = TradeSerializer(trade).data
+        # Unrealized PnL for every position in one batch
+        pnls = unrealized_pnl(
+            (
+                (trade.id, trade.asset.symbol, trade.trade_type,
+                 trade.quantity, trade.entry_price)
+                for trade in trades
+            ),
+            prices,
+        )
 
-            if current_price:
-                pnl, pnl_percent = trade.calculate_pnl(current_price)
-                trade_data['current_price'] = str(current_price)
+        data = TradeSerializer(trades, many=True).data
+        for trade, trade_data in zip(trades, data):
+            if trade.id in pnls:
+                pnl, pnl_percent = pnls[trade.id]
+                trade_data['current_price'] = str(prices[trade.asset.symbol])
                 trade_data['unrealized_pnl'] = str(pnl)
                 trade_data['unrealized_pnl_percent'] = str(pnl_percent)
             else:
@@ -244,20 +492,165 @@ class OpenPositionsView(generics.ListAPIView):
                 trade_data['unrealized_pnl'] = None
                 trade_data['unrealized_pnl_percent'] = None
 
-            data.append(trade_data)
-
         return Response(data)
 
 
 class TradeHistoryView(generics.ListAPIView):
     """
     GET /api/trading/trades/history/
-    List closed trades for current user.
+    List closed trades for current user, newest first, one page at a
+    time. Optional filters: ?symbol=, ?side=BUY|SELL, ?start= and ?end=
+    (closed_at range, ISO date or datetime; end is exclusive).
     """
     serializer_class = TradeSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ClosedAtCursorPagination
 
     def get_queryset(self):
-        return Trade.objects.filter(
+        filters = TradeHistoryFilterSerializer(
+            data=self.request.query_params
+        )
+        filters.is_valid(raise_exception=True)
+        filters = filters.validated_data
+
+        trades = Trade.objects.filter(
             user=self.request.user, status='CLOSED'
-        )
\ No newline at end of file
+        ).select_related('asset')
+        if 'symbol' in filters:
+            trades = trades.filter(asset__symbol=filters['symbol'].upper())
+        if 'side' in filters:
+            trades = trades.filter(trade_type=filters['side'])
+        if 'start' in filters:
+            trades = trades.filter(closed_at__gte=filters['start'])
+        if 'end' in filters:
+            trades = trades.filter(closed_at__lt=filters['end'])
+        return trades
+
+
+class TradeExportView(TradeHistoryView):
+    """
+    GET /api/trading/trades/export/<csv|ndjson>/
+    Stream the user's whole closed trade history as a download.
+    Takes the same filters as the history endpoint.
+    """
+    pagination_class = None
+
+    def get(self, request, export_format):
+        if export_format not in FORMATS:
+            return Response(
+                {'error': f'Unsupported format. Use: {", ".join(FORMATS)}'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        encode, content_type = FORMATS[export_format]
+
+        trades = self.get_queryset().order_by('closed_at', 'id')
+        response = StreamingHttpResponse(
+            stream(
+                encode(trades),
+                asynchronous=isinstance(request._request, ASGIRequest)
+            ),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="trades.{export_format}"'
+        )
+        return response
+
+
+class PlaceOrderView(APIView):
+    """
+    POST /api/trading/orders/place/
+    Place a pending limit or stop entry order.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request):
+        serializer = PlaceOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+        user = request.user
+
+        # Get asset
+        try:
+            asset = Asset.objects.get(id=data['asset_id'], is_active=True)
+        except Asset.DoesNotExist:
+            return Response(
+                {'error': 'Asset not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        amount_usd = Decimal(str(data['amount_usd']))
+
+        # Reserve the amount until the order fills or is cancelled
+        try:
+            order = place_order(
+                user,
+                asset,
+                data['order_type'],
+                data['trade_type'],
+                data['trigger_price'],
+                amount_usd,
+                stop_loss=data.get('stop_loss'),
+                take_profit=data.get('take_profit'),
+            )
+        except InsufficientFunds:
+            user.refresh_from_db(fields=['account_balance'])
+            avail = user.account_balance
+            return Response(
+                {'error': f'Insufficient funds. Available: ${avail}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        user.refresh_from_db(fields=['account_balance'])
+
+        return Response({
+            'message': 'Order placed successfully!',
+            'order': OrderSerializer(order).data,
+            'new_balance': str(user.account_balance),
+        }, status=status.HTTP_201_CREATED)
+
+
+class CancelOrderView(APIView):
+    """
+    POST /api/trading/orders/cancel/
+    Cancel a pending order and release its reserved amount.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = CancelOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user = request.user
+        refund = cancel_order(user, serializer.validated_data['order_id'])
+        if refund is None:
+            return Response(
+                {'error': 'Order not found or no longer pending'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        user.refresh_from_db(fields=['account_balance'])
+
+        return Response({
+            'message': 'Order cancelled successfully!',
+            'refund': str(refund),
+            'new_balance': str(user.account_balance),
+        })
+
+
+class OrderListView(generics.ListAPIView):
+    """
+    GET /api/trading/orders/
+    List the user's orders, optionally filtered by ?status=.
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        orders = Order.objects.filter(
+            user=self.request.user
+        ).select_related('asset')
+        order_status = self.request.query_params.get('status')
+        if order_status:
+            orders = orders.filter(status=order_status.upper())
+        return orders
@@ -11,6 +11,29 @@ export const portfolioAPI = {
     return response.data
   },
 
+  // params: { start, end, resolution: 'auto' | '1m' | '1h' | '1d' }
+  getEquityCurve: async (params = {}) => {
+    const response = await api.get('/portfolio/equity/', { params })
+    return response.data
+  },
+
+  getAnalytics: async () => {
+    const response = await api.get('/portfolio/analytics/')
+    return response.data
+  },
+
+  // params: { metric: 'pnl_percent' | 'win_rate', tier, limit }
+  getLeaderboard: async (params = {}) => {
+    const response = await api.get('/portfolio/leaderboard/', { params })
+    return response.data
+  },
+
+  // params: { metric, tier, radius }
+  getMyRank: async (params = {}) => {
+    const response = await api.get('/portfolio/leaderboard/me/', { params })
+    return response.data
+  },
+
   getWatchlist: async () => {
     const response = await api.get('/portfolio/watchlist/')
     return response.data
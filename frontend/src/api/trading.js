@@ -1,5 +1,74 @@
 import api from './axios'
 
+// How often prices are polled when the stream is unavailable
+export const PRICE_POLL_INTERVAL = 30000
+
+// Subscribe to live price changes over Server-Sent Events.
+// Calls onUpdate with { SYMBOL: 'price', ... } for changed prices only.
+// If the server refuses the stream (e.g. a WSGI server answers 501),
+// falls back to polling the price list instead.
+// Returns a function that closes the stream.
+export const subscribePrices = (symbols, onUpdate) => {
+  const query = symbols?.length ? `?symbols=${symbols.join(',')}` : ''
+  const source = new EventSource(`${api.defaults.baseURL}/trading/prices/stream/${query}`)
+  let interval = null
+
+  const poll = async () => {
+    try {
+      const prices = await tradingAPI.getPrices()
+      const updates = {}
+      prices.forEach((asset) => {
+        if (asset.price !== null && (!symbols?.length || symbols.includes(asset.symbol))) {
+          updates[asset.symbol] = asset.price
+        }
+      })
+      onUpdate(updates)
+    } catch (error) {
+      console.error('Error polling prices:', error)
+    }
+  }
+
+  source.addEventListener('prices', (event) => {
+    onUpdate(JSON.parse(event.data))
+  })
+  source.addEventListener('error', () => {
+    // EventSource retries dropped connections itself; it only gives up
+    // (CLOSED) when the server answers with an error status
+    if (source.readyState === EventSource.CLOSED && interval === null) {
+      poll()
+      interval = setInterval(poll, PRICE_POLL_INTERVAL)
+    }
+  })
+  return () => {
+    source.close()
+    clearInterval(interval)
+  }
+}
+
+// The stream only re-prices rows already on screen, so the open
+// positions list is still re-fetched now and then to pick up trades
+// closed by stop-loss / take-profit or opened by order fills
+export const POSITIONS_REFRESH_INTERVAL = 60000
+
+// Re-price open positions locally from streamed prices
+export const applyPriceUpdates = (positions, updates) => {
+  return positions.map(position => {
+    const price = updates[position.asset_symbol]
+    if (price === undefined) return position
+
+    const current = parseFloat(price)
+    const entry = parseFloat(position.entry_price)
+    const quantity = parseFloat(position.quantity)
+    const diff = position.trade_type === 'BUY' ? current - entry : entry - current
+    return {
+      ...position,
+      current_price: price,
+      unrealized_pnl: (diff * quantity).toFixed(2),
+      unrealized_pnl_percent: ((diff / entry) * 100).toFixed(2),
+    }
+  })
+}
+
 export const tradingAPI = {
   getAssets: async () => {
     const response = await api.get('/trading/assets/')
@@ -26,8 +95,9 @@ export const tradingAPI = {
     return response.data
   },
 
-  getTradeHistory: async () => {
-    const response = await api.get('/trading/trades/history/')
+  // Returns { next, results }; pass `next` back as the url for more
+  getTradeHistory: async (url = '/trading/trades/history/', params = {}) => {
+    const response = await api.get(url, { params })
     return response.data
   },
 }
\ No newline at end of file
@@ -1,7 +1,12 @@
 import React, { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import { useAuth } from '../context/AuthContext'
-import { tradingAPI } from '../api/trading'
+import {
+  tradingAPI,
+  subscribePrices,
+  applyPriceUpdates,
+  POSITIONS_REFRESH_INTERVAL
+} from '../api/trading'
 import { authAPI } from '../api/auth'
 import { toast } from 'react-toastify'
 import { 
@@ -30,8 +35,19 @@ const Dashboard = () => {
 
   useEffect(() => {
     fetchData()
-    const interval = setInterval(fetchPrices, 30000)
-    return () => clearInterval(interval)
+    const unsubscribe = subscribePrices(null, (updates) => {
+      setPrices(prev => prev.map(asset => (
+        updates[asset.symbol] !== undefined
+          ? { ...asset, price: updates[asset.symbol] }
+          : asset
+      )))
+      setPositions(prev => applyPriceUpdates(prev, updates))
+    })
+    const interval = setInterval(fetchPositions, POSITIONS_REFRESH_INTERVAL)
+    return () => {
+      unsubscribe()
+      clearInterval(interval)
+    }
   }, [])
 
   const fetchData = async () => {
@@ -49,12 +65,12 @@ const Dashboard = () => {
     }
   }
 
-  const fetchPrices = async () => {
+  const fetchPositions = async () => {
     try {
-      const pricesData = await tradingAPI.getPrices()
-      setPrices(pricesData)
+      const positionsData = await tradingAPI.getOpenPositions()
+      setPositions(positionsData)
     } catch (error) {
-      console.error('Error fetching prices:', error)
+      console.error('Error fetching positions:', error)
     }
   }
 
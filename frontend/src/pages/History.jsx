@@ -1,12 +1,16 @@
 import React, { useState, useEffect } from 'react'
 import { toast } from 'react-toastify'
 import { tradingAPI } from '../api/trading'
+import { portfolioAPI } from '../api/portfolio'
 import { FiClock } from 'react-icons/fi'
 import './History.css'
 
 const History = () => {
   const [trades, setTrades] = useState([])
+  const [stats, setStats] = useState(null)
+  const [next, setNext] = useState(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     fetchHistory()
@@ -14,8 +18,13 @@ const History = () => {
 
   const fetchHistory = async () => {
     try {
-      const data = await tradingAPI.getTradeHistory()
-      setTrades(data)
+      const [page, portfolio] = await Promise.all([
+        tradingAPI.getTradeHistory(),
+        portfolioAPI.getPortfolio(),
+      ])
+      setTrades(page.results)
+      setNext(page.next)
+      setStats(portfolio)
     } catch (error) {
       toast.error('Failed to load trade history')
     } finally {
@@ -23,9 +32,25 @@ const History = () => {
     }
   }
 
-  const totalPnL = trades.reduce((sum, trade) => sum + parseFloat(trade.pnl || 0), 0)
-  const winningTrades = trades.filter(t => parseFloat(t.pnl) > 0).length
-  const winRate = trades.length > 0 ? ((winningTrades / trades.length) * 100).toFixed(1) : 0
+  const fetchMore = async () => {
+    setLoadingMore(true)
+    try {
+      const page = await tradingAPI.getTradeHistory(next)
+      setTrades(prev => [...prev, ...page.results])
+      setNext(page.next)
+    } catch (error) {
+      toast.error('Failed to load more trades')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  // Stats cover every closed trade, not just the pages loaded so far
+  const totalTrades = stats ? stats.total_trades : trades.length
+  const totalPnL = stats ? parseFloat(stats.total_pnl) : 0
+  const winningTrades = stats ? stats.winning_trades : 0
+  const losingTrades = stats ? stats.losing_trades : 0
+  const winRate = stats ? parseFloat(stats.win_rate).toFixed(1) : 0
 
   if (loading) {
     return <div className="loading">Loading history...</div>
@@ -35,7 +60,7 @@ const History = () => {
     <div className="history-page">
       <div className="history-header">
         <h1>Trade History</h1>
-        <p>{trades.length} closed trade{trades.length !== 1 ? 's' : ''}</p>
+        <p>{totalTrades} closed trade{totalTrades !== 1 ? 's' : ''}</p>
       </div>
 
       {/* Stats */}
@@ -56,7 +81,7 @@ const History = () => {
         </div>
         <div className="stat-card">
           <span>Losing</span>
-          <p className="text-danger">{trades.length - winningTrades}</p>
+          <p className="text-danger">{losingTrades}</p>
         </div>
       </div>
 
@@ -103,6 +128,15 @@ const History = () => {
               })}
             </tbody>
           </table>
+          {next && (
+            <button
+              className="load-more"
+              onClick={fetchMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </div>
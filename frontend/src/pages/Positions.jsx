@@ -2,7 +2,12 @@ import React, { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import { toast } from 'react-toastify'
 import { useAuth } from '../context/AuthContext'
-import { tradingAPI } from '../api/trading'
+import {
+  tradingAPI,
+  subscribePrices,
+  applyPriceUpdates,
+  POSITIONS_REFRESH_INTERVAL
+} from '../api/trading'
 import { FiPieChart, FiPlus, FiX } from 'react-icons/fi'
 import './Positions.css'
 
@@ -12,12 +17,21 @@ const Positions = () => {
   const [loading, setLoading] = useState(true)
   const [closingId, setClosingId] = useState(null)
 
+  const symbols = [...new Set(positions.map(pos => pos.asset_symbol))].sort().join(',')
+
   useEffect(() => {
     fetchPositions()
-    const interval = setInterval(fetchPositions, 30000)
+    const interval = setInterval(fetchPositions, POSITIONS_REFRESH_INTERVAL)
     return () => clearInterval(interval)
   }, [])
 
+  useEffect(() => {
+    if (!symbols) return undefined
+    return subscribePrices(symbols.split(','), (updates) => {
+      setPositions(prev => applyPriceUpdates(prev, updates))
+    })
+  }, [symbols])
+
   const fetchPositions = async () => {
     try {
       const data = await tradingAPI.getOpenPositions()
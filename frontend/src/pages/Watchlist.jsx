@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react'
 import { useNavigate } from 'react-router-dom'
 import { toast } from 'react-toastify'
 import { portfolioAPI } from '../api/portfolio'
-import { tradingAPI } from '../api/trading'
+import { tradingAPI, subscribePrices } from '../api/trading'
 import { FiStar, FiPlus, FiX, FiTrendingUp } from 'react-icons/fi'
 import './Watchlist.css'
 
@@ -17,8 +17,10 @@ const Watchlist = () => {
 
   useEffect(() => {
     fetchData()
-    const interval = setInterval(fetchPrices, 30000)
-    return () => clearInterval(interval)
+    const unsubscribe = subscribePrices(null, (updates) => {
+      setPrices(prev => ({ ...prev, ...updates }))
+    })
+    return unsubscribe
   }, [])
 
   const fetchData = async () => {
@@ -43,19 +45,6 @@ const Watchlist = () => {
     }
   }
 
-  const fetchPrices = async () => {
-    try {
-      const pricesData = await tradingAPI.getPrices()
-      const priceMap = {}
-      pricesData.forEach(p => {
-        priceMap[p.symbol] = p.price
-      })
-      setPrices(priceMap)
-    } catch (error) {
-      console.error('Error fetching prices:', error)
-    }
-  }
-
   const handleAdd = async () => {
     if (!selectedAsset) {
       toast.error('Please select an asset')